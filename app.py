@@ -2,7 +2,7 @@
 from dotenv import load_dotenv
 load_dotenv()  # Load environment variables from .env file
 
-from flask import Flask, render_template, redirect, url_for, request, flash, jsonify, Response
+from flask import Flask, render_template, redirect, url_for, request, flash, jsonify, Response, stream_with_context, session, make_response
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
@@ -12,16 +12,20 @@ import os
 import bcrypt
 import stripe
 import hashlib
+import hmac
+import uuid
 import urllib.parse
 import json
-import csv
 import io
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 from datetime import datetime, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from job_queue import queue_enabled, get_queue
+from dashboard_cache import get_dashboard_cache
+from markupsafe import Markup
 from scheduler_utils import compute_next_run
+from tools.http_client import get_session
 
 app = Flask(__name__)  # create Flask application instance
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")  # secret key for sessions (change in production!)
@@ -96,6 +100,8 @@ LEMONSQUEEZY_API_KEY = os.getenv("LEMONSQUEEZY_API_KEY", "")
 LEMONSQUEEZY_STORE_ID = os.getenv("LEMONSQUEEZY_STORE_ID", "")
 LEMONSQUEEZY_PRO_VARIANT = os.getenv("LEMONSQUEEZY_PRO_VARIANT", "")
 LEMONSQUEEZY_BIZ_VARIANT = os.getenv("LEMONSQUEEZY_BIZ_VARIANT", "")
+# Signing secret of the LemonSqueezy webhook; lead packs are only fulfilled from verified webhooks
+LEMONSQUEEZY_WEBHOOK_SECRET = os.getenv("LEMONSQUEEZY_WEBHOOK_SECRET", "")
 
 # PayFast Configuration (South Africa)
 PAYFAST_MERCHANT_ID = os.getenv("PAYFAST_MERCHANT_ID", "10000100")  # Sandbox default
@@ -168,8 +174,13 @@ def run_scheduled_automation(automation_id):
             
             result = controller.run(automation.goal)
             
+            from tasks import count_pitches_sent
+            from lead_stats import record_automation_run
+            pitches = count_pitches_sent(controller.state)
+            record_automation_run(user.id, pitches, automation.last_run)
             automation.last_run = datetime.utcnow()
             automation.run_count += 1
+            automation.pitches_sent = (automation.pitches_sent or 0) + pitches
             automation.result = f"Run #{automation.run_count}: {result}"
             automation.status = "scheduled"  # Keep as scheduled for recurring
             automation.next_run_at = compute_next_run(
@@ -360,36 +371,104 @@ def logout():  # handles user logout
 @app.route("/dashboard")  # main dashboard route
 @login_required  # require user to be logged in
 def dashboard():  # shows user's dashboard with automations
-    automations = Automation.query.filter_by(user_id=current_user.id).order_by(Automation.created_at.desc()).limit(10).all()  # get user's recent automations (Automation model is in database.py)
-    lead_stats = current_user.get_lead_gen_stats()
+    # PWA users refresh constantly: the body is rendered once per cache version (bumped on lead/automation/tier changes)
+    body = get_dashboard_cache().get_or_build(current_user, "dashboard_body", lambda: _render_dashboard_body(current_user))
+    return render_template("dashboard.html", dashboard_body=Markup(body))
+
+def _cached_lead_stats(user) -> dict:
+    return get_dashboard_cache().get_or_build(user, "lead_stats", user.get_lead_gen_stats)
+
+def _render_dashboard_body(user) -> str:
+    automations = Automation.query.filter_by(user_id=user.id).order_by(Automation.created_at.desc()).limit(10).all()  # get user's recent automations (Automation model is in database.py)
+    lead_stats = _cached_lead_stats(user)
     from database import Lead
-    recent_leads = Lead.query.filter_by(user_id=current_user.id).order_by(Lead.created_at.desc()).limit(5).all()
+    recent_leads = Lead.query.filter_by(user_id=user.id).order_by(Lead.created_at.desc()).limit(5).all()
     # Simple ROI estimate (adjustable later)
     leads_found = lead_stats.get("leads_found", 0) or 0
     est_close_rate = 0.12
     est_deal_value = 25000
     est_monthly_revenue = int(leads_found * est_close_rate * est_deal_value)
     return render_template(
-        "dashboard.html",
-        user=current_user,
+        "dashboard_body.html",
         automations=automations,
         lead_stats=lead_stats,
         recent_leads=recent_leads,
         est_monthly_revenue=est_monthly_revenue,
     )
 
+LEADS_PAGE_SIZE = 100
+CLIENT_PAGE_SIZE = 200
+
+def _lead_json(lead, reveal_email: bool = True) -> dict:
+    return {
+        "id": lead.id,
+        "name": lead.name,
+        "email": lead.email if reveal_email else _mask_email(lead.email),
+        "email_visible": reveal_email,
+        "website": lead.website,
+        "niche": lead.niche,
+        "status": lead.status,
+        "created_at": lead.created_at.isoformat() if lead.created_at else None,
+    }
+
+def _lead_list_stats(user_id: int) -> dict:
+    from database import Lead
+    total, with_email, with_website = db.session.query(
+        db.func.count(Lead.id),
+        db.func.count(db.case((Lead.email != "", 1))),
+        db.func.count(db.case((Lead.website != "", 1))),
+    ).filter(Lead.user_id == user_id).one()
+    return {"total": total, "with_email": with_email, "with_website": with_website}
+
+CLIENT_PORTAL_MAX_AGE = int(os.getenv("CLIENT_PORTAL_MAX_AGE", "30"))  # seconds a portal page may be reused without asking
+
+def _lead_list_etag(user, *parts) -> str:
+    # users.cache_version moves on every lead write and tier change, so it stands in for latest-lead/count checks
+    raw = "|".join(str(part) for part in (user.id, user.cache_version or 0, *parts))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def _not_modified(etag: str, cache_control: str):
+    """304 response if the client already has this version, else None (caller renders and calls _with_validator)."""
+    if session.get("_flashes"):
+        return None  # a pending flash message has to be rendered, not answered from the browser cache
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    return _with_validator(Response(status=304), etag, cache_control)
+
+def _with_validator(response, etag: str, cache_control: str):
+    response = make_response(response)
+    response.set_etag(etag, weak=True)  # rendered HTML/JSON, not byte-for-byte stable across deploys
+    response.headers["Cache-Control"] = cache_control
+    return response
+
 @app.route("/leads")
 @login_required
 def leads():
-    from database import Lead
-    leads = Lead.query.filter_by(user_id=current_user.id).order_by(Lead.created_at.desc()).limit(100).all()
+    from lead_store import lead_page
+    cursor = request.args.get("cursor")
+    fmt = request.args.get("format")
+    etag = _lead_list_etag(current_user, "leads", fmt, cursor, request.args.get("import_job"), LEADS_PAGE_SIZE)
+    cache_control = "private, no-cache"  # always revalidate - a 304 costs no queries
+    not_modified = _not_modified(etag, cache_control)
+    if not_modified:
+        return not_modified
+
+    leads, next_cursor = lead_page(current_user.id, cursor, LEADS_PAGE_SIZE)
     can_access = current_user.can_access_leads()
-    return render_template("leads.html", leads=leads, can_access=can_access)
+    if fmt == "json":
+        # Infinite scroll: same keyset page as the HTML view
+        return _with_validator(jsonify({
+            "leads": [_lead_json(lead, can_access or lead.is_unlocked) for lead in leads],
+            "next_cursor": next_cursor,
+        }), etag, cache_control)
+    # Totals only on the first page - later pages stay a single index range scan
+    stats = None if cursor else _lead_list_stats(current_user.id)
+    return _with_validator(render_template("leads.html", leads=leads, can_access=can_access, import_job=request.args.get("import_job"),
+                           stats=stats, cursor=cursor, next_cursor=next_cursor), etag, cache_control)
 
 @app.route("/leads/add", methods=["POST"])
 @login_required
 def add_lead():
-    from database import Lead
     name = (request.form.get("name") or "").strip()
     email = (request.form.get("email") or "").strip()
     website = (request.form.get("website") or "").strip()
@@ -399,71 +478,48 @@ def add_lead():
         flash("Lead name is required.", "error")
         return redirect(url_for("leads"))
 
-    existing = None
-    if email:
-        existing = Lead.query.filter_by(user_id=current_user.id, email=email).first()
-    if existing:
+    from lead_store import bulk_upsert_leads
+    result = bulk_upsert_leads(current_user.id, [{"name": name, "email": email, "website": website, "niche": niche}], unlock=True)
+    db.session.commit()
+    if not result["inserted"]:
         flash("Lead already exists.", "info")
         return redirect(url_for("leads"))
 
-    lead = Lead(
-        user_id=current_user.id,
-        name=name,
-        email=email,
-        website=website,
-        niche=niche,
-        is_unlocked=True
-    )
-    db.session.add(lead)
-    db.session.commit()
     flash("Lead added.", "success")
     return redirect(url_for("leads"))
 
 @app.route("/leads/import", methods=["POST"])
 @login_required
 def import_leads():
-    from database import Lead
     file = request.files.get("file")
     if not file:
         flash("Please upload a CSV file.", "error")
         return redirect(url_for("leads"))
 
+    from lead_import import start_import
     try:
-        content = file.stream.read().decode("utf-8", errors="ignore")
-        reader = csv.DictReader(io.StringIO(content))
-        added = 0
-        for row in reader:
-            name = (row.get("name") or row.get("Name") or "").strip()
-            email = (row.get("email") or row.get("Email") or "").strip()
-            website = (row.get("website") or row.get("Website") or "").strip()
-            niche = (row.get("niche") or row.get("Niche") or "Security Services").strip()
-            status = (row.get("status") or row.get("Status") or "new").strip()
-
-            if not name:
-                continue
-            existing = None
-            if email:
-                existing = Lead.query.filter_by(user_id=current_user.id, email=email).first()
-            if existing:
-                continue
-
-            lead = Lead(
-                user_id=current_user.id,
-                name=name,
-                email=email,
-                website=website,
-                niche=niche,
-                status=status,
-                is_unlocked=True
-            )
-            db.session.add(lead)
-            added += 1
-        db.session.commit()
-        flash(f"Imported {added} leads.", "success")
+        result = start_import(current_user.id, file)
+        if result["queued"]:
+            flash("Large import started - we'll keep adding leads in the background.", "info")
+            return redirect(url_for("leads", import_job=result["job_id"]))
+        summary = result["summary"]
+        flash(f"Imported {summary['added']} leads ({summary['duplicates']} duplicates skipped, "
+              f"{summary['rejected']} rows rejected).", "success")
     except Exception as e:
+        db.session.rollback()
         flash(f"Import failed: {str(e)}", "error")
     return redirect(url_for("leads"))
 
+@app.route("/leads/import/<job_id>")
+@login_required
+def import_status(job_id):
+    """Progress/summary of a background CSV import (polled by the leads page)."""
+    from lead_import import get_import_status
+    status = get_import_status(job_id, current_user.id)
+    if not status:
+        return jsonify({"error": "Import not found"}), 404
+    return jsonify(status)
+
 @app.route("/leads/export")
 @login_required
 def export_leads():
@@ -471,27 +527,26 @@ def export_leads():
         flash("Upgrade to Pro to export leads.", "error")
         return redirect(url_for("subscription"))
 
-    from database import Lead
-    leads = Lead.query.filter_by(user_id=current_user.id).order_by(Lead.created_at.desc()).all()
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Name", "Email", "Company", "Website", "Niche", "Status", "Created At"])
-    for lead in leads:
-        writer.writerow([
-            lead.name,
-            lead.email,
-            "",
-            lead.website,
-            lead.niche,
-            lead.status,
-            lead.created_at.isoformat() if lead.created_at else ""
-        ])
-    output.seek(0)
-    return Response(
-        output.getvalue(),
-        mimetype="text/csv",
-        headers={"Content-Disposition": "attachment; filename=leads.csv"}
-    )
+    from lead_export import export_stream, EXPORT_FORMATS
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        fmt = "csv"
+    compress = request.args.get("gzip", "").lower() in ("1", "true", "yes")
+    mimetype, filename = EXPORT_FORMATS[fmt]
+    if compress:
+        mimetype, filename = "application/gzip", f"{filename}.gz"
+    etag = _lead_list_etag(current_user, "export", fmt, compress)
+    cache_control = "private, no-cache"
+    not_modified = _not_modified(etag, cache_control)
+    if not_modified:
+        return not_modified
+
+    # Streamed straight from a server-side cursor; the request context stays open until the last chunk
+    return _with_validator(Response(
+        stream_with_context(export_stream(current_user.id, fmt, compress)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    ), etag, cache_control)
 
 @app.route("/onboarding")
 @login_required
@@ -501,9 +556,8 @@ def onboarding():
 @app.route("/reports")
 @login_required
 def reports():
-    from database import Lead
-    leads_count = Lead.query.filter_by(user_id=current_user.id).count()
-    return render_template("reports.html", leads_count=leads_count)
+    lead_stats = _cached_lead_stats(current_user)  # one rollup row, not a COUNT over leads
+    return render_template("reports.html", leads_count=lead_stats["leads_found"])
 
 @app.route("/reports/schedule", methods=["POST"])
 @login_required
@@ -552,9 +606,25 @@ def client_view(token):
     except (BadSignature, SignatureExpired):
         return "Link expired or invalid.", 403
 
-    from database import Lead
-    leads = Lead.query.filter_by(user_id=user_id).order_by(Lead.created_at.desc()).limit(200).all()
-    return render_template("client_view.html", leads=leads)
+    owner = db.session.get(User, user_id)  # primary key lookup - all a repeat poll costs
+    if not owner:
+        return "Link expired or invalid.", 403
+    from lead_store import lead_page
+    cursor = request.args.get("cursor")
+    fmt = request.args.get("format")
+    # The token is part of the page (load-more links), so it goes into the validator too
+    etag = _lead_list_etag(owner, "client", fmt, cursor, token, CLIENT_PAGE_SIZE)
+    cache_control = f"private, max-age={CLIENT_PORTAL_MAX_AGE}, must-revalidate"
+    not_modified = _not_modified(etag, cache_control)
+    if not_modified:
+        return not_modified
+
+    leads, next_cursor = lead_page(user_id, cursor, CLIENT_PAGE_SIZE)
+    if fmt == "json":
+        return _with_validator(jsonify({"leads": [_lead_json(lead) for lead in leads], "next_cursor": next_cursor}),
+                               etag, cache_control)
+    return _with_validator(render_template("client_view.html", leads=leads, token=token, cursor=cursor, next_cursor=next_cursor),
+                           etag, cache_control)
 
 @app.route("/contract.pdf")
 @login_required
@@ -729,7 +799,7 @@ def create_checkout_session():
             checkout_url += f"?checkout[email]={current_user.email}"
             checkout_url += f"&checkout[custom][user_id]={current_user.id}"
             checkout_url += f"&checkout[custom][tier]={tier}"
-            checkout_url += f"&checkout[success_url]={success_url}"
+            checkout_url += f"&checkout[success_url]={urllib.parse.quote(success_url, safe='')}"
             
             return redirect(checkout_url)
         except Exception as e:
@@ -738,8 +808,6 @@ def create_checkout_session():
     # Fallback to Paystack for South African payments
     if PAYSTACK_SECRET_KEY:
         try:
-            import requests as req
-            
             # Initialize Paystack transaction
             headers = {
                 "Authorization": f"Bearer {PAYSTACK_SECRET_KEY}",
@@ -758,7 +826,7 @@ def create_checkout_session():
                 }
             }
             
-            response = req.post(
+            response = get_session().post(
                 "https://api.paystack.co/transaction/initialize",
                 json=data,
                 headers=headers
@@ -840,9 +908,20 @@ def lemonsqueezy_success():
     # Show success page for non-logged in or redirect issues
     return render_template("payment_success.html", tier=tier)
 
+def _lemonsqueezy_signature_valid() -> bool:
+    """X-Signature is the hex HMAC-SHA256 of the raw body with the webhook's signing secret."""
+    if not LEMONSQUEEZY_WEBHOOK_SECRET:
+        return False
+    expected = hmac.new(LEMONSQUEEZY_WEBHOOK_SECRET.encode("utf-8"), request.get_data(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, request.headers.get("X-Signature", ""))
+
 @app.route("/lemonsqueezy-webhook", methods=["POST"])
 def lemonsqueezy_webhook():
     """Handle LemonSqueezy webhook events (backup for redirect)"""
+    signed = _lemonsqueezy_signature_valid()
+    if LEMONSQUEEZY_WEBHOOK_SECRET and not signed:
+        print("[LemonSqueezy Webhook] Rejected: invalid signature")
+        return jsonify({"error": "Invalid signature"}), 401
     try:
         payload = request.get_json()
         event_name = payload.get("meta", {}).get("event_name", "")
@@ -866,6 +945,16 @@ def lemonsqueezy_webhook():
                 user_id = custom_data.get("user_id")
                 tier = custom_data.get("tier", "pro")
             
+            # Lead pack orders are paid for once the signed order webhook arrives; the reference keeps it to one fill
+            if custom_data.get("product") == "leadpack" and custom_data.get("reference"):
+                if not signed:
+                    print("[LemonSqueezy Webhook] Lead pack not fulfilled: set LEMONSQUEEZY_WEBHOOK_SECRET to accept paid orders")
+                    return jsonify({"error": "Webhook signing secret not configured"}), 401
+                from lead_packs import get_or_create_order, queue_fulfilment
+                if user_id and event_name == "order_created":
+                    queue_fulfilment(get_or_create_order(int(user_id), custom_data["reference"], LEAD_PACK_COUNT, "lemonsqueezy"))
+                return jsonify({"status": "success"}), 200
+            
             if user_id:
                 user = User.query.get(int(user_id))
                 if user:
@@ -890,14 +979,12 @@ def paystack_callback():
         return redirect(url_for("subscription"))
     
     try:
-        import requests as req
-        
         # Verify the transaction
         headers = {
             "Authorization": f"Bearer {PAYSTACK_SECRET_KEY}"
         }
         
-        response = req.get(
+        response = get_session().get(
             f"https://api.paystack.co/transaction/verify/{reference}",
             headers=headers
         )
@@ -963,15 +1050,19 @@ def buy_lead_pack():
             # If we have a specific lead pack variant, use it
             variant_id = LEMONSQUEEZY_LEADPACK_VARIANT or LEMONSQUEEZY_PRO_VARIANT
             
-            # Create success redirect URL
-            success_url = url_for('leadpack_success', user_id=current_user.id, _external=True)
+            # The order is keyed by a reference we generate now; only the signed webhook marks it paid and queues it
+            from lead_packs import get_or_create_order
+            reference = f"ls-{uuid.uuid4().hex}"
+            get_or_create_order(current_user.id, reference, LEAD_PACK_COUNT, "lemonsqueezy")
+            success_url = url_for('leadpack_success', reference=reference, _external=True)
             
             # Create LemonSqueezy checkout URL
             checkout_url = f"https://{LEMONSQUEEZY_STORE_ID}.lemonsqueezy.com/checkout/buy/{variant_id}"
             checkout_url += f"?checkout[email]={current_user.email}"
             checkout_url += f"&checkout[custom][user_id]={current_user.id}"
             checkout_url += f"&checkout[custom][product]=leadpack"
-            checkout_url += f"&checkout[success_url]={success_url}"
+            checkout_url += f"&checkout[custom][reference]={reference}"
+            checkout_url += f"&checkout[success_url]={urllib.parse.quote(success_url, safe='')}"
             
             return redirect(checkout_url)
         except Exception as e:
@@ -980,8 +1071,6 @@ def buy_lead_pack():
     # Fallback: Paystack
     if PAYSTACK_SECRET_KEY:
         try:
-            import requests as req
-            
             headers = {
                 "Authorization": f"Bearer {PAYSTACK_SECRET_KEY}",
                 "Content-Type": "application/json"
@@ -999,7 +1088,7 @@ def buy_lead_pack():
                 }
             }
             
-            response = req.post(
+            response = get_session().post(
                 "https://api.paystack.co/transaction/initialize",
                 json=data,
                 headers=headers
@@ -1022,66 +1111,35 @@ def buy_lead_pack():
     return redirect(url_for("subscription"))
 
 @app.route("/leadpack-success")
+@login_required
 def leadpack_success():
-    """Handle lead pack purchase success - generate 50 leads for user"""
-    from database import Lead
-    from tools.free_scraper import scrape_leads_free
-    
-    user_id = request.args.get("user_id")
-    
-    if not user_id:
+    """
+    Return page after checkout - read-only. Reaching it proves nothing about payment, so it only
+    shows the order's progress; fulfilment is queued by the signed webhook (or the verified Paystack callback).
+    """
+    from lead_packs import order_status
+    from database import LeadPackOrder
+
+    reference = request.args.get("reference")
+    order = LeadPackOrder.query.filter_by(reference=reference, user_id=current_user.id).first() if reference else None
+    if not order:
         flash("Error processing lead pack. Please contact support.", "error")
         return redirect(url_for("subscription"))
-    
-    user = User.query.get(int(user_id))
-    if not user:
-        flash("User not found.", "error")
-        return redirect(url_for("subscription"))
-    
-    # Generate 50 leads for the user
-    try:
-        leads_generated = 0
-        niches = ["Security Services", "Solar Energy"]
-        
-        for niche in niches:
-            leads = scrape_leads_free(niche, "South Africa", max_leads=25)
-            
-            for lead in leads:
-                # Check for duplicates
-                existing = None
-                if lead.get("email"):
-                    existing = Lead.query.filter_by(user_id=user.id, email=lead['email']).first()
-                if not existing and lead.get("website"):
-                    existing = Lead.query.filter_by(user_id=user.id, website=lead['website']).first()
-                
-                if not existing:
-                    new_lead = Lead(
-                        user_id=user.id,
-                        name=lead.get('name') or "Business",
-                        email=lead.get('email') or "",
-                        website=lead.get('website') or "",
-                        niche=niche,
-                        is_unlocked=True  # IMPORTANT: Mark as unlocked since they paid
-                    )
-                    db.session.add(new_lead)
-                    leads_generated += 1
-        
-        db.session.commit()
-        print(f"[Lead Pack] Generated {leads_generated} leads for user {user_id}")
-        
-        # Flash success message if user is logged in
-        if current_user.is_authenticated and current_user.id == int(user_id):
-            flash(f"Lead pack purchased! {leads_generated} new leads added to your account.", "success")
-            return redirect(url_for("leads"))
-        
-        return render_template("payment_success.html", 
-                               tier="Lead Pack", 
-                               message=f"{leads_generated} leads have been added to your account!")
-    
-    except Exception as e:
-        print(f"[Lead Pack Error] {str(e)}")
-        flash("Error generating leads. Please contact support.", "error")
-        return redirect(url_for("subscription"))
+
+    return render_template("leadpack_status.html", reference=order.reference, status=order_status(order.reference))
+
+@app.route("/leadpack/<reference>/status")
+@login_required
+def leadpack_status(reference):
+    """Fulfilment progress for a lead pack (polled by the success page)"""
+    from lead_packs import order_status
+    from database import LeadPackOrder
+    if not LeadPackOrder.query.filter_by(reference=reference, user_id=current_user.id).first():
+        return jsonify({"error": "Lead pack not found"}), 404
+    status = order_status(reference)
+    if not status:
+        return jsonify({"error": "Lead pack not found"}), 404
+    return jsonify(status)
 
 @app.route("/leadpack-callback")
 @login_required
@@ -1094,15 +1152,16 @@ def leadpack_callback():
         return redirect(url_for("subscription"))
     
     try:
-        import requests as req
-        
         headers = {"Authorization": f"Bearer {PAYSTACK_SECRET_KEY}"}
-        response = req.get(f"https://api.paystack.co/transaction/verify/{reference}", headers=headers)
+        response = get_session().get(f"https://api.paystack.co/transaction/verify/{reference}", headers=headers)
         result = response.json()
         
         if result.get("status") and result["data"]["status"] == "success":
-            # Redirect to lead generation
-            return redirect(url_for('leadpack_success', user_id=current_user.id))
+            # Record the order under the verified Paystack reference, then hand off to fulfilment
+            from lead_packs import get_or_create_order, queue_fulfilment
+            metadata = result["data"].get("metadata") or {}
+            queue_fulfilment(get_or_create_order(current_user.id, reference, int(metadata.get("leads_count") or LEAD_PACK_COUNT), "paystack"))
+            return redirect(url_for('leadpack_success', reference=reference))
         else:
             flash("Payment was not successful. Please try again.", "error")
             return redirect(url_for("subscription"))
@@ -1137,39 +1196,16 @@ def admin_credit_leads():
             flash(f"User not found: {user_email}", "error")
             return redirect(url_for("admin_credit_leads"))
         
-        # Generate leads for this user
-        from database import Lead
-        from tools.free_scraper import scrape_leads_free
-        
+        # Fill the credit through the same background fulfilment as paid packs
+        from lead_packs import get_or_create_order, queue_fulfilment
+
         try:
-            leads_generated = 0
-            niches = ["Security Services", "Solar Energy"]
-            leads_per_niche = lead_count // 2
-            
-            for niche in niches:
-                leads = scrape_leads_free(niche, "South Africa", max_leads=leads_per_niche)
-                
-                for lead in leads:
-                    existing = None
-                    if lead.get("email"):
-                        existing = Lead.query.filter_by(user_id=user.id, email=lead['email']).first()
-                    if not existing and lead.get("website"):
-                        existing = Lead.query.filter_by(user_id=user.id, website=lead['website']).first()
-                    
-                    if not existing:
-                        new_lead = Lead(
-                            user_id=user.id,
-                            name=lead.get('name') or "Business",
-                            email=lead.get('email') or "",
-                            website=lead.get('website') or "",
-                            niche=niche,
-                            is_unlocked=True
-                        )
-                        db.session.add(new_lead)
-                        leads_generated += 1
-            
-            db.session.commit()
-            flash(f"Success! Added {leads_generated} leads to {user_email}", "success")
+            reference = request.form.get("reference") or f"admin-{uuid.uuid4().hex}"
+            order = queue_fulfilment(get_or_create_order(user.id, reference, lead_count, "admin"))
+            if order.status == "completed":
+                flash(f"Success! Added {order.leads_added} leads to {user_email}", "success")
+            else:
+                flash(f"Queued {lead_count} leads for {user_email} (ref {reference})", "success")
             
         except Exception as e:
             flash(f"Error: {str(e)}", "error")
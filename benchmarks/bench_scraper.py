@@ -0,0 +1,103 @@
+"""
+Offline parser benchmarks for tools/free_scraper.py.
+Replays recorded Bing / DuckDuckGo / Yellow Pages / company pages (benchmarks/fixtures),
+checks every parser still extracts what the fixtures contain, then reports throughput
+(pages/sec) and peak memory per call. Exits non-zero on a parse regression.
+
+    python -m benchmarks.bench_scraper
+    python -m benchmarks.bench_scraper --iterations 500
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.replay import FIXTURES_DIR, install_replay, load_manifest  # noqa: E402
+from tools import free_scraper  # noqa: E402
+
+SITE_URL = "https://www.acme-security.co.za/"
+
+
+def measure(func: Callable[[], Any], iterations: int, pages_per_call: int) -> Dict[str, float]:
+    func()  # warm-up (imports, regex/strainer caches, fixture reads)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - started
+    return {
+        "pages_per_sec": iterations * pages_per_call / elapsed,
+        "ms_per_call": elapsed / iterations * 1000,
+        "peak_kb": peak / 1024,
+    }
+
+
+def check(expected: Dict[str, Any], home_html: str) -> List[str]:
+    """Run each parser once against the fixtures and compare with the manifest."""
+    failures = []
+    counts = {
+        "bing": len(free_scraper.scrape_bing_search("Security Services companies in Johannesburg", num_results=15)),
+        "duckduckgo": len(free_scraper.scrape_duckduckgo("Security Services companies in Johannesburg", num_results=15)),
+        "yellow_pages": len(free_scraper.scrape_yellow_pages_sa("Security Services", "Johannesburg", max_results=50)),
+    }
+    for name, count in counts.items():
+        if count != expected[name]:
+            failures.append(f"{name}: parsed {count} results, expected {expected[name]}")
+
+    text_emails = sorted(free_scraper.extract_emails_from_text(home_html))
+    if text_emails != sorted(expected["text_emails"]):
+        failures.append(f"extract_emails_from_text: got {text_emails}, expected {expected['text_emails']}")
+
+    site_emails = sorted(free_scraper.scrape_website_for_emails(SITE_URL))
+    if site_emails != sorted(expected["website_emails"]):
+        failures.append(f"scrape_website_for_emails: got {site_emails}, expected {expected['website_emails']}")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline free_scraper parser benchmarks")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    manifest = load_manifest()
+    adapter = install_replay(manifest["routes"])
+    with open(os.path.join(FIXTURES_DIR, "company_home.html"), "r", encoding="utf-8") as f:
+        home_html = f.read()
+
+    failures = check(manifest["expected"], home_html)
+    if failures:
+        print("[BENCH] Parser regression against recorded fixtures:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+
+    query = "Security Services companies in Johannesburg"
+    cases = [
+        ("scrape_bing_search", lambda: free_scraper.scrape_bing_search(query, num_results=15), 1),
+        ("scrape_duckduckgo", lambda: free_scraper.scrape_duckduckgo(query, num_results=15), 1),
+        ("scrape_yellow_pages_sa", lambda: free_scraper.scrape_yellow_pages_sa("Security Services", "Johannesburg"), 1),
+        ("extract_emails_from_text", lambda: free_scraper.extract_emails_from_text(home_html), 1),
+        ("scrape_website_for_emails", lambda: free_scraper.scrape_website_for_emails(SITE_URL), 2),
+    ]
+
+    print(f"[BENCH] {args.iterations} iterations per case, fixtures replayed offline")
+    print(f"{'function':<28}{'pages/sec':>12}{'ms/call':>10}{'peak KB':>10}")
+    for name, func, pages in cases:
+        result = measure(func, args.iterations, pages)
+        print(f"{name:<28}{result['pages_per_sec']:>12.1f}{result['ms_per_call']:>10.2f}{result['peak_kb']:>10.1f}")
+    print(f"[BENCH] Replay transport served {adapter.requests_served} requests, 0 network calls")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
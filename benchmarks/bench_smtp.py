@@ -0,0 +1,150 @@
+"""
+SMTP send throughput: per-call connect + login (the old send_email_function) against the
+pooled connections in tools/smtp_pool.py. Runs a local stand-in SMTP server (no TLS, accepts
+any login) that waits --latency-ms before every reply to model the network round trip, so
+handshake cost shows up the way it does against a real server.
+
+    python -m benchmarks.bench_smtp
+    python -m benchmarks.bench_smtp --calls 200 --recipients 5 --latency-ms 20
+"""
+
+import argparse
+import os
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BODY = "Hi there,\n\nWe help security companies in Gauteng book more site assessments.\n" * 20
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.messages = 0
+        self.sessions = 0
+        self.count_lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), StubSMTPHandler)
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough ESMTP for smtplib: EHLO, AUTH PLAIN, MAIL/RCPT/DATA, NOOP, RSET, QUIT."""
+
+    def reply(self, *lines: str) -> None:
+        time.sleep(self.server.latency)
+        self.wfile.write("".join(f"{line}\r\n" for line in lines).encode("ascii"))
+
+    def handle(self):
+        with self.server.count_lock:
+            self.server.sessions += 1
+        self.reply("220 stub ESMTP ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii", "replace").strip().split(" ", 1)[0].upper()
+            if command == "EHLO":
+                self.reply("250-stub", "250-AUTH PLAIN", "250 8BITMIME")
+            elif command == "HELO":
+                self.reply("250 stub")
+            elif command == "AUTH":
+                self.reply("235 2.7.0 Authentication successful")
+            elif command in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with self.server.count_lock:
+                    self.server.messages += 1
+                self.reply("250 OK queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+def legacy_send(host: str, port: int, recipients: List[str]) -> None:
+    """The old SMTP branch of send_email_function: new connection, login and MIME tree per call."""
+    server = smtplib.SMTP(host, port)
+    server.login("bench@example.com", "secret")
+    for recipient in recipients:
+        msg = MIMEMultipart()
+        msg["From"] = "AI Sales Agent <bench@example.com>"
+        msg["To"] = recipient
+        msg["Subject"] = "Quick question"
+        msg.attach(MIMEText(BODY, "plain"))
+        server.sendmail("bench@example.com", recipient, msg.as_string())
+    server.quit()
+
+
+def pooled_send(recipients: List[str]) -> None:
+    from tools.implementation import send_email_function
+
+    result = send_email_function({"to": ",".join(recipients), "subject": "Quick question", "body": BODY})
+    if result.get("status") != "sent":
+        raise RuntimeError(result.get("output_text"))
+
+
+def run(name: str, send: Callable[[List[str]], None], calls: int, recipients: int,
+        server: StubSMTPServer) -> Dict[str, float]:
+    batches = [[f"lead{c}-{r}@example.com" for r in range(recipients)] for c in range(calls)]
+    send(["warmup@example.com"])  # imports, and for the pool its first connection - steady state is what we measure
+    messages_before, sessions_before = server.messages, server.sessions
+    started = time.perf_counter()
+    for batch in batches:
+        send(batch)
+    elapsed = time.perf_counter() - started
+    sent = server.messages - messages_before
+    if sent != calls * recipients:
+        raise RuntimeError(f"{name}: server received {sent} messages, expected {calls * recipients}")
+    return {
+        "messages_per_sec": sent / elapsed,
+        "ms_per_call": elapsed / calls * 1000,
+        "connections": server.sessions - sessions_before,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="SMTP send throughput, unpooled vs pooled")
+    parser.add_argument("--calls", type=int, default=100, help="send_email_function calls per run")
+    parser.add_argument("--recipients", type=int, default=1, help="recipients per call")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="stub server delay before each reply")
+    args = parser.parse_args()
+
+    server = StubSMTPServer(args.latency_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+
+    # Point the real send path at the stub before tools.smtp_pool reads its settings
+    os.environ.update({"SMTP_SERVER": host, "SMTP_PORT": str(port), "SMTP_USE_TLS": "false",
+                       "EMAIL_SENDER": "bench@example.com", "EMAIL_PASSWORD": "secret"})
+    os.environ.pop("SENDGRID_API_KEY", None)
+
+    results = {
+        "before (connect per call)": run("before", lambda batch: legacy_send(host, port, batch), args.calls, args.recipients, server),
+        "after (pooled)": run("after", pooled_send, args.calls, args.recipients, server),
+    }
+    server.shutdown()
+
+    print(f"[BENCH] {args.calls} calls x {args.recipients} recipient(s), {args.latency_ms:g} ms per server reply")
+    for name, result in results.items():
+        print(f"[BENCH] {name:<26} {result['messages_per_sec']:8.1f} msg/s  "
+              f"{result['ms_per_call']:7.2f} ms/call  {result['connections']:4d} connections")
+    before, after = results.values()
+    print(f"[BENCH] Speed-up: {after['messages_per_sec'] / before['messages_per_sec']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
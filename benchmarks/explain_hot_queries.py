@@ -0,0 +1,164 @@
+"""
+EXPLAIN check for the hot query paths (dashboard, leads, client view, lead stats,
+weekly report task, scheduler poll). Migrates a scratch database to head, seeds it
+with a large dataset, and fails if any hot query plans a sequential scan.
+
+    python -m benchmarks.explain_hot_queries
+    python -m benchmarks.explain_hot_queries --database-url postgresql://localhost/explain_scratch --users 500
+
+Only point --database-url at a scratch database: it is migrated and seeded with test rows.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, insert, select, text, tuple_  # noqa: E402
+
+from database import Automation, Lead, User  # noqa: E402
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NICHES = ["Security Services", "Solar Energy", "Logistics", "Plumbing"]
+
+
+def migrate(database_url: str) -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    os.environ["DATABASE_URL"] = database_url  # migrations/env.py reads it
+    config = Config(os.path.join(ROOT_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT_DIR, "migrations"))
+    command.upgrade(config, "head")
+
+
+def seed(engine, users: int, leads_per_user: int, automations_per_user: int) -> None:
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(User.__table__)).scalar():
+            print("[EXPLAIN] Database already has users, skipping seed")
+            return
+        conn.execute(insert(User.__table__), [
+            {"id": u, "email": f"explain-{u}@example.com", "password_hash": "x", "subscription_tier": "pro",
+             "created_at": now, "automations_count": 0}
+            for u in range(1, users + 1)
+        ])
+        for u in range(1, users + 1):
+            conn.execute(insert(Lead.__table__), [
+                {"user_id": u, "name": f"Lead {u}-{i}", "email": f"lead{i}@u{u}.example.com",
+                 "website": f"https://u{u}-lead{i}.example.com", "niche": random.choice(NICHES), "status": "new",
+                 "is_unlocked": True, "created_at": now - timedelta(minutes=i),
+                 "email_key": f"lead{i}@u{u}.example.com", "domain_key": f"u{u}-lead{i}.example.com"}
+                for i in range(leads_per_user)
+            ])
+            conn.execute(insert(Automation.__table__), [
+                {"user_id": u, "goal": f"Find leads {i}", "frequency": "daily" if i % 10 == 0 else "once",
+                 "is_active": i % 10 == 0, "status": "completed", "run_count": 0,
+                 "next_run_at": now + timedelta(hours=random.randint(-2, 48)) if i % 10 == 0 else None,
+                 "created_at": now - timedelta(hours=i)}
+                for i in range(automations_per_user)
+            ])
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("ANALYZE users; ANALYZE leads; ANALYZE automations"))
+        else:
+            conn.execute(text("ANALYZE"))
+    print(f"[EXPLAIN] Seeded {users} users, {users * leads_per_user} leads, {users * automations_per_user} automations")
+
+
+def hot_queries(user_id: int) -> List[Tuple[str, object]]:
+    """The statements the app runs on every dashboard/leads/client/scheduler hit."""
+    now = datetime.utcnow()
+    return [
+        ("dashboard: recent automations",
+         select(Automation).where(Automation.user_id == user_id).order_by(Automation.created_at.desc()).limit(10)),
+        ("dashboard: recent leads",
+         select(Lead).where(Lead.user_id == user_id).order_by(Lead.created_at.desc()).limit(5)),
+        ("leads: lead list",
+         select(Lead).where(Lead.user_id == user_id).order_by(Lead.created_at.desc(), Lead.id.desc()).limit(101)),
+        ("leads: keyset page",
+         select(Lead).where(Lead.user_id == user_id)
+         .where(tuple_(Lead.created_at, Lead.id) < tuple_(now - timedelta(minutes=250), 10 ** 9))
+         .order_by(Lead.created_at.desc(), Lead.id.desc()).limit(101)),
+        ("client_view: lead list",
+         select(Lead).where(Lead.user_id == user_id).order_by(Lead.created_at.desc(), Lead.id.desc()).limit(201)),
+        ("lead stats: lead count",
+         select(func.count(Lead.id)).where(Lead.user_id == user_id)),
+        ("lead stats: leads by niche",
+         select(Lead.niche, func.count()).where(Lead.user_id == user_id).group_by(Lead.niche)),
+        ("lead stats: user automations",
+         select(Automation).where(Automation.user_id == user_id)),
+        ("run_automation_task: weekly report leads",
+         select(Lead).where(Lead.user_id == user_id).order_by(Lead.created_at.desc()).limit(20)),
+        ("enqueue_due_jobs: due automations",
+         select(Automation).where(Automation.is_active).where(Automation.frequency != "once")
+         .where(Automation.next_run_at.isnot(None)).where(Automation.next_run_at <= now)),
+    ]
+
+
+def _pg_seq_scans(plan: Dict) -> List[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name", "?"))
+    for child in plan.get("Plans", []):
+        found.extend(_pg_seq_scans(child))
+    return found
+
+
+def explain(conn, stmt) -> Tuple[List[str], List[str]]:
+    """Return (plan lines, tables read by a sequential scan)."""
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "postgresql":
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+        plan = plan if isinstance(plan, list) else json.loads(plan)
+        lines = [line for line in conn.exec_driver_sql(f"EXPLAIN {sql}").scalars()]
+        return lines, _pg_seq_scans(plan[0]["Plan"])
+    lines = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    # SQLite: "SCAN <table>" without an index is a full table scan; "SEARCH ... USING INDEX" is what we want
+    scans = [line.split()[1] for line in lines if line.startswith("SCAN ") and "USING" not in line
+             and line.split()[1] in ("leads", "automations", "users")]
+    return lines, scans
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fail if any hot query plans a sequential scan")
+    parser.add_argument("--database-url", help="scratch database (default: a temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--leads-per-user", type=int, default=500)
+    parser.add_argument("--automations-per-user", type=int, default=50)
+    parser.add_argument("--verbose", action="store_true", help="print every plan, not just failures")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'explain_check.db')}"
+    if database_url.startswith("postgres://"):
+        database_url = database_url.replace("postgres://", "postgresql://", 1)
+
+    migrate(database_url)
+    engine = create_engine(database_url)
+    seed(engine, args.users, args.leads_per_user, args.automations_per_user)
+
+    failures = 0
+    with engine.connect() as conn:
+        for name, stmt in hot_queries(user_id=max(1, args.users // 2)):
+            lines, scans = explain(conn, stmt)
+            status = "FAIL" if scans else "ok"
+            print(f"[EXPLAIN] {status:<4} {name}" + (f" (sequential scan on {', '.join(scans)})" if scans else ""))
+            if scans or args.verbose:
+                for line in lines:
+                    print(f"         {line}")
+            failures += bool(scans)
+
+    if failures:
+        print(f"[EXPLAIN] {failures} hot queries fall back to sequential scans")
+        return 1
+    print("[EXPLAIN] All hot queries use indexes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
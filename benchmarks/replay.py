@@ -0,0 +1,104 @@
+"""
+Offline replay transport for tools/free_scraper.py.
+Serves recorded HTML pages from benchmarks/fixtures through a requests adapter mounted
+on the shared HTTP session, so scraper code runs unchanged with no network access.
+
+Refresh a fixture from the live site (needs network):
+    python -m benchmarks.replay record "https://www.bing.com/search?q=..." bing_serp.html
+"""
+
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_manifest() -> Dict:
+    with open(os.path.join(FIXTURES_DIR, "manifest.json"), "r") as f:
+        return json.load(f)
+
+
+class ReplayAdapter(BaseAdapter):
+    """Answers requests from fixture files; unknown URLs get a 404 instead of hitting the network."""
+
+    def __init__(self, routes: Optional[List[Dict]] = None):
+        super().__init__()
+        self.routes = routes if routes is not None else load_manifest()["routes"]
+        self._pages: Dict[str, bytes] = {}
+        self.requests_served = 0
+
+    def _body(self, fixture: str) -> bytes:
+        if fixture not in self._pages:
+            with open(os.path.join(FIXTURES_DIR, fixture), "rb") as f:
+                self._pages[fixture] = f.read()
+        return self._pages[fixture]
+
+    def match(self, url: str) -> Optional[str]:
+        parsed = urlparse(url)
+        for route in self.routes:
+            if route["host"] == parsed.netloc and parsed.path.startswith(route["path"]):
+                return route["fixture"]
+        return None
+
+    def send(self, request, **kwargs):
+        fixture = self.match(request.url)
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        response.encoding = "utf-8"
+        response.headers = CaseInsensitiveDict({"Content-Type": "text/html; charset=utf-8"})
+        if fixture:
+            response.status_code = 200
+            response._content = self._body(fixture)
+        else:
+            response.status_code = 404
+            response._content = b""
+        self.requests_served += 1
+        return response
+
+    def close(self):
+        pass
+
+
+def install_replay(routes: Optional[List[Dict]] = None) -> ReplayAdapter:
+    """
+    Route the shared scraper session through fixtures and switch off the SERP cache
+    and per-host throttle, so every call actually parses a page and nothing sleeps.
+    """
+    from tools.http_client import get_scraper_session
+    from tools.serp_cache import get_serp_cache
+    from tools.rate_limiter import get_throttle
+
+    adapter = ReplayAdapter(routes)
+    session = get_scraper_session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    get_serp_cache().enabled = False
+    get_throttle().enabled = False
+    return adapter
+
+
+def record(url: str, fixture: str) -> None:
+    """Fetch a live page with the scraper's headers and save it as a fixture."""
+    from tools.free_scraper import get_headers
+
+    response = requests.get(url, headers=get_headers(), timeout=20)
+    response.raise_for_status()
+    with open(os.path.join(FIXTURES_DIR, fixture), "wb") as f:
+        f.write(response.content)
+    print(f"[REPLAY] Saved {len(response.content)} bytes from {url} to {fixture}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "record":
+        record(sys.argv[2], sys.argv[3])
+    else:
+        print("Usage: python -m benchmarks.replay record <url> <fixture.html>")
+        sys.exit(1)
@@ -14,7 +14,7 @@ def setup_agent() -> Controller:  # creates and returns a Controller with all co
     state = AgentState()  # create agent state to track tasks and progress (AgentState is in models.py)
     tool_registry = ToolRegistry()  # create tool registry to store available tools (ToolRegistry class is in tools/base.py, creates empty registry)
     register_tools(tool_registry)  # register all tools in the registry (register_tools function is in tools/implementation.py, takes ToolRegistry object as parameter)
-    controller_config = ControllerConfig()
+    controller_config = ControllerConfig(max_parallel_tasks=int(os.getenv("AGENT_MAX_PARALLEL_TASKS", "4")))  # how many independent tasks run at once (1 = one after another)
     planner = Planner(state, tool_registry)  # create planner to decide what to do (Planner.__init__ method is in planner.py, takes state and tool_registry as parameters)
     controller = Controller(state, planner, tool_registry, controller_config)  # create controller to manage everything (Controller.__init__ method is in controller.py, takes state, planner, tool_registry, and config as parameters)
     return controller # return the controller so it can be used to run the agent
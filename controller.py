@@ -1,8 +1,10 @@
 """ Controller module that manages the agent and coordinates planner, tools and state. """
 from ntpath import exists
-from models import AgentState, ToolCall, ControllerConfig, Observation, ToolStatus, TaskStatus  # import data models we need
+from models import AgentState, Task, ToolCall, ControllerConfig, Observation, ToolStatus, TaskStatus  # import data models we need
 from planner import Planner # import planner so controller can ask what to do next
-from tools.base import ToolRegistry  # import tool registry so controller can call tools 
+from tools.base import Tool, ToolRegistry, bind_app_context  # import tool registry so controller can call tools 
+from concurrent.futures import ThreadPoolExecutor # runs independent tasks at the same time
+from typing import List, Tuple # type hints for planned batches
 import time # for tracking execution time 
 
 class Controller: # main loop that manages the robot and manages automation sytem or  allcomponents
@@ -13,44 +15,81 @@ class Controller: # main loop that manages the robot and manages automation syte
         self.controller_config = controller_config  # save config so controller can check max_steps and other settings
 
     def run(self, user_goal: str) -> str:  # main method that starts the agent with a user goal like "Email Sarah the daily summary"
-        # Step 1: Break user goal into tasks and register them
-        task_steps = self.planner.break_goal_into_tasks(user_goal)  # ask planner to break user goal into steps (break_goal_into_tasks method is in planner.py)
-        for task_goal in task_steps:  # register each step as a task
-            self.state.register_task(task_goal)  # create and store each task in the state (register_task method is in models.py AgentState class)
+        # Step 1: Break user goal into tasks and register them with their dependencies (register_tasks method is in planner.py)
+        self.planner.register_tasks(user_goal)  # e.g. two searches with no dependencies, then a pitch that waits for both
         
-        # Step 2: Main loop - keep asking planner what to do and executing tools until done
-        while self.state.step_count < self.controller_config.max_steps:  # keep looping until we hit max steps limit (step_count is in models.py AgentState, max_steps is in models.py ControllerConfig)
-            self.state.step_count += 1  # increment step counter to track how many loops we've done
-            tool_call = self.planner.plan_next_action()  # ask planner what tool to call next (plan_next_action method is in planner.py, returns Optional[ToolCall] from models.py)
-            if not tool_call:  # if planner returns None, no more actions to take
-                print("[DEBUG] No more tool calls, exiting loop")  # debug: show when planner returns None
-                break  # exit loop, we're done with all tasks
-            print(f"[DEBUG] Planner returned tool: {tool_call.spec.name}")  # debug: show which tool planner chose
-            
-            # Execute the tool call (ToolCall class is in models.py, Tool.execute method is in tools/base.py)
-            tool = self.tool_registry.get(tool_call.spec.name)  # get tool from registry: tool_call.spec.name gives us the tool name (tool_call is ToolCall from models.py, spec is ToolSpec from models.py, then ToolRegistry.get in tools/base.py)
-            if not tool:  # if tool not found in registry, skip this tool call
-                continue  # skip this iteration, tool doesn't exist
-            tool_call.status = ToolStatus.RUNNING  # mark tool as running (ToolStatus enum is in models.py)
-            tool_call.started_at = time.time()  # record when tool call started (time.time() is Python standard library)
-            observation = tool.execute(tool_call.arguments)  # execute the tool with arguments and get result (Tool.execute method is in tools/base.py, returns Observation from models.py)
-            print(f"[DEBUG] Tool: {tool_call.spec.name}, Status: {observation.status}, Output: {observation.output_text}")  # debug: show what tool executed and result
-            tool_call.finished_at = time.time()  # record when tool execution finished (time.time() is Python standard library)
-            tool_call.status = observation.status  # update tool_call status based on observation (observation.status is ToolStatus from models.py)
-            self.state.append_tool_call(tool_call)  # store tool call in the state history (append_tool_call method is in models.py AgentState class)
-            self.state.append_observation(observation)  # store observation in the state history (append_observation method is in models.py AgentState class)
-            
-            # Mark current task as completed if tool succeeded (TaskStatus enum is in models.py)
-            active_task = self.state.get_active_task()  # get the current active task (get_active_task method is in models.py AgentState)
-            if active_task and observation.status == ToolStatus.SUCCEDED:  # if task exists and tool succeeded
-                active_task.status = TaskStatus.COMPLETED  # mark task as completed (TaskStatus.COMPLETED is in models.py)
-                self.state.set_current_task(None)  # clear current task so planner can find next one (set_current_task method is in models.py AgentState)
-                print(f"[DEBUG] Task '{active_task.goal}' marked as completed")  # debug: show task completion
+        # Step 2: Main loop - run every task whose dependencies are done, side by side, until nothing is left
+        width = max(1, self.controller_config.max_parallel_tasks)  # how many tools may run at once (max_parallel_tasks is in models.py ControllerConfig)
+        executor = ThreadPoolExecutor(max_workers=width, thread_name_prefix="agent") if width > 1 else None  # only spun up when parallelism is allowed
+        try:
+            while self.state.step_count < self.controller_config.max_steps:  # keep looping until we hit max steps limit (step_count is in models.py AgentState, max_steps is in models.py ControllerConfig)
+                batch = self._plan_ready_tasks()  # ask planner for a tool call for every ready task
+                if not batch:  # nothing ready: every task finished, failed or is waiting on a failed one
+                    print("[DEBUG] No more tool calls, exiting loop")  # debug: show when there is nothing left to run
+                    break  # exit loop, we're done with all tasks
+                batch = batch[:self.controller_config.max_steps - self.state.step_count]  # never go past max_steps
+                self.state.step_count += len(batch)  # one step per tool call, as before
+                
+                if executor and len(batch) > 1:  # independent tasks run concurrently; each thread gets its own Flask app context (bind_app_context is in tools/base.py)
+                    execute = bind_app_context(self._execute)  # bound here, on the thread that has the app context
+                    observations = list(executor.map(lambda item: execute(item[1], item[2]), batch))
+                else:
+                    observations = [self._execute(tool, tool_call) for _, tool, tool_call in batch]
+                
+                # Merge results in task order (not completion order) so the state is the same on every run
+                for (task, _, tool_call), observation in zip(batch, observations):
+                    self._record(task, tool_call, observation)
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
         
+        for task in self.state.fail_blocked_tasks():  # tasks whose dependency failed never ran (fail_blocked_tasks method is in models.py AgentState)
+            print(f"[DEBUG] Task '{task.goal}' skipped, a task it depends on failed")
         return "Agent execution completed"  # return completion message
 
+    def _plan_ready_tasks(self) -> List[Tuple[Task, Tool, ToolCall]]:  # planning stays on this thread: the planner reads state that only this thread writes
+        batch = []
+        while True:
+            progressed = False
+            for task in self.state.ready_tasks():  # ready_tasks method is in models.py AgentState
+                tool_call = self.planner.plan_action(task)  # plan_action method is in planner.py, returns Optional[ToolCall]
+                if not tool_call:  # no tool for this task (e.g. nothing to email): count it as done so its dependents can go
+                    task.status = TaskStatus.COMPLETED
+                    progressed = True
+                    continue
+                tool = self.tool_registry.get(tool_call.spec.name)  # get tool from registry (ToolRegistry.get in tools/base.py)
+                if not tool:  # tool doesn't exist, the task can never succeed
+                    task.status = TaskStatus.FAILED
+                    task.add_note(f"Tool '{tool_call.spec.name}' is not registered")
+                    progressed = True
+                    continue
+                print(f"[DEBUG] Planner returned tool: {tool_call.spec.name} for task '{task.goal}'")  # debug: show which tool planner chose
+                task.status = TaskStatus.IN_PROGRESS  # keeps it out of ready_tasks while it runs
+                batch.append((task, tool, tool_call))
+            if batch or not progressed:  # completing a tool-less task can unblock others, so look again before giving up
+                return batch
 
+    def _execute(self, tool: Tool, tool_call: ToolCall) -> Observation:  # runs on a worker thread: must not touch self.state
+        tool_call.status = ToolStatus.RUNNING  # mark tool as running (ToolStatus enum is in models.py)
+        tool_call.started_at = time.time()  # record when tool call started (time.time() is Python standard library)
+        retries = min(tool.spec.max_retries, self.controller_config.max_reties_per_tool)  # the spec asks, the controller caps (max_reties_per_tool is in models.py ControllerConfig)
+        observation = tool.execute(tool_call.arguments, tool_call=tool_call, max_retries=retries)  # execute the tool with its deadline and retries, get result (Tool.execute method is in tools/base.py, returns Observation from models.py)
+        tool_call.finished_at = time.time()  # record when tool execution finished (time.time() is Python standard library)
+        print(f"[DEBUG] Tool: {tool_call.spec.name}, Status: {observation.status}, Output: {observation.output_text}")  # debug: show what tool executed and result
+        return observation
 
-
-
-
+    def _record(self, task: Task, tool_call: ToolCall, observation: Observation) -> None:  # merge one result into the state (main thread only)
+        observation.call_id = tool_call.call_id  # link the observation to the call that produced it
+        tool_call.status = observation.status  # update tool_call status based on observation (observation.status is ToolStatus from models.py)
+        tool_call.error = observation.error
+        self.state.append_tool_call(tool_call)  # store tool call in the state history (append_tool_call method is in models.py AgentState class)
+        self.state.append_observation(observation)  # store observation in the state history (append_observation method is in models.py AgentState class)
+        task.attempts += tool_call.attempts
+        
+        if observation.status == ToolStatus.SUCCEDED:  # mark task as completed if tool succeeded (TaskStatus enum is in models.py)
+            task.status = TaskStatus.COMPLETED
+            print(f"[DEBUG] Task '{task.goal}' marked as completed")  # debug: show task completion
+        else:  # the tool runtime already retried with backoff, so the task has failed
+            task.status = TaskStatus.FAILED
+            task.add_note(f"Failed after {task.attempts} attempt(s): {observation.error}")
+            print(f"[DEBUG] Task '{task.goal}' failed after {task.attempts} attempt(s), latencies {tool_call.attempt_latencies}")
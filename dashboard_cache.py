@@ -0,0 +1,133 @@
+"""
+Per-user dashboard cache.
+Entries are keyed by (user id, users.cache_version, name). The version is bumped in the same
+transaction as any lead, automation or subscription tier change (see database.py), so a new
+version simply stops matching the old entries - nothing has to be deleted - and they age out
+through LRU eviction / TTL. Backed by Redis when REDIS_URL is set, otherwise an in-process LRU.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+DASHBOARD_CACHE_ENABLED = os.getenv("DASHBOARD_CACHE_ENABLED", "true").lower() == "true"
+# Also bounds staleness for things no write touches, like the month rolling over
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "300"))  # seconds
+DASHBOARD_CACHE_MAX_ENTRIES = int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "2000"))
+
+
+class LocalDashboardBackend:
+    """Single-process backend: an OrderedDict in LRU order with per-entry expiry."""
+
+    name = "local"
+
+    def __init__(self, max_entries: int = DASHBOARD_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisDashboardBackend:
+    """Shared backend for multiple web processes: plain keys with EX, Redis evicts the rest."""
+
+    name = "redis"
+
+    def __init__(self, redis_conn, prefix: str = "dash:"):
+        self.redis = redis_conn
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.redis.get(self.prefix + key)
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        self.redis.set(self.prefix + key, value, ex=ttl)
+
+    def clear(self) -> None:
+        keys = list(self.redis.scan_iter(match=f"{self.prefix}*"))
+        if keys:
+            self.redis.delete(*keys)
+
+
+class DashboardCache:
+    def __init__(self, backend, ttl: int = DASHBOARD_CACHE_TTL, enabled: bool = DASHBOARD_CACHE_ENABLED):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(user, name: str) -> str:
+        return f"{user.id}:{user.cache_version or 0}:{name}"
+
+    def get_or_build(self, user, name: str, builder: Callable[[], Any]) -> Any:
+        """Cached value for the user's current version, calling builder() on a miss. Values must be JSON-able."""
+        if not self.enabled:
+            return builder()
+        key = self.make_key(user, name)
+        try:
+            cached = self.backend.get(key)
+        except Exception as e:
+            print(f"[DASHBOARD CACHE] Read failed, building fresh: {str(e)}")
+            cached = None
+        if cached is not None:
+            self.hits += 1
+            return json.loads(cached)
+
+        self.misses += 1
+        value = builder()
+        try:
+            self.backend.set(key, json.dumps(value), self.ttl)
+        except Exception as e:
+            print(f"[DASHBOARD CACHE] Write failed: {str(e)}")
+        return value
+
+
+_cache: Optional[DashboardCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_dashboard_cache() -> DashboardCache:
+    """Process-wide cache; picks Redis when REDIS_URL is set, the in-process LRU otherwise."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                backend = None
+                if os.getenv("REDIS_URL"):
+                    try:
+                        from job_queue import get_redis
+                        backend = RedisDashboardBackend(get_redis())
+                    except Exception as e:
+                        print(f"[DASHBOARD CACHE] Redis unavailable, falling back to in-process LRU: {str(e)}")
+                if backend is None:
+                    backend = LocalDashboardBackend()
+                _cache = DashboardCache(backend)
+    return _cache
@@ -3,9 +3,21 @@ from flask_sqlalchemy import SQLAlchemy
 import os
 from datetime import datetime
 from enum import Enum
+from urllib.parse import urlparse
 
 db = SQLAlchemy()  # database object that will be initialized with Flask app
 
+# Estimated deal value per lead, matched by keyword in the niche name (R15,000 Security, R10,000 Logistics, R8,000 Solar)
+NICHE_VALUES = [("security", 15000), ("logistics", 10000), ("solar", 8000)]
+DEFAULT_NICHE_VALUE = 5000  # default value for other niches
+
+def niche_value(niche) -> int:  # Python twin of the SQL CASE in lead_stats, for incremental rollup updates
+    niche = (niche or "").lower()
+    for keyword, amount in NICHE_VALUES:
+        if keyword in niche:
+            return amount
+    return DEFAULT_NICHE_VALUE
+
 class SubscriptionTier(Enum):  # subscription levels for monetization
     FREE = "free"  # free tier: 10 automations/month
     PRO = "pro"  # pro tier: $9.99/month, unlimited automations
@@ -21,6 +33,7 @@ class User(db.Model):  # user account model for authentication and subscriptions
     stripe_customer_id = db.Column(db.String(255), nullable=True)  # Stripe customer ID for billing
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # account creation timestamp
     automations_count = db.Column(db.Integer, default=0)  # track how many automations user has run this month
+    cache_version = db.Column(db.Integer, default=0, nullable=False, server_default="0")  # bumped when leads, automations or tier change (dashboard cache key)
     
     # Relationship to automations (one user can have many automations)
     automations = db.relationship("Automation", backref="user", lazy=True)  # link to Automation model
@@ -28,48 +41,9 @@ class User(db.Model):  # user account model for authentication and subscriptions
     integrations = db.relationship("Integration", backref="owner_user", lazy=True)
 
     def get_lead_gen_stats(self):
-        """Calculate real stats for the AI Sales Engine tracker across all niches."""
-        from database import Lead
-        
-        # 1. Total Leads Found (across all niches)
-        leads_found = Lead.query.filter_by(user_id=self.id).count()
-        
-        # 2. Total Pitches Sent (count automations that sent pitches)
-        pitches_sent = 0
-        for auto in self.automations:
-            if auto.status == "completed" and auto.result:
-                if "email sent" in auto.result.lower() or "pitch sent" in auto.result.lower():
-                    pitches_sent += 1
-        
-        # 3. Dynamic Estimated Value (R15,000 for Security, R10,000 for Logistics, R8,000 for Solar)
-        # We'll calculate a weighted average based on the leads in the CRM
-        total_value = 0
-        user_leads = Lead.query.filter_by(user_id=self.id).all()
-        for lead in user_leads:
-            niche = (lead.niche or "").lower()
-            if "security" in niche:
-                total_value += 15000
-            elif "logistics" in niche:
-                total_value += 10000
-            elif "solar" in niche:
-                total_value += 8000
-            else:
-                total_value += 5000 # Default value for other niches
-        
-        # 4. Get the most active niche for the UI title
-        active_niche = "Multi-Niche"
-        if user_leads:
-            from collections import Counter
-            niches = [l.niche for l in user_leads if l.niche]
-            if niches:
-                active_niche = Counter(niches).most_common(1)[0][0]
-
-        return {
-            "leads_found": leads_found,
-            "pitches_sent": pitches_sent,
-            "estimated_value": f"R {total_value:,}",
-            "active_niche": active_niche
-        }
+        """Stats for the AI Sales Engine tracker across all niches, read from the user_lead_stats rollup."""
+        from lead_stats import get_user_stats
+        return get_user_stats(self.id)
 
     def is_authenticated(self):  # Flask-Login requirement
         return True
@@ -125,6 +99,14 @@ class Automation(db.Model):  # stores user's automation runs and history
     result = db.Column(db.Text, nullable=True)  # result message from agent execution
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # when automation was created
     completed_at = db.Column(db.DateTime, nullable=True)  # when automation finished
+    pitches_sent = db.Column(db.Integer, default=0, nullable=False, server_default="0")  # emails this automation has sent (all runs)
+
+    __table_args__ = (
+        db.Index("ix_automations_user_created", "user_id", "created_at"),  # dashboard history
+        # Scheduler poll: only active automations ever need next_run_at looked up
+        db.Index("ix_automations_due", "next_run_at",
+                 postgresql_where=db.text("is_active"), sqlite_where=db.text("is_active = 1")),
+    )
 
 class Integration(db.Model):  # stores user's connected services (e.g., Trello, Slack)
     __tablename__ = "integrations"
@@ -148,6 +130,150 @@ class Lead(db.Model):  # stores found leads for sales prospecting
     status = db.Column(db.String(50), default="new") # new, pitched, interested, closed
     is_unlocked = db.Column(db.Boolean, default=False) # New field for Platform-Only strategy
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    email_key = db.Column(db.String(120), nullable=True)  # normalized email for dedupe (NULL = no email)
+    domain_key = db.Column(db.String(200), nullable=True)  # normalized website domain for dedupe (NULL = no website)
+
+    __table_args__ = (
+        # One lead per email and per domain for each user; NULL keys never conflict
+        db.Index("uq_leads_user_email_key", "user_id", "email_key", unique=True),
+        db.Index("uq_leads_user_domain_key", "user_id", "domain_key", unique=True),
+        db.Index("ix_leads_user_created_id", "user_id", "created_at", "id"),  # newest-first lead lists, keyset pages, counts
+        db.Index("ix_leads_user_niche", "user_id", "niche"),  # per-niche stats
+    )
+
+class LeadPackOrder(db.Model):  # one purchased (or admin-credited) lead pack, fulfilled by a background job
+    __tablename__ = "lead_pack_orders"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    reference = db.Column(db.String(120), unique=True, nullable=False)  # payment reference - fulfilment is keyed on it
+    source = db.Column(db.String(30), nullable=True)  # paystack, lemonsqueezy, admin
+    lead_count = db.Column(db.Integer, default=50)  # leads promised by the pack
+    status = db.Column(db.String(20), default="pending")  # pending, queued, running, completed, failed
+    leads_added = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+class MailSend(db.Model):  # outbound mail ledger: one row per (automation run, recipient), so queued retries never double-send
+    __tablename__ = "mail_sends"
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_key = db.Column(db.String(120), nullable=False)  # e.g. "automation-12-run-7"
+    recipient = db.Column(db.String(255), nullable=False)  # normalized email
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    automation_id = db.Column(db.Integer, db.ForeignKey("automations.id"), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)  # when a worker moved it to "sending"; stale claims are taken over
+
+    __table_args__ = (
+        db.UniqueConstraint("run_key", "recipient", name="uq_mail_sends_run_recipient"),
+    )
+
+class UserLeadStats(db.Model):  # per-user rollup kept in step with lead inserts and automation runs (see lead_stats.py)
+    __tablename__ = "user_lead_stats"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    leads_total = db.Column(db.Integer, nullable=False, default=0)
+    estimated_value = db.Column(db.BigInteger, nullable=False, default=0)  # sum of per-lead niche values (Rand)
+    pitches_sent = db.Column(db.Integer, nullable=False, default=0)
+    automations_month = db.Column(db.String(7), nullable=True)  # "YYYY-MM" the counter below belongs to
+    automations_this_month = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class UserNicheStats(db.Model):  # per-user, per-niche lead totals behind the rollup
+    __tablename__ = "user_niche_stats"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    niche = db.Column(db.String(100), primary_key=True)  # "" for leads without a niche
+    lead_count = db.Column(db.Integer, nullable=False, default=0)
+    estimated_value = db.Column(db.BigInteger, nullable=False, default=0)
+
+def normalize_email(email):  # dedupe key for an email address ("" -> None)
+    email = (email or "").strip().lower()
+    return email or None
+
+def normalize_domain(website):  # dedupe key for a website: bare lowercase host without www. ("" -> None)
+    website = (website or "").strip().lower()
+    if not website:
+        return None
+    host = urlparse(website if "//" in website else f"//{website}").hostname or ""
+    if host.startswith("www."):
+        host = host[4:]
+    return host or None
+
+@db.event.listens_for(Lead, "before_insert")
+def set_lead_dedupe_keys(mapper, connection, lead):  # keep dedupe keys in sync for ORM writes
+    lead.email_key = normalize_email(lead.email)
+    lead.domain_key = normalize_domain(lead.website)
+
+def _dedupe_key_taken(connection, lead, column, key):  # another of the user's leads already holds this key
+    return key is not None and connection.execute(
+        db.select(Lead.id).where(Lead.user_id == lead.user_id, column == key, Lead.id != lead.id).limit(1)
+    ).first() is not None
+
+@db.event.listens_for(Lead, "before_update")
+def update_lead_dedupe_keys(mapper, connection, lead):  # only when email/website changed: duplicates from 0002 keep their NULL keys
+    state = db.inspect(lead)
+    for source, key_name, column, normalize in (("email", "email_key", Lead.email_key, normalize_email),
+                                                ("website", "domain_key", Lead.domain_key, normalize_domain)):
+        if not state.attrs[source].history.has_changes():
+            continue
+        key = normalize(getattr(lead, source))
+        if _dedupe_key_taken(connection, lead, column, key):
+            # Same rule as update_lead_emails: keep the edit, but the key stays with the lead that has it
+            print(f"[DB] Lead {lead.id}: {source} {key} is already on another lead of user {lead.user_id}, not deduping on it")
+            key = None
+        setattr(lead, key_name, key)
+
+def insert_ignoring_conflicts(model, rows, *returning):  # multi-row INSERT that skips rows hitting a unique index
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        stmt = pg_insert(model).values(rows).on_conflict_do_nothing()
+    elif dialect == "sqlite":
+        stmt = db.insert(model).values(rows).prefix_with("OR IGNORE")
+    else:
+        # No portable "ignore conflicts" insert: fall back to one savepoint per row
+        from sqlalchemy.exc import IntegrityError
+        inserted = []
+        for row in rows:
+            try:
+                with db.session.begin_nested():
+                    stmt = db.insert(model).values(row)
+                    result = db.session.execute(stmt.returning(*returning) if returning else stmt)
+                    if returning:
+                        inserted.append(tuple(result.one()))
+            except IntegrityError:
+                continue
+        return inserted
+    if not returning:
+        db.session.execute(stmt)
+        return []
+    return [tuple(row) for row in db.session.execute(stmt.returning(*returning))]
+
+def bump_cache_version(user_id, connection=None):  # invalidate the user's cached dashboard (see dashboard_cache.py)
+    stmt = db.update(User).where(User.id == user_id).values(cache_version=User.cache_version + 1)
+    (connection or db.session).execute(stmt)
+
+@db.event.listens_for(Lead, "after_insert")
+@db.event.listens_for(Lead, "after_update")
+@db.event.listens_for(Lead, "after_delete")
+@db.event.listens_for(Automation, "after_insert")
+@db.event.listens_for(Automation, "after_update")
+@db.event.listens_for(Automation, "after_delete")
+def bump_owner_cache_version(mapper, connection, target):  # any ORM write to a lead/automation invalidates its owner's dashboard
+    bump_cache_version(target.user_id, connection)
+
+@db.event.listens_for(User, "before_update")
+def bump_cache_version_on_tier_change(mapper, connection, user):  # tier changes what the dashboard shows
+    if db.inspect(user).attrs.subscription_tier.history.has_changes():
+        user.cache_version = User.cache_version + 1
 
 def init_db(app):  # initialize database with Flask app (called from app.py)
     db.init_app(app)  # connect database to Flask app
@@ -0,0 +1,98 @@
+"""
+Streaming lead export (CSV / NDJSON, optionally gzipped).
+Rows are read through a server-side cursor in EXPORT_YIELD_PER batches and written
+out as they arrive, so memory stays flat however many leads a user has.
+"""
+import csv
+import io
+import json
+import os
+import zlib
+from typing import Any, Iterable, Iterator, Tuple
+
+from database import db, Lead
+
+EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "1000"))
+EXPORT_CHUNK_BYTES = 64 * 1024  # response body is flushed in pieces of roughly this size
+
+CSV_HEADER = ["Name", "Email", "Company", "Website", "Niche", "Status", "Created At"]
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "leads.csv"),
+    "ndjson": ("application/x-ndjson", "leads.ndjson"),
+}
+
+
+def iter_lead_rows(user_id: int, yield_per: int = EXPORT_YIELD_PER) -> Iterator[Tuple[Any, ...]]:
+    """Plain column tuples (no ORM objects) newest first, fetched yield_per rows at a time."""
+    stmt = (
+        db.select(Lead.name, Lead.email, Lead.website, Lead.niche, Lead.status, Lead.created_at)
+        .where(Lead.user_id == user_id)
+        .order_by(Lead.created_at.desc())
+        .execution_options(yield_per=yield_per)
+    )
+    yield from db.session.execute(stmt)
+
+
+def _chunked(pieces: Iterable[str]) -> Iterator[bytes]:
+    """Join small strings into ~EXPORT_CHUNK_BYTES byte chunks."""
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def iter_csv(rows: Iterable[Tuple[Any, ...]]) -> Iterator[bytes]:
+    line = io.StringIO()
+    writer = csv.writer(line)
+
+    def take():
+        # One reusable buffer: hand over what the writer produced, then reset it
+        text = line.getvalue()
+        line.seek(0)
+        line.truncate()
+        return text
+
+    def lines():
+        writer.writerow(CSV_HEADER)
+        yield take()
+        for name, email, website, niche, status, created_at in rows:
+            writer.writerow([name, email, "", website, niche, status, created_at.isoformat() if created_at else ""])
+            yield take()
+
+    return _chunked(lines())
+
+
+def iter_ndjson(rows: Iterable[Tuple[Any, ...]]) -> Iterator[bytes]:
+    def lines():
+        for name, email, website, niche, status, created_at in rows:
+            yield json.dumps({
+                "name": name,
+                "email": email,
+                "website": website,
+                "niche": niche,
+                "status": status,
+                "created_at": created_at.isoformat() if created_at else None,
+            }) + "\n"
+
+    return _chunked(lines())
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a byte stream on the fly into a single gzip member."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip header/trailer
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(user_id: int, fmt: str = "csv", compress: bool = False) -> Iterator[bytes]:
+    rows = iter_lead_rows(user_id)
+    body = iter_ndjson(rows) if fmt == "ndjson" else iter_csv(rows)
+    return gzip_stream(body) if compress else body
@@ -0,0 +1,185 @@
+"""
+Streaming CSV lead import.
+Uploads are decoded incrementally and inserted in fixed-size chunks through
+lead_store.bulk_upsert_leads, so memory stays flat regardless of file size.
+Large files are staged in Redis and imported by tasks.import_leads_task.
+"""
+import codecs
+import csv
+import os
+import re
+import uuid
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from database import db
+from lead_store import bulk_upsert_leads, IMPORT_BATCH_SIZE
+
+# Uploads bigger than this go to the queue (when Redis is configured)
+IMPORT_INLINE_MAX_BYTES = int(os.getenv("IMPORT_INLINE_MAX_BYTES", str(1024 * 1024)))
+IMPORT_READ_CHUNK = 256 * 1024  # bytes read/decoded (and staged in Redis) at a time
+IMPORT_UPLOAD_TTL = int(os.getenv("IMPORT_UPLOAD_TTL", str(6 * 3600)))  # staged uploads expire if never imported
+IMPORT_JOB_TIMEOUT = int(os.getenv("IMPORT_JOB_TIMEOUT", "3600"))
+
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def iter_decoded_lines(raw, chunk_size: int = IMPORT_READ_CHUNK) -> Iterator[str]:
+    """
+    Decode a binary stream chunk by chunk and yield lines (newlines kept, so csv can
+    still parse quoted fields that span lines). A UTF-8 BOM is dropped.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="ignore")
+    pending = ""
+    while True:
+        chunk = raw.read(chunk_size)
+        if not chunk:
+            break
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def parse_lead_row(row: Dict[Optional[str], Any]) -> Optional[Dict[str, str]]:
+    """Map a CSV row (any header case) to a lead dict; None if the row is unusable."""
+    fields = {(key or "").strip().lower(): value.strip() for key, value in row.items() if isinstance(value, str)}
+    name = fields.get("name", "")
+    email = fields.get("email", "")
+    if not name or (email and not EMAIL_RE.match(email)):
+        return None
+    return {
+        "name": name,
+        "email": email,
+        "website": fields.get("website", ""),
+        "niche": fields.get("niche") or "Security Services",
+        "status": fields.get("status") or "new",
+    }
+
+
+def import_csv_stream(user_id: int, raw, batch_size: int = IMPORT_BATCH_SIZE,
+                      on_progress: Optional[Callable[[Dict[str, int]], Any]] = None) -> Dict[str, int]:
+    """
+    Import leads from a binary CSV stream, committing every batch_size rows.
+    on_progress(summary) is called after each commit.
+    Returns {"rows", "added", "duplicates", "rejected"}.
+    """
+    summary = {"rows": 0, "added": 0, "duplicates": 0, "rejected": 0}
+    batch = []
+
+    def flush():
+        result = bulk_upsert_leads(user_id, batch, unlock=True)
+        db.session.commit()
+        summary["added"] += result["inserted"]
+        summary["duplicates"] += result["skipped"]
+        batch.clear()
+        if on_progress:
+            on_progress(summary)
+
+    for row in csv.DictReader(iter_decoded_lines(raw)):
+        summary["rows"] += 1
+        lead = parse_lead_row(row)
+        if lead is None:
+            summary["rejected"] += 1
+            continue
+        batch.append(lead)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return summary
+
+
+class RedisUploadReader:
+    """File-like reader over an upload staged in a Redis list; read() returns one staged chunk."""
+
+    def __init__(self, redis_conn, key: str):
+        self.redis = redis_conn
+        self.key = key
+        self.index = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.redis.lindex(self.key, self.index)
+        self.index += 1
+        return chunk or b""
+
+
+def stage_upload(redis_conn, stream, key: str) -> int:
+    """Copy an upload into Redis chunk by chunk (never holding the whole file). Returns bytes staged."""
+    total = 0
+    while True:
+        chunk = stream.read(IMPORT_READ_CHUNK)
+        if not chunk:
+            break
+        redis_conn.rpush(key, chunk)
+        total += len(chunk)
+    redis_conn.expire(key, IMPORT_UPLOAD_TTL)
+    return total
+
+
+def upload_size(file_storage) -> int:
+    stream = file_storage.stream
+    try:
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+        stream.seek(0)
+        return size
+    except Exception:
+        return file_storage.content_length or 0
+
+
+def start_import(user_id: int, file_storage) -> Dict[str, Any]:
+    """
+    Import small uploads inline; stage large ones in Redis and queue tasks.import_leads_task.
+    Returns {"queued": False, "summary": {...}} or {"queued": True, "job_id": ...}.
+    """
+    from job_queue import get_queue
+
+    queue = get_queue() if upload_size(file_storage) > IMPORT_INLINE_MAX_BYTES else None
+    if not queue:
+        return {"queued": False, "summary": import_csv_stream(user_id, file_storage.stream)}
+
+    job_id = f"import-{uuid.uuid4().hex}"
+    upload_key = f"lead-import:{job_id}"
+    size = stage_upload(queue.connection, file_storage.stream, upload_key)
+    queue.enqueue(
+        "tasks.import_leads_task", user_id, upload_key,
+        job_id=job_id, job_timeout=IMPORT_JOB_TIMEOUT,
+        meta={"user_id": user_id, "bytes": size},
+    )
+    print(f"[IMPORT] Queued {size} byte CSV import {job_id} for user {user_id}")
+    return {"queued": True, "job_id": job_id}
+
+
+def get_import_status(job_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+    """Progress of a queued import, or None if it doesn't exist / isn't this user's."""
+    from rq.job import Job
+    from rq.exceptions import NoSuchJobError
+    from job_queue import get_redis
+
+    redis_conn = get_redis()
+    if not redis_conn or not job_id.startswith("import-"):
+        return None
+    try:
+        job = Job.fetch(job_id, connection=redis_conn)
+    except NoSuchJobError:
+        return None
+    if job.meta.get("user_id") != user_id:
+        return None
+
+    status = job.get_status()
+    status = getattr(status, "value", status)
+    progress = job.meta.get("progress") or {}
+    return {
+        "job_id": job_id,
+        "status": status,
+        "done": status in ("finished", "failed", "stopped", "canceled"),
+        "rows": progress.get("rows", 0),
+        "added": progress.get("added", 0),
+        "duplicates": progress.get("duplicates", 0),
+        "rejected": progress.get("rejected", 0),
+        "error": job.meta.get("error"),
+    }
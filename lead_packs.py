@@ -0,0 +1,144 @@
+"""
+Lead pack fulfilment.
+A paid pack becomes a LeadPackOrder keyed by its payment reference and is filled by
+tasks.fulfil_lead_pack_task, so payment redirects return immediately and a retried
+redirect (or a webhook arriving too) can never fill the same pack twice.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from database import db, LeadPackOrder
+
+LEAD_PACK_NICHES = ["Security Services", "Solar Energy"]
+LEAD_PACK_JOB_TIMEOUT = int(os.getenv("LEAD_PACK_JOB_TIMEOUT", "1800"))
+# A "running" order older than this is assumed to belong to a dead worker and may be picked up again
+LEAD_PACK_STALE_MINUTES = int(os.getenv("LEAD_PACK_STALE_MINUTES", "45"))
+
+ACTIVE_JOB_STATUSES = ("queued", "started", "deferred", "scheduled")
+
+
+def job_id_for(reference: str) -> str:
+    return f"leadpack-{reference}"
+
+
+def get_or_create_order(user_id: int, reference: str, lead_count: int, source: str) -> LeadPackOrder:
+    """The order for a payment reference, creating it on first sight (safe against concurrent redirects)."""
+    order = LeadPackOrder.query.filter_by(reference=reference).first()
+    if order:
+        return order
+    order = LeadPackOrder(user_id=user_id, reference=reference, lead_count=lead_count, source=source, status="pending")
+    db.session.add(order)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        order = LeadPackOrder.query.filter_by(reference=reference).first()
+    return order
+
+
+def _job_active(queue, reference: str) -> bool:
+    from rq.job import Job
+    from rq.exceptions import NoSuchJobError
+    try:
+        status = Job.fetch(job_id_for(reference), connection=queue.connection).get_status()
+    except NoSuchJobError:
+        return False
+    return getattr(status, "value", status) in ACTIVE_JOB_STATUSES
+
+
+def queue_fulfilment(order: LeadPackOrder) -> LeadPackOrder:
+    """
+    Make sure the order is being filled: enqueue the job unless it is done or already queued.
+    Without Redis the pack is filled inline, as before.
+    """
+    from job_queue import get_queue
+
+    if order.status in ("completed", "running"):
+        return order
+    queue = get_queue()
+    if not queue:
+        fulfil_order(order.reference)
+        db.session.refresh(order)
+        return order
+    # Conditional update so a worker that already picked the order up is never overwritten
+    LeadPackOrder.query.filter(
+        LeadPackOrder.id == order.id, LeadPackOrder.status.in_(("pending", "failed"))
+    ).update({"status": "queued"}, synchronize_session=False)
+    db.session.commit()
+    if not _job_active(queue, order.reference):
+        queue.enqueue(
+            "tasks.fulfil_lead_pack_task", order.reference,
+            job_id=job_id_for(order.reference), job_timeout=LEAD_PACK_JOB_TIMEOUT,
+        )
+        print(f"[Lead Pack] Queued fulfilment of {order.reference} for user {order.user_id}")
+    db.session.refresh(order)
+    return order
+
+
+def _claim(order: LeadPackOrder) -> bool:
+    """Atomically move the order to running; False if someone else has it or it is already filled."""
+    stale_before = datetime.utcnow() - timedelta(minutes=LEAD_PACK_STALE_MINUTES)
+    claimed = LeadPackOrder.query.filter(
+        LeadPackOrder.id == order.id,
+        db.or_(
+            LeadPackOrder.status.in_(("pending", "queued", "failed")),
+            db.and_(LeadPackOrder.status == "running", LeadPackOrder.started_at < stale_before),
+        ),
+    ).update({"status": "running", "started_at": datetime.utcnow(), "error": None}, synchronize_session=False)
+    db.session.commit()
+    return claimed == 1
+
+
+def fulfil_order(reference: str) -> Dict[str, Any]:
+    """Scrape and save the pack's leads. Idempotent: a filled or in-progress order is left alone."""
+    from tools.free_scraper import iter_leads
+    from tools.implementation import enrich_lead_emails
+    from lead_store import save_leads_stream
+
+    order = LeadPackOrder.query.filter_by(reference=reference).first()
+    if not order:
+        return {"status": "skipped", "message": "Unknown lead pack reference"}
+    if not _claim(order):
+        db.session.refresh(order)
+        return {"status": "skipped", "message": f"Lead pack already {order.status}", "leads_added": order.leads_added}
+
+    try:
+        new_leads = []
+        leads_per_niche = max(1, (order.lead_count or 50) // len(LEAD_PACK_NICHES))
+        for niche in LEAD_PACK_NICHES:
+            # Paid leads are unlocked straight away
+            result = save_leads_stream(order.user_id, iter_leads(niche, "South Africa", max_leads=leads_per_niche), unlock=True)
+            new_leads.extend(result["new_leads"])
+        enrich_lead_emails(new_leads)
+
+        db.session.refresh(order)
+        order.status = "completed"
+        order.leads_added = len(new_leads)
+        order.completed_at = datetime.utcnow()
+        db.session.commit()
+        print(f"[Lead Pack] Generated {order.leads_added} leads for user {order.user_id} ({reference})")
+        return {"status": "completed", "leads_added": order.leads_added}
+    except Exception as e:
+        db.session.rollback()
+        order = LeadPackOrder.query.filter_by(reference=reference).first()
+        order.status = "failed"
+        order.error = str(e)
+        db.session.commit()
+        print(f"[Lead Pack Error] {reference}: {str(e)}")
+        raise
+
+
+def order_status(reference: str) -> Optional[Dict[str, Any]]:
+    order = LeadPackOrder.query.filter_by(reference=reference).first()
+    if not order:
+        return None
+    return {
+        "reference": order.reference,
+        "status": order.status,
+        "done": order.status in ("completed", "failed"),
+        "lead_count": order.lead_count,
+        "leads_added": order.leads_added or 0,
+    }
@@ -0,0 +1,218 @@
+"""
+Per-user lead stats rollup (user_lead_stats + user_niche_stats).
+Lead inserts and completed automation runs add to it inside their own transaction, so the
+dashboard and reports read one row per user instead of scanning leads. A user without a
+rollup row gets one built from the source tables on first read.
+
+Rebuild from scratch (e.g. after a migration or a manual data fix):
+    python lead_stats.py reconcile
+    python lead_stats.py reconcile --user-id 42
+"""
+import argparse
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from database import (
+    db, Automation, Lead, User, UserLeadStats, UserNicheStats,
+    NICHE_VALUES, DEFAULT_NICHE_VALUE, niche_value,
+)
+
+
+def _month(when: Optional[datetime] = None) -> str:
+    return (when or datetime.utcnow()).strftime("%Y-%m")
+
+
+def _month_start() -> datetime:
+    return datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _bump_niche(user_id: int, niche: str, count: int, value: int) -> None:
+    # Callers already hold the user's rollup row lock, so update-then-insert can't race
+    updated = db.session.execute(
+        db.update(UserNicheStats)
+        .where(UserNicheStats.user_id == user_id, UserNicheStats.niche == niche)
+        .values(lead_count=UserNicheStats.lead_count + count, estimated_value=UserNicheStats.estimated_value + value)
+    ).rowcount
+    if not updated:
+        db.session.add(UserNicheStats(user_id=user_id, niche=niche, lead_count=count, estimated_value=value))
+        db.session.flush()
+
+
+def record_leads_inserted(user_id: int, niches: Iterable[Optional[str]]) -> None:
+    """Add freshly inserted leads (one niche per lead) to the rollup. Does not commit."""
+    per_niche: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+    for niche in niches:
+        per_niche[(niche or "")[:100]][0] += 1
+        per_niche[(niche or "")[:100]][1] += niche_value(niche)
+    if not per_niche:
+        return
+    updated = db.session.execute(
+        db.update(UserLeadStats)
+        .where(UserLeadStats.user_id == user_id)
+        .values(
+            leads_total=UserLeadStats.leads_total + sum(count for count, _ in per_niche.values()),
+            estimated_value=UserLeadStats.estimated_value + sum(value for _, value in per_niche.values()),
+            updated_at=datetime.utcnow(),
+        )
+    ).rowcount
+    if not updated:
+        return  # no rollup yet - the first read builds it from the leads table, including these rows
+    for niche, (count, value) in per_niche.items():
+        _bump_niche(user_id, niche, count, value)
+
+
+def record_automation_run(user_id: int, pitches_sent: int = 0, last_run: Optional[datetime] = None) -> None:
+    """
+    Count a completed automation run (and the pitches it sent) in the rollup. Does not commit.
+    last_run is the automation's last_run before this run: automations_this_month counts
+    automations that ran this month, not runs, so rebuild_user_stats can recompute it.
+    """
+    month = _month()
+    first_this_month = last_run is None or last_run < _month_start()
+    db.session.execute(
+        db.update(UserLeadStats)
+        .where(UserLeadStats.user_id == user_id)
+        .values(
+            pitches_sent=UserLeadStats.pitches_sent + pitches_sent,
+            # The monthly counter restarts the first time a run lands in a new month
+            automations_this_month=db.case(
+                (UserLeadStats.automations_month == month,
+                 UserLeadStats.automations_this_month + (1 if first_this_month else 0)),
+                else_=1,
+            ),
+            automations_month=month,
+            updated_at=datetime.utcnow(),
+        )
+    )
+
+
+def record_pitches_sent(user_id: int, pitches_sent: int) -> None:
+    """Count pitches delivered outside an automation run (the mail queue worker). Does not commit."""
+    if not pitches_sent:
+        return
+    db.session.execute(
+        db.update(UserLeadStats)
+        .where(UserLeadStats.user_id == user_id)
+        .values(pitches_sent=UserLeadStats.pitches_sent + pitches_sent, updated_at=datetime.utcnow())
+    )
+
+
+def _niche_value_sql():
+    return db.case(
+        *[(db.func.lower(Lead.niche).like(f"%{keyword}%"), amount) for keyword, amount in NICHE_VALUES],
+        else_=DEFAULT_NICHE_VALUE,
+    )
+
+
+def rebuild_user_stats(user_id: int) -> UserLeadStats:
+    """Recompute a user's rollup from leads/automations (grouped SQL, no rows loaded). Does not commit."""
+    month_start = _month_start()
+    # Take the rollup row lock first so concurrent increments queue behind the rebuild
+    stats = db.session.query(UserLeadStats).filter_by(user_id=user_id).with_for_update().first()
+
+    per_niche = (
+        db.session.query(Lead.niche, db.func.count(Lead.id), db.func.sum(_niche_value_sql()))
+        .filter(Lead.user_id == user_id)
+        .group_by(Lead.niche)
+        .all()
+    )
+    pitches_sent, automations_this_month = (
+        db.session.query(
+            db.func.coalesce(db.func.sum(Automation.pitches_sent), 0),
+            # Same definition as record_automation_run: automations that ran at least once this month
+            db.func.count(db.case((Automation.last_run >= month_start, 1))),
+        )
+        .filter(Automation.user_id == user_id)
+        .one()
+    )
+
+    if stats is None:
+        stats = UserLeadStats(user_id=user_id)
+        db.session.add(stats)
+    stats.leads_total = sum(count for _, count, _ in per_niche)
+    stats.estimated_value = int(sum(value or 0 for _, _, value in per_niche))
+    stats.pitches_sent = int(pitches_sent)
+    stats.automations_month = _month()
+    stats.automations_this_month = automations_this_month
+    stats.updated_at = datetime.utcnow()
+
+    db.session.query(UserNicheStats).filter_by(user_id=user_id).delete()
+    merged: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+    for niche, count, value in per_niche:
+        merged[(niche or "")[:100]][0] += count
+        merged[(niche or "")[:100]][1] += int(value or 0)
+    db.session.add_all([
+        UserNicheStats(user_id=user_id, niche=niche, lead_count=count, estimated_value=value)
+        for niche, (count, value) in merged.items()
+    ])
+    db.session.flush()
+    return stats
+
+
+def get_user_stats(user_id: int) -> Dict[str, Any]:
+    """Dashboard tracker stats from the rollup: one row plus the user's top niche."""
+    stats = db.session.get(UserLeadStats, user_id)
+    if stats is None:
+        try:
+            stats = rebuild_user_stats(user_id)
+            db.session.commit()
+        except IntegrityError:
+            # Another request built it at the same moment
+            db.session.rollback()
+            stats = db.session.get(UserLeadStats, user_id)
+
+    top = (
+        db.session.query(UserNicheStats.niche)
+        .filter(UserNicheStats.user_id == user_id, UserNicheStats.niche != "")
+        .order_by(UserNicheStats.lead_count.desc(), UserNicheStats.niche)
+        .first()
+    )
+    return {
+        "leads_found": stats.leads_total,
+        "pitches_sent": stats.pitches_sent,
+        "estimated_value": f"R {int(stats.estimated_value):,}",
+        "active_niche": top[0] if top else "Multi-Niche",
+        "automations_this_month": stats.automations_this_month if stats.automations_month == _month() else 0,
+    }
+
+
+def _snapshot(user_id: int):
+    stats = db.session.get(UserLeadStats, user_id)
+    if stats is None:
+        return None
+    niches = db.session.query(UserNicheStats.niche, UserNicheStats.lead_count, UserNicheStats.estimated_value) \
+        .filter_by(user_id=user_id).all()
+    return (stats.leads_total, stats.estimated_value, stats.pitches_sent, stats.automations_this_month,
+            sorted(tuple(row) for row in niches))
+
+
+def reconcile(user_ids: Optional[List[int]] = None) -> Dict[str, int]:
+    """Rebuild the rollup for the given users (default: everyone), one transaction per user."""
+    if user_ids is None:
+        user_ids = [row[0] for row in db.session.query(User.id).order_by(User.id).all()]
+    drifted = 0
+    for user_id in user_ids:
+        before = _snapshot(user_id)
+        rebuild_user_stats(user_id)
+        db.session.flush()
+        if before is not None and before != _snapshot(user_id):
+            drifted += 1
+            print(f"[STATS] User {user_id} rollup was out of date, rebuilt")
+        db.session.commit()
+    print(f"[STATS] Reconciled {len(user_ids)} users ({drifted} had drifted)")
+    return {"users": len(user_ids), "drifted": drifted}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the user_lead_stats rollup")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("reconcile", help="rebuild the rollup from leads and automations")
+    rec.add_argument("--user-id", type=int, action="append", help="only this user (repeatable)")
+    args = parser.parse_args()
+
+    from app import app
+    with app.app_context():
+        reconcile(args.user_id)
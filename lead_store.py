@@ -0,0 +1,139 @@
+"""Lead persistence helpers - batched writes from the scraper's lead stream."""
+import base64
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+from database import db, Lead, bump_cache_version, insert_ignoring_conflicts, normalize_email, normalize_domain
+from lead_stats import record_leads_inserted
+
+LEAD_BATCH_SIZE = int(os.getenv("LEAD_BATCH_SIZE", "25"))
+# Rows per INSERT statement for CSV imports
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+
+def _lead_row(user_id: int, lead: Dict[str, Any], unlock: bool, default_niche: Optional[str]) -> Dict[str, Any]:
+    email = (lead.get("email") or "").strip()
+    website = (lead.get("website") or "").strip()
+    return {
+        "user_id": user_id,
+        "name": lead.get("name") or "Unknown Business",
+        "email": email,
+        "website": website,
+        "niche": lead.get("niche") or default_niche,
+        "status": lead.get("status") or "new",
+        "is_unlocked": unlock,
+        "created_at": datetime.utcnow(),
+        "email_key": normalize_email(email),
+        "domain_key": normalize_domain(website),
+    }
+
+
+def _insert_ignoring_duplicates(rows: List[Dict[str, Any]]) -> List[Tuple[int, Optional[str]]]:
+    """
+    Insert rows in one statement, letting the unique (user_id, email_key) / (user_id, domain_key)
+    indexes drop duplicates. Returns (id, niche) of the rows actually inserted.
+    """
+    return insert_ignoring_conflicts(Lead, rows, Lead.id, Lead.niche)
+
+
+def bulk_upsert_leads(user_id: int, leads: List[Dict[str, Any]], unlock: bool = False,
+                      default_niche: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Insert a batch of lead dicts for a user in a single statement, skipping any whose email or
+    domain the user already has (ON CONFLICT DO NOTHING on Postgres, INSERT OR IGNORE on SQLite).
+    The user's stats rollup and dashboard cache version are updated in the same transaction.
+    Does not commit.
+    Returns {"inserted", "skipped", "ids"}.
+    """
+    rows = [_lead_row(user_id, lead, unlock, default_niche) for lead in leads]
+    if not rows:
+        return {"inserted": 0, "skipped": 0, "ids": []}
+    inserted = _insert_ignoring_duplicates(rows)
+    if inserted:
+        record_leads_inserted(user_id, [niche for _, niche in inserted])
+        bump_cache_version(user_id)  # Core insert skips the ORM listeners in database.py
+    ids = [lead_id for lead_id, _ in inserted]
+    return {"inserted": len(ids), "skipped": len(rows) - len(ids), "ids": ids}
+
+
+def save_lead_batch(user_id: int, batch: List[Dict[str, Any]], unlock: bool = False,
+                    default_niche: Optional[str] = None) -> List[Lead]:
+    """Insert the leads in batch the user doesn't already have (by email or domain) and commit."""
+    result = bulk_upsert_leads(user_id, batch, unlock, default_niche)
+    db.session.commit()
+    if not result["ids"]:
+        return []
+    return Lead.query.filter(Lead.id.in_(result["ids"])).order_by(Lead.id).all()
+
+
+def save_leads_stream(user_id: int, leads: Iterable[Dict[str, Any]], unlock: bool = False,
+                      default_niche: Optional[str] = None, batch_size: int = LEAD_BATCH_SIZE,
+                      on_batch: Optional[Callable[[int, int], Any]] = None) -> Dict[str, Any]:
+    """
+    Consume a lead stream (e.g. tools.free_scraper.iter_leads) and insert it in batches,
+    so rows land in the DB while the search is still running.
+    on_batch(saved_so_far, seen_so_far) is called after every batch; returning False stops
+    the stream early (remaining searches are cancelled).
+    """
+    new_leads: List[Lead] = []
+    seen = 0
+    batch: List[Dict[str, Any]] = []
+    try:
+        for lead in leads:
+            batch.append(lead)
+            seen += 1
+            if len(batch) < batch_size:
+                continue
+            new_leads.extend(save_lead_batch(user_id, batch, unlock, default_niche))
+            batch = []
+            if on_batch and on_batch(len(new_leads), seen) is False:
+                break
+        if batch:
+            new_leads.extend(save_lead_batch(user_id, batch, unlock, default_niche))
+            if on_batch:
+                on_batch(len(new_leads), seen)
+    finally:
+        close = getattr(leads, "close", None)
+        if close:
+            close()
+
+    return {"seen": seen, "saved": len(new_leads), "skipped": seen - len(new_leads), "new_leads": new_leads}
+
+
+def encode_cursor(lead: Lead) -> str:
+    """Opaque keyset cursor pointing just past lead in (created_at, id) order."""
+    raw = f"{lead.created_at.isoformat()}|{lead.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """(created_at, id) from a cursor, or None for a missing/garbled one (= first page)."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, lead_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(lead_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def lead_page(user_id: int, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[Lead], Optional[str]]:
+    """
+    One page of a user's leads, newest first, using keyset pagination on (created_at, id):
+    each page is an index range scan starting after the cursor, so page 1000 costs the same as page 1.
+    Returns (leads, next_cursor); next_cursor is None on the last page.
+    """
+    query = Lead.query.filter(Lead.user_id == user_id)
+    after = decode_cursor(cursor)
+    if after:
+        query = query.filter(tuple_(Lead.created_at, Lead.id) < tuple_(*after))
+    # One extra row tells us whether another page exists without a COUNT
+    leads = query.order_by(Lead.created_at.desc(), Lead.id.desc()).limit(limit + 1).all()
+    if len(leads) <= limit:
+        return leads, None
+    leads = leads[:limit]
+    return leads, encode_cursor(leads[-1])
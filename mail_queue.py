@@ -0,0 +1,168 @@
+"""
+Outbound mail queue.
+Agent runs that carry a mail run key (tasks.run_automation_task sets one) hand their emails to
+the "mail" RQ queue instead of sending inline, so a slow SMTP server never holds up
+Controller.run and mail workers scale separately from automation workers (Procfile: mail_worker).
+
+Every (run key, recipient) gets one mail_sends ledger row. A worker claims rows atomically
+(queued/failed -> sending) before sending, so RQ retries, re-run automations and duplicate jobs
+never email anyone twice. A worker that dies mid-send leaves its rows in "sending"; once the claim
+is MAIL_STALE_MINUTES old (well past MAIL_JOB_TIMEOUT) the next job or RQ retry that covers them
+takes them over. If Redis refuses the job after the rows are recorded, enqueue_mail sends them
+inline through the same claim, so the ledger always ends up "sent" or "failed".
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from database import db, Automation, MailSend, bump_cache_version, insert_ignoring_conflicts, normalize_email
+
+MAIL_QUEUE_NAME = "mail"
+MAIL_QUEUE_ENABLED = os.getenv("MAIL_QUEUE_ENABLED", "true").lower() == "true"
+MAIL_JOB_TIMEOUT = int(os.getenv("MAIL_JOB_TIMEOUT", "600"))
+MAIL_MAX_RETRIES = int(os.getenv("MAIL_MAX_RETRIES", "5"))
+MAIL_RETRY_BASE_SECONDS = int(os.getenv("MAIL_RETRY_BASE_SECONDS", "30"))  # doubles per retry: 30s, 1m, 2m, 4m, 8m
+MAIL_STALE_MINUTES = int(os.getenv("MAIL_STALE_MINUTES", "30"))  # a "sending" claim older than this belongs to a dead worker
+
+
+class MailDeliveryError(Exception):
+    """Some recipients of a queued send failed; raised so RQ retries the job (only those rows are re-sent)."""
+
+
+def retry_intervals() -> List[int]:
+    return [MAIL_RETRY_BASE_SECONDS * 2 ** attempt for attempt in range(MAIL_MAX_RETRIES)]
+
+
+def _claimable():
+    """Rows a job may (re)send: never sent, failed, or claimed by a worker that died mid-send."""
+    stale_before = datetime.utcnow() - timedelta(minutes=MAIL_STALE_MINUTES)
+    return db.or_(
+        MailSend.status.in_(("queued", "failed")),
+        db.and_(MailSend.status == "sending",
+                db.or_(MailSend.claimed_at.is_(None), MailSend.claimed_at < stale_before)),
+    )
+
+
+def get_mail_queue():
+    from job_queue import get_queue
+
+    return get_queue(MAIL_QUEUE_NAME) if MAIL_QUEUE_ENABLED else None
+
+
+def enqueue_mail(run_key: str, recipients: List[Dict[str, Any]], message: Dict[str, Any],
+                 user_id: Optional[int] = None, automation_id: Optional[int] = None) -> Optional[Dict[str, int]]:
+    """
+    Record a ledger row per recipient and queue delivery of the ones not yet sent.
+    recipients are {"email", "name"?, "substitutions"?}; message holds subject, body, html_body,
+    sender_name and reply_to. Returns None without a queue - the caller should send inline.
+    If the queue refuses the job the recipients are delivered here instead, and the result
+    carries "sent", "failed" and "results" like deliver_queued(inline=True).
+    """
+    from rq import Retry
+
+    queue = get_mail_queue()
+    if not queue:
+        return None
+
+    by_key: Dict[str, Dict[str, Any]] = {}
+    for recipient in recipients:
+        key = normalize_email(recipient.get("email"))
+        if key and key not in by_key:
+            by_key[key] = dict(recipient, email=recipient["email"].strip())
+    if not by_key:
+        return {"queued": 0, "skipped": 0}
+
+    insert_ignoring_conflicts(MailSend, [
+        {"run_key": run_key, "recipient": key, "user_id": user_id, "automation_id": automation_id,
+         "status": "queued", "attempts": 0, "created_at": datetime.utcnow()}
+        for key in by_key
+    ])
+    rows = db.session.query(MailSend.id, MailSend.recipient).filter(
+        MailSend.run_key == run_key, MailSend.recipient.in_(list(by_key)), _claimable()
+    ).all()
+    db.session.commit()
+
+    # Rows already sent (or being sent) by an earlier attempt of this run are left alone
+    pending = [dict(by_key[recipient], ledger_id=ledger_id) for ledger_id, recipient in rows]
+    if pending:
+        try:
+            queue.enqueue(
+                "tasks.send_mail_task", pending, message, user_id, automation_id,
+                retry=Retry(max=MAIL_MAX_RETRIES, interval=retry_intervals()),
+                job_timeout=MAIL_JOB_TIMEOUT,
+            )
+        except Exception as e:
+            # The rows are already committed as queued: send them now so they don't sit there unsent
+            print(f"[MAIL] Mail queue unavailable, sending {len(pending)} email(s) for {run_key} inline: {str(e)}")
+            return dict(deliver_queued(pending, message, user_id, automation_id, inline=True), queued=0)
+        print(f"[MAIL] Queued {len(pending)} email(s) for {run_key}")
+    return {"queued": len(pending), "skipped": len(by_key) - len(pending)}
+
+
+def _claim(ledger_ids: List[int]) -> set:
+    claimed = db.session.execute(
+        db.update(MailSend)
+        .where(MailSend.id.in_(ledger_ids), _claimable())
+        .values(status="sending", attempts=MailSend.attempts + 1, claimed_at=datetime.utcnow())
+        .returning(MailSend.id)
+    ).scalars().all()
+    db.session.commit()
+    return set(claimed)
+
+
+def deliver_queued(recipients: List[Dict[str, Any]], message: Dict[str, Any],
+                   user_id: Optional[int] = None, automation_id: Optional[int] = None,
+                   inline: bool = False) -> Dict[str, Any]:
+    """
+    Send the claimable recipients of a queued job and record each outcome in the ledger.
+    inline=True is the automation run sending them itself: failures are returned instead of
+    raised (there is no RQ job to retry) and the run counts its own pitches.
+    """
+    from tools.implementation import deliver_batch
+    from lead_stats import record_pitches_sent
+
+    claimed = _claim([recipient["ledger_id"] for recipient in recipients])
+    batch = [recipient for recipient in recipients if recipient["ledger_id"] in claimed]
+    if not batch:
+        return {"sent": 0, "failed": 0, "skipped": len(recipients), "results": []}
+
+    try:
+        results = deliver_batch(
+            batch, message.get("subject", ""), message.get("body", ""), message.get("html_body", ""),
+            message.get("sender_name", "AI Sales Agent"), message.get("reply_to"),
+        )
+    except Exception as e:
+        results = [{"email": recipient["email"], "status": "failed", "error": str(e)} for recipient in batch]
+
+    now = datetime.utcnow()
+    sent_ids, failed = [], []
+    for recipient, result in zip(batch, results):
+        if result["status"] == "sent":
+            sent_ids.append(recipient["ledger_id"])
+        else:
+            failed.append((recipient["ledger_id"], result.get("error")))
+    if sent_ids:
+        db.session.execute(
+            db.update(MailSend).where(MailSend.id.in_(sent_ids)).values(status="sent", sent_at=now, error=None)
+        )
+    for ledger_id, error in failed:
+        db.session.execute(db.update(MailSend).where(MailSend.id == ledger_id).values(status="failed", error=error))
+
+    # Queued pitches are counted when they actually go out, not when the run finished
+    if sent_ids and automation_id and not inline:
+        db.session.execute(
+            db.update(Automation).where(Automation.id == automation_id)
+            .values(pitches_sent=Automation.pitches_sent + len(sent_ids))
+        )
+    if sent_ids and user_id and not inline:
+        record_pitches_sent(user_id, len(sent_ids))
+        bump_cache_version(user_id)
+    db.session.commit()
+
+    print(f"[MAIL] Sent {len(sent_ids)}/{len(batch)} queued email(s)")
+    if inline:
+        return {"sent": len(sent_ids), "failed": len(failed), "skipped": len(recipients) - len(batch),
+                "results": results}
+    if failed:
+        raise MailDeliveryError(f"{len(failed)} of {len(batch)} recipient(s) failed, first error: {failed[0][1]}")
+    return {"sent": len(sent_ids), "failed": 0, "skipped": len(recipients) - len(batch)}
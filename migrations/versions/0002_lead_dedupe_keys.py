@@ -0,0 +1,83 @@
+"""lead dedupe keys
+
+Revision ID: 0002_lead_dedupe_keys
+Revises: 0001_initial
+Create Date: 2026-10-17
+
+"""
+from urllib.parse import urlparse
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_lead_dedupe_keys"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+
+# Same rules as database.normalize_email / normalize_domain, frozen here for the backfill
+def _email_key(email):
+    email = (email or "").strip().lower()
+    return email or None
+
+
+def _domain_key(website):
+    website = (website or "").strip().lower()
+    if not website:
+        return None
+    host = urlparse(website if "//" in website else f"//{website}").hostname or ""
+    if host.startswith("www."):
+        host = host[4:]
+    return host or None
+
+
+def upgrade():
+    op.add_column("leads", sa.Column("email_key", sa.String(length=120), nullable=True))
+    op.add_column("leads", sa.Column("domain_key", sa.String(length=200), nullable=True))
+
+    # Backfill oldest-first; later duplicates keep a NULL key so the unique indexes can be built
+    leads = sa.table(
+        "leads",
+        sa.column("id", sa.Integer),
+        sa.column("user_id", sa.Integer),
+        sa.column("email", sa.String),
+        sa.column("website", sa.String),
+        sa.column("email_key", sa.String),
+        sa.column("domain_key", sa.String),
+    )
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(leads.c.id, leads.c.user_id, leads.c.email, leads.c.website).order_by(leads.c.id))
+    seen_emails, seen_domains, updates = set(), set(), []
+    for row in rows:
+        email_key = _email_key(row.email)
+        domain_key = _domain_key(row.website)
+        if email_key and (row.user_id, email_key) in seen_emails:
+            email_key = None
+        if domain_key and (row.user_id, domain_key) in seen_domains:
+            domain_key = None
+        if email_key:
+            seen_emails.add((row.user_id, email_key))
+        if domain_key:
+            seen_domains.add((row.user_id, domain_key))
+        if email_key or domain_key:
+            updates.append({"lead_id": row.id, "email_key": email_key, "domain_key": domain_key})
+
+    stmt = (
+        leads.update()
+        .where(leads.c.id == sa.bindparam("lead_id"))
+        .values(email_key=sa.bindparam("email_key"), domain_key=sa.bindparam("domain_key"))
+    )
+    for i in range(0, len(updates), 1000):
+        conn.execute(stmt, updates[i:i + 1000])
+
+    op.create_index("uq_leads_user_email_key", "leads", ["user_id", "email_key"], unique=True)
+    op.create_index("uq_leads_user_domain_key", "leads", ["user_id", "domain_key"], unique=True)
+
+
+def downgrade():
+    op.drop_index("uq_leads_user_domain_key", table_name="leads")
+    op.drop_index("uq_leads_user_email_key", table_name="leads")
+    op.drop_column("leads", "domain_key")
+    op.drop_column("leads", "email_key")
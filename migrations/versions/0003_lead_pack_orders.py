@@ -0,0 +1,36 @@
+"""lead pack orders
+
+Revision ID: 0003_lead_pack_orders
+Revises: 0002_lead_dedupe_keys
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_lead_pack_orders"
+down_revision = "0002_lead_dedupe_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "lead_pack_orders",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("reference", sa.String(length=120), nullable=False, unique=True),
+        sa.Column("source", sa.String(length=30), nullable=True),
+        sa.Column("lead_count", sa.Integer(), nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=True),
+        sa.Column("leads_added", sa.Integer(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("lead_pack_orders")
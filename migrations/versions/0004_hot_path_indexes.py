@@ -0,0 +1,56 @@
+"""hot path indexes
+
+Revision ID: 0004_hot_path_indexes
+Revises: 0003_lead_pack_orders
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_hot_path_indexes"
+down_revision = "0003_lead_pack_orders"
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, partial-index predicate per dialect)
+INDEXES = [
+    ("ix_leads_user_created", "leads", ["user_id", "created_at"], None),
+    ("ix_leads_user_niche", "leads", ["user_id", "niche"], None),
+    ("ix_automations_user_created", "automations", ["user_id", "created_at"], None),
+    ("ix_automations_due", "automations", ["next_run_at"], {"postgresql": "is_active", "sqlite": "is_active = 1"}),
+]
+
+
+def _is_postgres():
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade():
+    if _is_postgres():
+        # CREATE INDEX CONCURRENTLY can't run inside a transaction, and doesn't lock out writes
+        with op.get_context().autocommit_block():
+            for name, table, columns, where in INDEXES:
+                op.create_index(
+                    name, table, columns,
+                    postgresql_concurrently=True,
+                    postgresql_where=sa.text(where["postgresql"]) if where else None,
+                    if_not_exists=True,
+                )
+        return
+
+    for name, table, columns, where in INDEXES:
+        op.create_index(name, table, columns, sqlite_where=sa.text(where["sqlite"]) if where else None)
+
+
+def downgrade():
+    if _is_postgres():
+        with op.get_context().autocommit_block():
+            for name, table, _, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+        return
+
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
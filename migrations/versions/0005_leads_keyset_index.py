@@ -0,0 +1,40 @@
+"""leads keyset pagination index
+
+Revision ID: 0005_leads_keyset_index
+Revises: 0004_hot_path_indexes
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+
+revision = "0005_leads_keyset_index"
+down_revision = "0004_hot_path_indexes"
+branch_labels = None
+depends_on = None
+
+
+# Keyset pages order by (created_at, id); with id in the index every page is a single range scan.
+# Replaces ix_leads_user_created, which is a prefix of the new index.
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index("ix_leads_user_created_id", "leads", ["user_id", "created_at", "id"],
+                            postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index("ix_leads_user_created", table_name="leads", postgresql_concurrently=True, if_exists=True)
+        return
+
+    op.create_index("ix_leads_user_created_id", "leads", ["user_id", "created_at", "id"])
+    op.drop_index("ix_leads_user_created", table_name="leads")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index("ix_leads_user_created", "leads", ["user_id", "created_at"],
+                            postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index("ix_leads_user_created_id", table_name="leads", postgresql_concurrently=True, if_exists=True)
+        return
+
+    op.create_index("ix_leads_user_created", "leads", ["user_id", "created_at"])
+    op.drop_index("ix_leads_user_created_id", table_name="leads")
@@ -0,0 +1,28 @@
+"""automation pitches_sent counter
+
+Revision ID: 0006_automation_pitches_sent
+Revises: 0005_leads_keyset_index
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006_automation_pitches_sent"
+down_revision = "0005_leads_keyset_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("automations", sa.Column("pitches_sent", sa.Integer(), nullable=False, server_default="0"))
+    # Carry over the old dashboard rule: a completed automation whose result mentions a sent email/pitch counts once
+    op.execute(
+        "UPDATE automations SET pitches_sent = 1 "
+        "WHERE status = 'completed' AND (LOWER(result) LIKE '%email sent%' OR LOWER(result) LIKE '%pitch sent%')"
+    )
+
+
+def downgrade():
+    op.drop_column("automations", "pitches_sent")
@@ -0,0 +1,43 @@
+"""user lead stats rollup
+
+Revision ID: 0007_user_lead_stats
+Revises: 0006_automation_pitches_sent
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007_user_lead_stats"
+down_revision = "0006_automation_pitches_sent"
+branch_labels = None
+depends_on = None
+
+
+# Tables start empty: each user's row is built on first dashboard read, or all at once with
+#   python lead_stats.py reconcile
+def upgrade():
+    op.create_table(
+        "user_lead_stats",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("leads_total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("estimated_value", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("pitches_sent", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("automations_month", sa.String(length=7), nullable=True),
+        sa.Column("automations_this_month", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+    op.create_table(
+        "user_niche_stats",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("niche", sa.String(length=100), primary_key=True),
+        sa.Column("lead_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("estimated_value", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade():
+    op.drop_table("user_niche_stats")
+    op.drop_table("user_lead_stats")
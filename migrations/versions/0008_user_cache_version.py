@@ -0,0 +1,23 @@
+"""user dashboard cache version
+
+Revision ID: 0008_user_cache_version
+Revises: 0007_user_lead_stats
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008_user_cache_version"
+down_revision = "0007_user_lead_stats"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("users", sa.Column("cache_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade():
+    op.drop_column("users", "cache_version")
@@ -0,0 +1,36 @@
+"""outbound mail ledger
+
+Revision ID: 0009_mail_sends
+Revises: 0008_user_cache_version
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009_mail_sends"
+down_revision = "0008_user_cache_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "mail_sends",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("run_key", sa.String(length=120), nullable=False),
+        sa.Column("recipient", sa.String(length=255), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("automation_id", sa.Integer(), sa.ForeignKey("automations.id"), nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=False, server_default="queued"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("run_key", "recipient", name="uq_mail_sends_run_recipient"),
+    )
+
+
+def downgrade():
+    op.drop_table("mail_sends")
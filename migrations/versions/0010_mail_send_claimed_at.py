@@ -0,0 +1,23 @@
+"""mail ledger claim time
+
+Revision ID: 0010_mail_send_claimed_at
+Revises: 0009_mail_sends
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0010_mail_send_claimed_at"
+down_revision = "0009_mail_sends"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("mail_sends", sa.Column("claimed_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("mail_sends", "claimed_at")
@@ -57,7 +57,7 @@ class ToolSpec: #static description of available tool or tool specification
     input_schema:Dict[str,Any] # json schema for input data
     output_schema:Dict[str, Any] #json schema for expected output
     timeout_seconds:int = 60 # maximum time to wait for tool response
-    max_retries:int = 1 # number of times to try if tool call fails 
+    max_retries:int = 1 # extra attempts after a failed or timed-out call (0 = never retry, for tools with side effects)
 
 @dataclass # runtime record, so we allow mutation
 class ToolCall: #runtime record of a tool call or when the tool was called
@@ -69,6 +69,9 @@ class ToolCall: #runtime record of a tool call or when the tool was called
     started_at: Optional[float] = None # timestamp when started  execution
     finished_at: Optional[float] = None # timestamp when finished execution or running
     error: Optional[str] = None # error message if the call fails 
+    attempts: int = 0 # how many times the tool runtime ran the function (1 + retries used)
+    attempt_latencies: List[float] = field(default_factory=list) # seconds each attempt took, in order
+    timed_out: bool = False # True if any attempt hit spec.timeout_seconds
 
 
 @dataclass #cuptures output from the tool call or a tool response
@@ -89,20 +92,26 @@ class Task: # describes a single planner task with hierarchical metadata
     parent_id: Optional[str] = None # ID of the parent task if any 
     children: List[str] = field(default_factory=list) # child task IDs
     scratchpad: List[str] = field(default_factory=list) # planner notes for this task
+    depends_on: List[str] = field(default_factory=list) # task IDs that must complete before this one can start
+    attempts: int = 0 # tool calls made for this task so far
 
 
     def add_child(self, child_id: str) -> None : # helper to register a child task
         self.children.append(child_id) # simple list append
     def add_note(self, note: str) -> None: #let planner attach reasoning notes 
         self.scratchpad.append(note) # notepad or scratchpad has notes for later reference
+    def is_ready(self, tasks: Dict[str, "Task"]) -> bool: # pending and every dependency finished successfully
+        return self.status == TaskStatus.PENDING and all(
+            tasks[dep].status == TaskStatus.COMPLETED for dep in self.depends_on if dep in tasks)
 
 
 @dataclass # configeration knobs for the controller loop
 class ControllerConfig: # settings for the main control loop
     max_steps: int = 100 # maximum number or total number of loop iterations
-    max_reties_per_tool: int = 2 # controller rerty limit per tool call
+    max_reties_per_tool: int = 2 # controller rerty limit per tool call (caps ToolSpec.max_retries)
     enable_telemerty: bool = True # to monitor metrics/ logs
     log_level: str = "INFO" # default log level for the controller
+    max_parallel_tasks: int = 4 # ready tasks the controller runs at the same time (1 = one after another)
 
 @dataclass # overall agent runtime state
 class AgentState: # cumpture the agent current state 
@@ -115,16 +124,34 @@ class AgentState: # cumpture the agent current state
     step_count: int = 0 # number of steps taken so far  
 
 
-    def register_task(self, goal: str, priority: int =0, parent_id: Optional[str] = None) -> str: # create and store a task
+    def register_task(self, goal: str, priority: int =0, parent_id: Optional[str] = None, depends_on: Optional[List[str]] = None) -> str: # create and store a task
         # the goal variable inside the def(register_task) is breaking down the user foal into small tasks
         task_id = str(uuid.uuid4())#
-        task = Task(task_id = task_id, goal = goal, priority = priority, parent_id=parent_id) #instantiate the task object
+        task = Task(task_id = task_id, goal = goal, priority = priority, parent_id=parent_id, depends_on=list(depends_on or [])) #instantiate the task object
         self.tasks[task_id] = task# store it in the AgentsState regisrty
         if parent_id and parent_id in self.tasks: # link it to the parent if any
             self.tasks[parent_id].add_child(task_id) # parent now tracks child
         return task_id # subtask "Email Sarah the daily to do summary" when the planner adds that task
 
 
+    def ready_tasks(self) -> List[Task]: # every task that can start now, highest priority first then registration order
+        ready = [task for task in self.tasks.values() if task.is_ready(self.tasks)]
+        return sorted(ready, key=lambda task: -task.priority) # sorted() is stable, so equal priorities keep registration order
+
+    def fail_blocked_tasks(self) -> List[Task]: # pending tasks that can never start because a dependency failed
+        blocked = []
+        changed = True
+        while changed: # a failure cascades down the whole chain of dependents
+            changed = False
+            for task in self.tasks.values():
+                if task.status == TaskStatus.PENDING and any(
+                        self.tasks[dep].status == TaskStatus.FAILED for dep in task.depends_on if dep in self.tasks):
+                    task.status = TaskStatus.FAILED
+                    task.add_note("Skipped: a task it depends on failed")
+                    blocked.append(task)
+                    changed = True
+        return blocked
+
     def get_active_task(self) -> Optional[Task]: # lets the loop grab a current job like "email Sarah
         if self.current_task_id: # only return the job we are doing now(eg."email Sarah the list") 
             return self.tasks.get(self.current_task_id) # hand back the "email Sarah" task object
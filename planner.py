@@ -4,6 +4,10 @@ from tools.base import ToolRegistry
 from typing import Optional, List
 from datetime import datetime
 
+# Searches for these niches are split into one search per niche (mirrors search_leads_function)
+MULTI_NICHES = ["multi-niche", "all", "all niches", "all high-ticket", "security + solar", "security and solar"]
+MULTI_NICHE_SEARCHES = ["Security Services", "Solar Energy"]
+
 
 class Planner:
     """Professional AI planner that interprets user goals and executes appropriate actions."""
@@ -21,15 +25,15 @@ class Planner:
         if action_type == "email" or goal_lower.startswith("[email]"):
             return ["Send email"]
         if action_type == "leads" or goal_lower.startswith("[leads]"):
-            return ["Search for leads", "Send results summary"]
+            return self._search_tasks(user_goal) + ["Send results summary"]
 
         # LEAD GENERATION: User wants to find business contacts
         if any(word in goal_lower for word in ["find", "search", "look for", "get me"]) and \
            any(word in goal_lower for word in ["lead", "company", "companies", "business", "contact"]):
             # Check if they also want to send emails to those leads
             if any(word in goal_lower for word in ["send", "email", "pitch", "contact them"]):
-                return ["Search for leads", "Create pitch", "Send outreach emails"]
-            return ["Search for leads", "Send results summary"]
+                return self._search_tasks(user_goal) + ["Create pitch", "Send outreach emails"]
+            return self._search_tasks(user_goal) + ["Send results summary"]
         
         # SIMPLE EMAIL: User wants to send an email (test, notification, custom message)
         if any(word in goal_lower for word in ["send", "email", "test", "notify", "message", "reminder"]):
@@ -42,8 +46,28 @@ class Planner:
         # DEFAULT: Treat as email request
         return ["Send email"]
 
+    def register_tasks(self, user_goal: str) -> List[str]:
+        """
+        Register the goal's tasks with their dependencies. Consecutive searches are independent
+        of each other; every other task waits for the whole step before it.
+        """
+        stages: List[List[str]] = []
+        for task_goal in self.break_goal_into_tasks(user_goal):
+            if stages and self._is_search(task_goal) and all(self._is_search(g) for g in stages[-1]):
+                stages[-1].append(task_goal)
+            else:
+                stages.append([task_goal])
+        
+        task_ids: List[str] = []
+        previous: List[str] = []
+        for stage in stages:
+            current = [self.state.register_task(task_goal, depends_on=previous) for task_goal in stage]
+            task_ids.extend(current)
+            previous = current
+        return task_ids
+
     def plan_next_action(self) -> Optional[ToolCall]:
-        """Decide which tool to call based on current task."""
+        """Decide which tool to call based on current task (one task at a time)."""
         active_task = self.state.get_active_task()
         
         if not active_task:
@@ -56,6 +80,17 @@ class Planner:
         if not active_task:
             return None
         
+        tool_call = self.plan_action(active_task)
+        if tool_call:
+            return tool_call
+        
+        # Mark unmatched tasks as completed and try next
+        active_task.status = TaskStatus.COMPLETED
+        self.state.set_current_task(None)
+        return self.plan_next_action()
+
+    def plan_action(self, active_task: Task) -> Optional[ToolCall]:
+        """Decide which tool call carries out a task; None if no tool applies to it."""
         goal_lower = active_task.goal.lower()
         original_goal = self.state.planner_context.get("original_goal", "")
         recipient = self.state.planner_context.get("recipient_email", "")
@@ -65,12 +100,13 @@ class Planner:
         # ========================================
         # TASK: Search for leads
         # ========================================
-        if "search" in goal_lower and "lead" in goal_lower:
+        if self._is_search(active_task.goal):
             tool = self.tool_registry.get("search_leads")
             if tool:
-                # Extract niche and location from original goal
-                niche = self._extract_niche(original_goal)
-                location = self._extract_location(original_goal)
+                # Niche and location come from the task ("Search for leads: Solar Energy in Durban") or the original goal
+                niche, location = self._search_target(active_task.goal)
+                niche = niche or self._extract_niche(original_goal)
+                location = location or self._extract_location(original_goal)
                 user_tier = (self.state.planner_context.get("user_tier") or "").lower()
                 unlock = user_tier in ["pro", "business"]
                 
@@ -87,26 +123,42 @@ class Planner:
         if "create" in goal_lower and "pitch" in goal_lower:
             tool = self.tool_registry.get("personalize_pitch")
             if tool:
-                lead_name = "Business Owner"
                 niche = self._extract_niche(original_goal)
                 
-                # Get lead name from previous search
-                for obs in self.state.observations:
-                    if obs.output_payload and "leads_list" in obs.output_payload:
-                        leads = obs.output_payload["leads_list"]
-                        if leads:
-                            lead_name = leads[0]["name"]
-                        break
+                # Pitch every lead from the searches that we can actually email
+                leads = self._leads_found()
+                lead_name = leads[0]["name"] if leads else "Business Owner"
                 
                 return ToolCall(spec=tool.spec, arguments={
                     "lead_name": lead_name,
-                    "niche": niche
+                    "niche": niche,
+                    "location": self._extract_location(original_goal),
+                    "leads": [
+                        {"name": l.get("name"), "email": l.get("email"), "website": l.get("website"), "niche": l.get("niche")}
+                        for l in leads if l.get("email")
+                    ]
                 })
         
         # ========================================
         # TASK: Send outreach emails to leads
         # ========================================
         if "outreach" in goal_lower or ("send" in goal_lower and "pitch" in goal_lower):
+            outreach_tool = self.tool_registry.get("send_outreach")
+            pitches = []
+            for obs in self.state.observations:
+                if obs.output_payload and obs.output_payload.get("pitches"):
+                    pitches = obs.output_payload["pitches"]
+            
+            # One pitch per lead: fan out to all of them in a single call
+            if outreach_tool and pitches:
+                return ToolCall(spec=outreach_tool.spec, arguments={
+                    "pitches": pitches,
+                    "subject": "Partnership Opportunity - Let's Connect",
+                    "sender_name": user_email,
+                    "reply_to": user_email,
+                    **self._mail_args(active_task)
+                })
+            
             tool = self.tool_registry.get("send_email")
             if tool:
                 # Get pitch and lead from previous steps
@@ -114,13 +166,11 @@ class Planner:
                 lead_email = ""
                 
                 for obs in self.state.observations:
-                    if obs.output_payload:
-                        if "personalized_pitch" in obs.output_payload:
-                            pitch_body = obs.output_payload["personalized_pitch"]
-                        if "leads_list" in obs.output_payload:
-                            leads = obs.output_payload["leads_list"]
-                            if leads:
-                                lead_email = leads[0]["email"]
+                    if obs.output_payload and "personalized_pitch" in obs.output_payload:
+                        pitch_body = obs.output_payload["personalized_pitch"]
+                leads = self._leads_found()
+                if leads:
+                    lead_email = leads[0]["email"]
                 
                 if pitch_body and lead_email:
                     return ToolCall(spec=tool.spec, arguments={
@@ -128,7 +178,8 @@ class Planner:
                         "subject": "Partnership Opportunity - Let's Connect",
                         "body": pitch_body,
                         "sender_name": user_email,
-                        "reply_to": user_email
+                        "reply_to": user_email,
+                        **self._mail_args(active_task)
                     })
         
         # ========================================
@@ -137,12 +188,8 @@ class Planner:
         if "send" in goal_lower and ("result" in goal_lower or "summary" in goal_lower):
             tool = self.tool_registry.get("send_email")
             if tool:
-                # Get leads found from previous step
-                leads_found = []
-                for obs in self.state.observations:
-                    if obs.output_payload and "leads_list" in obs.output_payload:
-                        leads_found = obs.output_payload["leads_list"]
-                        break
+                # Get leads found by the search step(s)
+                leads_found = self._leads_found()
                 
                 current_time = datetime.now().strftime('%H:%M on %A, %B %d, %Y')
                 
@@ -191,7 +238,8 @@ AI Sales Agent
                     "subject": f"AI Sales Agent - Results Ready",
                     "body": body,
                     "sender_name": user_email,
-                    "reply_to": user_email
+                    "reply_to": user_email,
+                    **self._mail_args(active_task)
                 })
         
         # ========================================
@@ -252,13 +300,57 @@ Automated Email System
                     "subject": subject,
                     "body": body,
                     "sender_name": user_email,
-                    "reply_to": user_email
+                    "reply_to": user_email,
+                    **self._mail_args(active_task)
                 })
         
-        # Mark unmatched tasks as completed and try next
-        active_task.status = TaskStatus.COMPLETED
-        self.state.set_current_task(None)
-        return self.plan_next_action()
+        return None
+    
+    def _is_search(self, task_goal: str) -> bool:
+        goal_lower = task_goal.lower()
+        return "search" in goal_lower and "lead" in goal_lower
+    
+    def _search_tasks(self, user_goal: str) -> List[str]:
+        """One search task per niche/location pair, so they can run side by side."""
+        niche = self._extract_niche(user_goal)
+        niches = MULTI_NICHE_SEARCHES if niche.lower() in MULTI_NICHES else [niche]
+        locations = self._extract_locations(user_goal)
+        if len(niches) * len(locations) == 1:
+            return ["Search for leads"]
+        return [f"Search for leads: {n} in {location}" for n in niches for location in locations]
+    
+    def _search_target(self, task_goal: str) -> tuple:
+        """(niche, location) from "Search for leads: <niche> in <location>", blanks otherwise."""
+        if ":" not in task_goal:
+            return "", ""
+        target = task_goal.split(":", 1)[1].strip()
+        niche, _, location = target.rpartition(" in ")
+        return (niche.strip(), location.strip()) if niche else (target, "")
+    
+    def _leads_found(self) -> List[dict]:
+        """Leads from every search observation, in task order, without repeats across searches."""
+        leads, seen = [], set()
+        for obs in self.state.observations:
+            if obs.output_payload and "leads_list" in obs.output_payload:
+                for lead in obs.output_payload["leads_list"] or []:
+                    key = (lead.get("website") or lead.get("email") or lead.get("name") or "").lower()
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    leads.append(lead)
+        return leads
+    
+    def _mail_args(self, task: Task) -> dict:
+        """Mail queue routing for send_email/send_outreach calls; empty (send inline) unless the run has a mail run key."""
+        run_key = self.state.planner_context.get("mail_run_key")
+        if not run_key:
+            return {}
+        # One ledger key per task, so a run's summary and outreach emails never dedupe against each other
+        return {
+            "run_key": f"{run_key}:{task.goal.lower().replace(' ', '-')}"[:120],
+            "user_id": self.state.planner_context.get("user_id"),
+            "automation_id": self.state.planner_context.get("automation_id"),
+        }
     
     def _extract_niche(self, goal: str) -> str:
         """Extract business niche from user goal."""
@@ -297,6 +389,10 @@ Automated Email System
     
     def _extract_location(self, goal: str) -> str:
         """Extract location from user goal."""
+        return self._extract_locations(goal)[0]
+    
+    def _extract_locations(self, goal: str) -> List[str]:
+        """Every location named in the user goal, in the order they appear (South Africa if none)."""
         goal_lower = goal.lower()
         
         locations = {
@@ -314,8 +410,9 @@ Automated Email System
             "western cape": "Western Cape",
         }
         
-        for key, value in locations.items():
-            if key in goal_lower:
-                return value
-        
-        return "South Africa"
+        found = sorted((goal_lower.find(key), value) for key, value in locations.items() if key in goal_lower)
+        unique = []
+        for _, value in found:
+            if value not in unique:
+                unique.append(value)
+        return unique or ["South Africa"]
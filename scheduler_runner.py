@@ -34,7 +34,7 @@ def enqueue_due_jobs():
             return
 
         due = (
-            Automation.query.filter(Automation.is_active.is_(True))
+            Automation.query.filter(Automation.is_active)
             .filter(Automation.frequency != "once")
             .filter(Automation.next_run_at.isnot(None))
             .filter(Automation.next_run_at <= now)
@@ -59,7 +59,7 @@ def backfill_next_runs():
             return
 
         scheduled = (
-            Automation.query.filter(Automation.is_active.is_(True))
+            Automation.query.filter(Automation.is_active)
             .filter(Automation.frequency != "once")
             .all()
         )
@@ -2,8 +2,9 @@ from datetime import datetime
 from app import app
 from cli import setup_agent
 from database import db, Automation, User
+from lead_stats import record_automation_run
 from scheduler_utils import compute_next_run
-from tools.implementation import send_email_function
+from tools.implementation import send_email_function, update_lead_emails
 
 
 def _strip_prefix(goal: str) -> str:
@@ -25,6 +26,17 @@ def _extract_niche(goal: str) -> tuple[str, str]:
     return selected_niche, goal
 
 
+def count_pitches_sent(state) -> int:
+    """Emails that actually went out during an agent run (tool_history and observations are appended in step)."""
+    sent = 0
+    for tool_call, obs in zip(state.tool_history, state.observations):
+        if tool_call.spec.name == "send_email" and "sent successfully" in obs.output_text.lower():
+            sent += 1
+        elif tool_call.spec.name in ("send_email_batch", "send_outreach"):
+            sent += (obs.output_payload or {}).get("sent_count", 0)
+    return sent
+
+
 def run_automation_task(automation_id: int) -> dict:
     """Execute an automation and update DB state."""
     with app.app_context():
@@ -96,6 +108,7 @@ def run_automation_task(automation_id: int) -> dict:
                 "reply_to": user.email
             })
 
+            record_automation_run(user.id, last_run=automation.last_run)
             automation.last_run = datetime.utcnow()
             automation.run_count += 1
             automation.status = "scheduled"
@@ -114,6 +127,9 @@ def run_automation_task(automation_id: int) -> dict:
         controller.state.planner_context["user_email"] = user.email
         controller.state.planner_context["user_tier"] = user.subscription_tier
         controller.state.planner_context["user_id"] = user.id
+        controller.state.planner_context["automation_id"] = automation.id
+        # Emails of this run go through the mail queue; a retried run reuses the key, so nobody is emailed twice
+        controller.state.planner_context["mail_run_key"] = f"automation-{automation.id}-run-{(automation.run_count or 0) + 1}"
         controller.state.planner_context["action_type"] = (
             "leads" if automation.goal.startswith("[leads]") else "email"
         )
@@ -125,17 +141,23 @@ def run_automation_task(automation_id: int) -> dict:
             result = controller.run(automation.goal)
 
             email_sent = False
+            email_queued = False
             email_error = None
             for tool_call in controller.state.tool_history:
-                if tool_call.spec.name == "send_email":
+                if tool_call.spec.name in ("send_email", "send_email_batch", "send_outreach"):
                     for obs in controller.state.observations:
                         if "sent successfully" in obs.output_text.lower():
                             email_sent = True
+                        elif "queued for delivery" in obs.output_text.lower():
+                            email_queued = True
                         elif "error" in obs.output_text.lower() or "simulated" in obs.output_text.lower():
                             email_error = obs.output_text
 
+            pitches = count_pitches_sent(controller.state)
+            record_automation_run(user.id, pitches, automation.last_run)
             automation.last_run = datetime.utcnow()
             automation.run_count += 1
+            automation.pitches_sent = (automation.pitches_sent or 0) + pitches
             automation.locked_at = None
 
             if automation.frequency == "once":
@@ -154,6 +176,8 @@ def run_automation_task(automation_id: int) -> dict:
                 automation.result = f"{result}\n\n⚠️ Email Status: {email_error}"
             elif email_sent:
                 automation.result = f"{result}\n\n✅ Email sent to: {automation.recipient_email}"
+            elif email_queued:
+                automation.result = f"{result}\n\n📨 Email queued for delivery to: {automation.recipient_email}"
             else:
                 automation.result = result
 
@@ -164,6 +188,7 @@ def run_automation_task(automation_id: int) -> dict:
                 "status": "completed",
                 "result": result,
                 "email_sent": email_sent,
+                "email_queued": email_queued,
                 "email_error": email_error,
             }
         except Exception as e:
@@ -172,3 +197,64 @@ def run_automation_task(automation_id: int) -> dict:
             automation.locked_at = None
             db.session.commit()
             return {"status": "failed", "error": str(e)}
+
+
+def enrich_leads_task(lead_ids: list[int]) -> dict:
+    """Background email enrichment for leads saved without an email."""
+    from database import Lead
+    from tools.free_scraper import ENRICH_DEADLINE
+
+    with app.app_context():
+        leads = Lead.query.filter(Lead.id.in_(lead_ids)).all()
+        # Jobs aren't holding a web request open, so give them a longer global deadline
+        updated = update_lead_emails(leads, deadline=max(ENRICH_DEADLINE, 120))
+        print(f"[ENRICH] Background job updated {updated}/{len(lead_ids)} leads")
+        return {"status": "completed", "checked": len(leads), "updated": updated}
+
+
+def fulfil_lead_pack_task(reference: str) -> dict:
+    """Fill a purchased lead pack. Keyed by payment reference, so duplicate jobs are no-ops."""
+    from lead_packs import fulfil_order
+
+    with app.app_context():
+        return fulfil_order(reference)
+
+
+def import_leads_task(user_id: int, upload_key: str) -> dict:
+    """Import a CSV upload staged in Redis by lead_import.start_import, reporting progress in job.meta."""
+    from rq import get_current_job
+    from job_queue import get_redis
+    from lead_import import RedisUploadReader, import_csv_stream
+
+    job = get_current_job()
+    redis_conn = get_redis()
+
+    def report(summary):
+        if job:
+            job.meta["progress"] = dict(summary)
+            job.save_meta()
+
+    with app.app_context():
+        try:
+            summary = import_csv_stream(user_id, RedisUploadReader(redis_conn, upload_key), on_progress=report)
+        except Exception as e:
+            db.session.rollback()
+            if job:
+                job.meta["error"] = str(e)
+                job.save_meta()
+            raise
+        finally:
+            redis_conn.delete(upload_key)
+        report(summary)
+        print(f"[IMPORT] User {user_id}: {summary['added']} added, {summary['duplicates']} duplicates, "
+              f"{summary['rejected']} rejected of {summary['rows']} rows")
+        return {"status": "completed", **summary}
+
+
+def send_mail_task(recipients: list[dict], message: dict, user_id: int | None = None,
+                   automation_id: int | None = None) -> dict:
+    """Deliver queued emails (mail queue); failures raise so RQ retries them with backoff."""
+    from mail_queue import deliver_queued
+
+    with app.app_context():
+        return {"status": "completed", **deliver_queued(recipients, message, user_id, automation_id)}
@@ -0,0 +1,51 @@
+import app as app_module
+import lead_packs
+from database import LeadPackOrder
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def get(self, url, **kwargs):
+        return FakeResponse(self.payload)
+
+
+def test_verified_paystack_callback_starts_fulfilment(client, user, monkeypatch):
+    filled = []
+
+    def fake_fulfil(reference):
+        filled.append(reference)
+        LeadPackOrder.query.filter_by(reference=reference).update({"status": "completed"})
+        return {"status": "completed"}
+
+    payload = {"status": True, "data": {"status": "success", "metadata": {"leads_count": 50}}}
+    monkeypatch.setattr(app_module, "get_session", lambda: FakeSession(payload))
+    monkeypatch.setattr(lead_packs, "fulfil_order", fake_fulfil)
+
+    response = client.get("/leadpack-callback?reference=ps-ref-1")
+
+    assert response.status_code == 302
+    assert "/leadpack-success" in response.headers["Location"]
+    order = LeadPackOrder.query.filter_by(reference="ps-ref-1").one()
+    assert order.user_id == user.id and order.source == "paystack"
+    assert order.status != "pending"
+    assert filled == ["ps-ref-1"]
+
+
+def test_unverified_paystack_callback_creates_no_order(client, monkeypatch):
+    payload = {"status": True, "data": {"status": "failed"}}
+    monkeypatch.setattr(app_module, "get_session", lambda: FakeSession(payload))
+
+    response = client.get("/leadpack-callback?reference=ps-ref-2")
+
+    assert response.status_code == 302
+    assert LeadPackOrder.query.filter_by(reference="ps-ref-2").first() is None
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from database import db, Automation
+from lead_stats import get_user_stats, reconcile, record_automation_run
+
+
+def run_automation(automation, pitches):
+    # What tasks.run_automation_task does when a run completes
+    record_automation_run(automation.user_id, pitches, automation.last_run)
+    automation.last_run = datetime.utcnow()
+    automation.pitches_sent = (automation.pitches_sent or 0) + pitches
+    db.session.commit()
+
+
+def test_repeat_runs_match_a_rebuild(user):
+    daily = Automation(user_id=user.id, goal="Find security leads")
+    weekly = Automation(user_id=user.id, goal="Find solar leads")
+    db.session.add_all([daily, weekly])
+    db.session.commit()
+    get_user_stats(user.id)  # builds the rollup
+
+    run_automation(daily, 2)
+    run_automation(daily, 3)
+    run_automation(weekly, 1)
+
+    live = get_user_stats(user.id)
+    assert live["automations_this_month"] == 2
+    assert live["pitches_sent"] == 6
+    assert reconcile([user.id]) == {"users": 1, "drifted": 0}
+    assert get_user_stats(user.id) == live
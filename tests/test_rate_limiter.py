@@ -0,0 +1,43 @@
+import pytest
+
+from tools.rate_limiter import HostThrottle, LocalRateLimiter, RateLimitedError, RedisRateLimiter
+
+HOST = "html.duckduckgo.com"  # 0.5 req/s, burst 2
+
+
+def local_backend():
+    return LocalRateLimiter()
+
+
+def redis_backend():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis needs it to run the Lua token bucket
+    return RedisRateLimiter(fakeredis.FakeRedis())
+
+
+@pytest.mark.parametrize("make_backend", [local_backend, redis_backend])
+def test_rejected_calls_take_no_tokens(make_backend):
+    throttle = HostThrottle(make_backend(), enabled=True)
+    throttle.acquire(HOST, max_wait=0)
+    throttle.acquire(HOST, max_wait=0)  # burst used up
+
+    for _ in range(20):
+        with pytest.raises(RateLimitedError):
+            throttle.acquire(HOST, max_wait=0)
+
+    # Still one slot (about 2s at 0.5 req/s) away, not 20 slots of debt
+    assert throttle.backend.reserve(HOST, max_wait=60) <= 2.1
+
+
+@pytest.mark.parametrize("make_backend", [local_backend, redis_backend])
+def test_backoff_rejections_take_no_tokens(make_backend):
+    throttle = HostThrottle(make_backend(), enabled=True)
+    throttle.backend.penalize(HOST, 5.0)
+
+    for _ in range(20):
+        with pytest.raises(RateLimitedError):
+            throttle.acquire(HOST, max_wait=1)
+
+    # Once the backoff runs out the full burst is still there
+    assert throttle.backend.reserve(HOST, max_wait=60) <= 6.1
+    assert throttle.backend.reserve(HOST, max_wait=60) <= 6.1
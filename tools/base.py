@@ -2,27 +2,116 @@
 
 from typing import Callable, Dict, Any, Optional, List # type hints for tool functions and registries
 from models import ToolSpec, ToolCall, Observation, ToolStatus # data models for tool calls and observations
+import functools # wraps() keeps the wrapped function's name for debugging
+import os # retry settings come from the environment
+import random # jitter for retry backoff
+import threading # tool calls run on a thread so a hung call can be abandoned at its deadline
+import time # deadlines and latencies
+
+
+def bind_app_context(func: Callable) -> Callable: # lets a worker thread run code that needs Flask's app context (db.session, current_app)
+    try:
+        from flask import current_app, has_app_context
+    except ImportError:  # tools can also run outside the web app (cli.py)
+        return func
+    if not has_app_context():  # nothing to carry over, e.g. the CLI agent
+        return func
+    app = current_app._get_current_object()  # the real app, not the context-local proxy
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with app.app_context():  # a fresh context per call, so each thread gets its own db session
+            return func(*args, **kwargs)
+    return wrapper
+
+
+# Backoff between attempts: base * 2^(attempt-1), capped, then jittered so parallel tasks don't retry in lockstep
+TOOL_RETRY_BACKOFF_BASE = float(os.getenv("TOOL_RETRY_BACKOFF_BASE", "1"))  # seconds
+TOOL_RETRY_BACKOFF_MAX = float(os.getenv("TOOL_RETRY_BACKOFF_MAX", "30"))  # seconds
+# After a timeout the call is asked to stop (cancel_event); this is how long we wait for it to wind down
+TOOL_CANCEL_GRACE = float(os.getenv("TOOL_CANCEL_GRACE", "10"))  # seconds
+
+
+class ToolTimeoutError(Exception):  # a tool function ran past spec.timeout_seconds
+    def __init__(self, message: str, stopped: bool = False):
+        super().__init__(message)
+        self.stopped = stopped  # True once the timed-out call has actually finished, so a retry can't overlap it
+
+
+def retry_delay(attempt: int) -> float:  # seconds to wait after failed attempt number `attempt` (1-based)
+    delay = min(TOOL_RETRY_BACKOFF_MAX, TOOL_RETRY_BACKOFF_BASE * (2 ** max(0, attempt - 1)))
+    return delay * random.uniform(0.5, 1.0)  # "equal jitter": at least half the backoff, never more than all of it
+
 
 class Tool:
     def __init__(self, spec: ToolSpec, execute_func: Callable[[Dict[str, Any]], Dict[str, Any]]):  # stores tool metadata and actual function that runs it
         self.spec = spec  # keep the tool specification for validation
         self.execute_func = execute_func # the actual function that does the work 
     
+    def _call_with_deadline(self, arguments: Dict[str, Any]) -> Any:  # run the function, but stop waiting after spec.timeout_seconds
+        timeout = self.spec.timeout_seconds
+        if not timeout or timeout <= 0:  # no deadline configured: call inline
+            return self.execute_func(arguments)
+        outcome: Dict[str, Any] = {}
+        cancel_event = threading.Event()  # set at the deadline; long-running tools (search_leads) check it and stop early
+        call_arguments = dict(arguments, cancel_event=cancel_event)  # a copy, so the ToolCall's recorded arguments stay plain
+
+        def target():
+            try:
+                outcome["result"] = self.execute_func(call_arguments)
+            except BaseException as e:  # hand any failure back to the waiting thread
+                outcome["error"] = e
+
+        # Daemon thread: a call that never returns (hung socket) can't be killed, but it is abandoned
+        # instead of pinning the worker, and it won't keep the process alive on shutdown
+        worker = threading.Thread(target=bind_app_context(target), name=f"tool-{self.spec.name}", daemon=True)
+        worker.start()
+        worker.join(timeout)
+        if worker.is_alive():
+            cancel_event.set()  # ask it to stop, then give it a moment to do so
+            worker.join(TOOL_CANCEL_GRACE)
+            stopped = not worker.is_alive()
+            raise ToolTimeoutError(
+                f"{self.spec.name} timed out after {timeout}s" + ("" if stopped else " and is still running"), stopped=stopped)
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome.get("result")
 
-    def execute(self, arguments: Dict[str,Any]) -> Observation: # controller calls this to the tool like "send email to sarah'
-        
-
-        try:  # wrap in try/except so that errors dont crash the agent
-            result = self.execute_func(arguments)  # run the actual function (like sending email)
-            if not isinstance(result, dict):  # check if result is a dictionary
-                raise ValueError(f"Tool function must return a dictionary, got {type(result)}")
-            output_text = result.get('output_text', 'Tool execution successful')  # get the message like "email sent"
-            return Observation(call_id="", output_text=output_text, output_payload=result, status=ToolStatus.SUCCEDED)  # package the result so controller can use it (SUCCEDED with one E, not SUCCEEDED)
-        except Exception as e:  # if something goes wrong (like network error)
-            import traceback
-            error_details = traceback.format_exc()  # get full error details
-            print(f"[DEBUG ERROR] Tool execution failed: {error_details}")  # debug: show full error
-            return Observation(call_id="", output_text=f"Error: {str(e)}", status=ToolStatus.ERRORED, error=str(e))  # tell the controller the tool failed
+    def execute(self, arguments: Dict[str,Any], tool_call: Optional[ToolCall] = None, max_retries: Optional[int] = None) -> Observation: # controller calls this to the tool like "send email to sarah'
+        retries = self.spec.max_retries if max_retries is None else max_retries  # controller may cap the spec's retries
+        attempts = 1 + max(0, retries)
+        error = None
+        for attempt in range(1, attempts + 1):
+            started = time.monotonic()
+            try:  # wrap in try/except so that errors dont crash the agent
+                result = self._call_with_deadline(arguments)  # run the actual function (like sending email) within the deadline
+            except Exception as e:  # if something goes wrong (like network error or a hang)
+                error = e
+                if isinstance(e, ToolTimeoutError):
+                    print(f"[TOOL] {str(e)} (attempt {attempt}/{attempts})")
+                else:
+                    import traceback
+                    print(f"[DEBUG ERROR] Tool execution failed (attempt {attempt}/{attempts}): {traceback.format_exc()}")  # debug: show full error
+            finally:
+                if tool_call:  # record attempt count and latency on the call for the run history
+                    tool_call.attempts = attempt
+                    tool_call.attempt_latencies.append(round(time.monotonic() - started, 3))
+                    tool_call.timed_out = tool_call.timed_out or isinstance(error, ToolTimeoutError)
+            if error is None:
+                if not isinstance(result, dict):  # check if result is a dictionary (a bug, retrying won't help)
+                    message = f"Tool function must return a dictionary, got {type(result)}"
+                    return Observation(call_id="", output_text=f"Error: {message}", status=ToolStatus.ERRORED, error=message)
+                output_text = result.get('output_text', 'Tool execution successful')  # get the message like "email sent"
+                return Observation(call_id="", output_text=output_text, output_payload=result, status=ToolStatus.SUCCEDED)  # package the result so controller can use it (SUCCEDED with one E, not SUCCEEDED)
+            if isinstance(error, ToolTimeoutError) and not error.stopped:  # the old attempt may still be writing: never run a second one beside it
+                print(f"[TOOL] Not retrying {self.spec.name}: the timed-out attempt did not stop")
+                break
+            if attempt < attempts:
+                delay = retry_delay(attempt)
+                print(f"[TOOL] Retrying {self.spec.name} in {delay:.1f}s")
+                time.sleep(delay)
+                error = None
+        return Observation(call_id="", output_text=f"Error: {str(error)}", status=ToolStatus.ERRORED, error=str(error))  # tell the controller the tool failed
 
 
 class ToolRegistry:
@@ -4,15 +4,21 @@ Scrapes DuckDuckGo, business directories, and websites for leads.
 Uses multiple sources for reliability.
 """
 
+import os
 import re
 import time
 import random
 import requests
-from bs4 import BeautifulSoup
-from typing import List, Dict, Any, Optional
-from urllib.parse import urljoin, urlparse, quote_plus
+from bs4 import BeautifulSoup, SoupStrainer
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from urllib.parse import urljoin, urlparse, quote_plus, parse_qs
 import json
 
+from tools.http_client import get_scraper_session
+from tools.serp_cache import get_serp_cache
+from tools.rate_limiter import get_throttle, BACKOFF_STATUSES
+
 # Rotating user agents to avoid blocks
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -34,74 +40,124 @@ def get_headers() -> Dict[str, str]:
     }
 
 
+# Extra attempts after a 429/503 (each one waits out the host's backoff first)
+SCRAPER_BACKOFF_RETRIES = int(os.getenv("SCRAPER_BACKOFF_RETRIES", "2"))
+
+
+def fetch(url: str, timeout: int = 15, **kwargs) -> requests.Response:
+    """
+    GET a page through the scraper's keep-alive session (pooled per host, no status retries).
+    Every request waits for a slot from the per-host rate limiter; 429/503 responses
+    put the host into exponential backoff (honoring Retry-After) and are retried.
+    """
+    host = urlparse(url).netloc.lower()
+    throttle = get_throttle()
+    for attempt in range(SCRAPER_BACKOFF_RETRIES + 1):
+        throttle.acquire(host)
+        response = get_scraper_session().get(url, headers=get_headers(), timeout=timeout, **kwargs)
+        throttle.record_response(host, response.status_code, response.headers.get('Retry-After'))
+        if response.status_code not in BACKOFF_STATUSES:
+            break
+    return response
+
+
+# Compiled once - these run over every fetched page
+EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+# Common false positives (asset names, placeholder and vendor domains)
+EMAIL_SKIP_RE = re.compile(
+    r'example\.com|test\.com|domain\.com|email\.com|yoursite\.com|sentry\.io|wixpress\.com|w3\.org'
+    r'|\.png|\.jpg|\.gif|\.css|\.js'
+)
+CONTACT_KEYWORDS = ('contact', 'about', 'get-in-touch', 'reach-us')
+
+
+def _css_class(name: str) -> re.Pattern:
+    # While parsing, class is still the raw attribute string ("result results_links"),
+    # so match the class as a whole word rather than the full value
+    return re.compile(r'(?:^|\s)' + re.escape(name) + r'(?:\s|$)')
+
+
+# Parse only the nodes each page type actually needs instead of the whole document
+BING_RESULTS = SoupStrainer('li', class_=_css_class('b_algo'))
+DDG_RESULTS = SoupStrainer('div', class_=_css_class('result'))
+YELLOW_PAGES_LISTINGS = SoupStrainer('div', class_=_css_class('listing'))
+ANCHORS = SoupStrainer('a', href=True)
+
+
+def parse_html(html: str, only: SoupStrainer) -> BeautifulSoup:
+    """Build a partial tree holding just the nodes matched by `only`."""
+    return BeautifulSoup(html, 'lxml', parse_only=only)
+
+
 def extract_emails_from_text(text: str) -> List[str]:
     """Extract email addresses from text using regex."""
-    # Email regex pattern
-    email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    emails = re.findall(email_pattern, text)
-    
-    # Filter out common false positives
-    filtered = []
-    skip_patterns = ['example.com', 'test.com', 'domain.com', 'email.com', 'yoursite.com', 
-                     'sentry.io', 'wixpress.com', 'w3.org', '.png', '.jpg', '.gif', '.css', '.js']
-    
-    for email in emails:
+    filtered = set()
+    for email in EMAIL_RE.findall(text):
         email_lower = email.lower()
-        if not any(skip in email_lower for skip in skip_patterns):
-            if len(email) < 100:  # Reasonable length
-                filtered.append(email.lower())
+        # Filter out common false positives
+        if len(email) < 100 and not EMAIL_SKIP_RE.search(email_lower):  # Reasonable length
+            filtered.add(email_lower)
     
-    return list(set(filtered))  # Remove duplicates
+    return list(filtered)
+
 
+def _scan_links(html: str) -> Tuple[List[str], Optional[str]]:
+    """One pass over a page's anchors: mailto addresses plus the first contact-looking link."""
+    mailtos = []
+    contact_href = None
+    for link in parse_html(html, ANCHORS).find_all('a'):
+        href = link['href']
+        if href.startswith('mailto:'):
+            email = href[len('mailto:'):].split('?')[0].strip()
+            if '@' in email:
+                mailtos.append(email.lower())
+        elif contact_href is None:
+            href_lower = href.lower()
+            if any(kw in href_lower for kw in CONTACT_KEYWORDS):
+                contact_href = href
+    return mailtos, contact_href
 
-def scrape_website_for_emails(url: str, timeout: int = 10) -> List[str]:
-    """Scrape a website for email addresses."""
+
+def scrape_website_for_emails(url: str, timeout: int = 10, budget: Optional[float] = None) -> List[str]:
+    """
+    Scrape a website for email addresses.
+    budget caps the total seconds spent on this site (homepage + contact page).
+    """
     emails = set()
+    started = time.time()
     
     try:
         # Ensure URL has protocol
         if not url.startswith('http'):
             url = 'https://' + url
         
-        response = requests.get(url, headers=get_headers(), timeout=timeout, allow_redirects=True)
+        response = fetch(url, timeout=timeout, allow_redirects=True)
         response.raise_for_status()
         
         # Extract from page content
-        page_emails = extract_emails_from_text(response.text)
-        emails.update(page_emails)
+        html = response.text
+        emails.update(extract_emails_from_text(html))
         
-        # Parse HTML for contact page links
-        soup = BeautifulSoup(response.text, 'lxml')
+        # Look for mailto links and a contact page link in a single pass
+        mailtos, contact_href = _scan_links(html)
+        emails.update(mailtos)
         
-        # Look for mailto links
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            if href.startswith('mailto:'):
-                email = href.replace('mailto:', '').split('?')[0].strip()
-                if '@' in email:
-                    emails.add(email.lower())
-        
-        # Try to find and scrape contact page
-        contact_keywords = ['contact', 'about', 'get-in-touch', 'reach-us']
-        for link in soup.find_all('a', href=True):
-            href_lower = link['href'].lower()
-            if any(kw in href_lower for kw in contact_keywords):
+        # Try to scrape the contact page
+        if contact_href:
+            contact_timeout = timeout
+            if budget is not None:
+                contact_timeout = min(timeout, budget - (time.time() - started))
+            # Skip it if this site is out of time, keep what the homepage gave us
+            if contact_timeout >= 1:
                 try:
-                    contact_url = urljoin(url, link['href'])
-                    contact_response = requests.get(contact_url, headers=get_headers(), timeout=timeout)
-                    contact_emails = extract_emails_from_text(contact_response.text)
-                    emails.update(contact_emails)
+                    contact_response = fetch(urljoin(url, contact_href), timeout=contact_timeout)
+                    contact_html = contact_response.text
+                    emails.update(extract_emails_from_text(contact_html))
                     
                     # Check mailto links on contact page
-                    contact_soup = BeautifulSoup(contact_response.text, 'lxml')
-                    for mailto in contact_soup.find_all('a', href=True):
-                        if mailto['href'].startswith('mailto:'):
-                            email = mailto['href'].replace('mailto:', '').split('?')[0].strip()
-                            if '@' in email:
-                                emails.add(email.lower())
-                    break  # Found contact page, stop looking
-                except:
-                    continue
+                    emails.update(_scan_links(contact_html)[0])
+                except Exception:
+                    pass
                     
     except Exception as e:
         print(f"[SCRAPER] Error scraping {url}: {str(e)}")
@@ -109,11 +165,81 @@ def scrape_website_for_emails(url: str, timeout: int = 10) -> List[str]:
     return list(emails)
 
 
+# Email enrichment pool settings
+ENRICH_MAX_WORKERS = int(os.getenv("ENRICH_MAX_WORKERS", "8"))
+ENRICH_SITE_BUDGET = float(os.getenv("ENRICH_SITE_BUDGET", "8"))  # seconds per website
+ENRICH_DEADLINE = float(os.getenv("ENRICH_DEADLINE", "20"))  # seconds for the whole batch
+
+PREFERRED_MAILBOXES = ['info', 'sales', 'contact', 'hello', 'enquiries', 'admin', 'office']
+
+
+def pick_best_email(emails: List[str], website: str = "") -> str:
+    """Choose the most useful address: same domain as the website first, then generic sales inboxes."""
+    if not emails:
+        return ""
+    domain = urlparse(website if website.startswith('http') else 'https://' + website).netloc.lower().replace('www.', '')
+    
+    def rank(email: str):
+        mailbox, _, email_domain = email.partition('@')
+        return (
+            0 if domain and email_domain.endswith(domain) else 1,
+            0 if mailbox in PREFERRED_MAILBOXES else 1,
+            email,
+        )
+    
+    return sorted(emails, key=rank)[0]
+
+
+def enrich_leads_with_emails(leads: List[Dict[str, Any]], max_workers: int = ENRICH_MAX_WORKERS,
+                             site_budget: float = ENRICH_SITE_BUDGET,
+                             deadline: float = ENRICH_DEADLINE) -> List[Dict[str, Any]]:
+    """
+    Visit lead websites (and their contact pages) concurrently to fill in missing emails.
+    Each site gets at most site_budget seconds; whatever has been found when the global
+    deadline passes is kept and the remaining sites are abandoned.
+    Leads are updated in place and returned.
+    """
+    targets = [lead for lead in leads if not lead.get('email') and lead.get('website')]
+    if not targets:
+        return leads
+    
+    started = time.time()
+    found = 0
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="enrich")
+    try:
+        futures = {
+            executor.submit(scrape_website_for_emails, lead['website'], timeout=min(10, site_budget), budget=site_budget): lead
+            for lead in targets
+        }
+        done, not_done = wait(futures, timeout=deadline)
+        for future in done:
+            try:
+                emails = future.result()
+            except Exception:
+                continue
+            lead = futures[future]
+            best = pick_best_email(emails, lead['website'])
+            if best:
+                lead['email'] = best
+                found += 1
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    print(f"[ENRICH] Found emails for {found}/{len(targets)} sites in {time.time() - started:.1f}s "
+          f"({len(not_done)} unfinished at deadline)")
+    return leads
+
+
 def scrape_duckduckgo(query: str, num_results: int = 15) -> List[Dict[str, str]]:
     """
     Scrape DuckDuckGo search results - more permissive than Google.
     Returns list of businesses with name, website, snippet.
     """
+    cache = get_serp_cache()
+    cached = cache.get("duckduckgo", query, num_results)
+    if cached is not None:
+        return cached
+    
     businesses = []
     
     try:
@@ -121,10 +247,10 @@ def scrape_duckduckgo(query: str, num_results: int = 15) -> List[Dict[str, str]]
         encoded_query = quote_plus(query)
         search_url = f"https://html.duckduckgo.com/html/?q={encoded_query}"
         
-        response = requests.get(search_url, headers=get_headers(), timeout=15)
+        response = fetch(search_url, timeout=15)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'lxml')
+        soup = parse_html(response.text, DDG_RESULTS)
         
         # Find search results
         for result in soup.find_all('div', class_='result'):
@@ -144,8 +270,7 @@ def scrape_duckduckgo(query: str, num_results: int = 15) -> List[Dict[str, str]]
                 # Clean up the link (DuckDuckGo wraps links)
                 if 'uddg=' in link:
                     # Extract actual URL from DuckDuckGo redirect
-                    import urllib.parse
-                    parsed = urllib.parse.parse_qs(urllib.parse.urlparse(link).query)
+                    parsed = parse_qs(urlparse(link).query)
                     if 'uddg' in parsed:
                         link = parsed['uddg'][0]
                 
@@ -164,6 +289,7 @@ def scrape_duckduckgo(query: str, num_results: int = 15) -> List[Dict[str, str]]
     except Exception as e:
         print(f"[SCRAPER] DuckDuckGo search error: {str(e)}")
     
+    cache.set("duckduckgo", query, num_results, businesses)
     return businesses
 
 
@@ -171,16 +297,21 @@ def scrape_bing_search(query: str, num_results: int = 10) -> List[Dict[str, str]
     """
     Scrape Bing search as backup.
     """
+    cache = get_serp_cache()
+    cached = cache.get("bing", query, num_results)
+    if cached is not None:
+        return cached
+    
     businesses = []
     
     try:
         encoded_query = quote_plus(query)
         search_url = f"https://www.bing.com/search?q={encoded_query}&count={num_results}"
         
-        response = requests.get(search_url, headers=get_headers(), timeout=15)
+        response = fetch(search_url, timeout=15)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'lxml')
+        soup = parse_html(response.text, BING_RESULTS)
         
         for result in soup.find_all('li', class_='b_algo'):
             try:
@@ -207,6 +338,7 @@ def scrape_bing_search(query: str, num_results: int = 10) -> List[Dict[str, str]
     except Exception as e:
         print(f"[SCRAPER] Bing search error: {str(e)}")
     
+    cache.set("bing", query, num_results, businesses)
     return businesses
 
 
@@ -223,10 +355,10 @@ def scrape_yellow_pages_sa(niche: str, location: str, max_results: int = 20) ->
         
         search_url = f"https://www.yellowpages.co.za/search?what={quote_plus(niche)}&where={quote_plus(location)}"
         
-        response = requests.get(search_url, headers=get_headers(), timeout=15)
+        response = fetch(search_url, timeout=15)
         
         if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'lxml')
+            soup = parse_html(response.text, YELLOW_PAGES_LISTINGS)
             
             # Find business listings
             for listing in soup.find_all('div', class_='listing'):
@@ -302,17 +434,55 @@ def generate_business_search_queries(niche: str, location: str) -> List[str]:
     return queries
 
 
-def scrape_leads_free(niche: str, location: str = "South Africa", max_leads: int = 20) -> List[Dict[str, Any]]:
-    """
-    Main function: Scrape leads for FREE using DuckDuckGo, Bing, and website scraping.
-    Returns list of leads with name, email, website, phone, niche.
-    FAST VERSION - skips slow email checks to avoid timeouts.
-    """
-    all_leads = []
-    seen_domains = set()
+SKIP_DOMAINS = ['facebook.com', 'linkedin.com', 'twitter.com', 'youtube.com',
+                'wikipedia.org', 'instagram.com', 'tiktok.com', 'pinterest.com',
+                'yelp.com', 'tripadvisor.com', 'amazon.com', 'ebay.com', 'bing.com']
+
+# Upper bound on in-flight search requests for the concurrent fan-out
+SCRAPER_MAX_WORKERS = int(os.getenv("SCRAPER_MAX_WORKERS", "8"))
+
+
+def _normalize_result(result: Dict[str, Any], niche: str, seen_domains: set, source: str) -> Optional[Dict[str, Any]]:
+    """Turn a raw search/directory hit into a lead, or None if it's a duplicate or junk."""
+    website = result.get('website', '')
     
-    print(f"[SCRAPER] Starting FAST lead search for '{niche}' in '{location}'...")
+    # Skip invalid URLs
+    if not website:
+        return None
+    
+    try:
+        domain = urlparse(website).netloc.lower().replace('www.', '')
+        if not domain or any(skip in domain for skip in SKIP_DOMAINS):
+            return None
+        if domain in seen_domains:
+            return None
+        seen_domains.add(domain)
+    except:
+        return None
     
+    # Extract domain for company name if needed
+    name = result.get('name', '')
+    if not name and website:
+        parsed = urlparse(website)
+        name = parsed.netloc.replace('www.', '').split('.')[0].title()
+    
+    # Clean up name
+    name = name.replace(' - Home', '').replace(' | Home', '').replace(' - Google Search', '').strip()
+    if len(name) > 80:
+        name = name[:80]
+    
+    return {
+        'name': name or 'Business',
+        'website': website,
+        'email': '',  # Skip slow email checking
+        'phone': result.get('phone', ''),
+        'niche': niche,
+        'source': source
+    }
+
+
+def _search_sequential(niche: str, location: str) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """Original one-query-at-a-time search: Bing first, DuckDuckGo only if Bing is empty."""
     # Generate search queries - use only 2 for speed
     queries = generate_business_search_queries(niche, location)
     
@@ -327,59 +497,87 @@ def scrape_leads_free(niche: str, location: str = "South Africa", max_leads: int
             print(f"[SCRAPER] Trying DuckDuckGo...")
             results = scrape_duckduckgo(query, num_results=15)
         
-        for result in results:
-            website = result.get('website', '')
-            
-            # Skip invalid URLs
-            if not website:
-                continue
-            
-            # Skip common non-business sites
-            skip_domains = ['facebook.com', 'linkedin.com', 'twitter.com', 'youtube.com', 
-                          'wikipedia.org', 'instagram.com', 'tiktok.com', 'pinterest.com',
-                          'yelp.com', 'tripadvisor.com', 'amazon.com', 'ebay.com', 'bing.com']
-            
+        yield 'web_search', results
+
+
+def _search_concurrent(niche: str, location: str, max_workers: int) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Fan every query out to Bing and DuckDuckGo (plus one Yellow Pages lookup) at once
+    and yield each source's results as soon as it returns. Closing the generator cancels
+    queued searches; in-flight ones are left to finish in the background.
+    """
+    queries = generate_business_search_queries(niche, location)
+    
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="scraper")
+    futures = {}
+    try:
+        futures[executor.submit(scrape_yellow_pages_sa, niche, location)] = 'yellow_pages'
+        for query in queries:
+            futures[executor.submit(scrape_bing_search, query, num_results=15)] = 'web_search'
+            futures[executor.submit(scrape_duckduckgo, query, num_results=15)] = 'web_search'
+        print(f"[SCRAPER] Fanned out {len(futures)} searches ({len(queries)} queries, {max_workers} workers)")
+        
+        for future in as_completed(futures):
             try:
-                domain = urlparse(website).netloc.lower().replace('www.', '')
-                if any(skip in domain for skip in skip_domains):
-                    continue
-                if domain in seen_domains:
-                    continue
-                seen_domains.add(domain)
-            except:
+                results = future.result()
+            except Exception as e:
+                print(f"[SCRAPER] Search task failed: {str(e)}")
                 continue
-            
-            # Extract domain for company name if needed
-            name = result.get('name', '')
-            if not name and website:
-                parsed = urlparse(website)
-                name = parsed.netloc.replace('www.', '').split('.')[0].title()
-            
-            # Clean up name
-            name = name.replace(' - Home', '').replace(' | Home', '').replace(' - Google Search', '').strip()
-            if len(name) > 80:
-                name = name[:80]
-            
-            lead = {
-                'name': name or 'Business',
-                'website': website,
-                'email': '',  # Skip slow email checking
-                'phone': '',
-                'niche': niche,
-                'source': 'web_search'
-            }
-            
-            all_leads.append(lead)
-            
-            if len(all_leads) >= max_leads:
-                break
-        
-        if len(all_leads) >= max_leads:
-            break
+            yield futures[future], results
+    finally:
+        # Don't wait on stragglers - whatever is still queued gets dropped
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_leads(niche: str, location: str = "South Africa", max_leads: Optional[int] = None,
+               concurrent: bool = True, max_workers: int = SCRAPER_MAX_WORKERS) -> Iterator[Dict[str, Any]]:
+    """
+    Yield each normalized, de-duplicated lead as soon as it is discovered.
+    Stops after max_leads (if given); callers can also just stop iterating, which
+    cancels any searches that haven't started yet.
+    """
+    seen_domains = set()
+    found = 0
+    if concurrent:
+        searches = _search_concurrent(niche, location, max_workers)
+    else:
+        searches = _search_sequential(niche, location)
+    
+    try:
+        for source, results in searches:
+            for result in results:
+                lead = _normalize_result(result, niche, seen_domains, source)
+                if not lead:
+                    continue
+                yield lead
+                found += 1
+                
+                if max_leads is not None and found >= max_leads:
+                    print(f"[SCRAPER] Reached {max_leads} leads, stopping search")
+                    return
+    finally:
+        searches.close()
+
+
+def scrape_leads_free(niche: str, location: str = "South Africa", max_leads: int = 20,
+                      concurrent: bool = True, max_workers: int = SCRAPER_MAX_WORKERS) -> List[Dict[str, Any]]:
+    """
+    Main function: Scrape leads for FREE using DuckDuckGo, Bing, and website scraping.
+    Returns list of leads with name, email, website, phone, niche.
+    FAST VERSION - skips slow email checks to avoid timeouts.
+    
+    With concurrent=True (default) every generated query hits all sources in parallel,
+    so a search costs roughly the slowest single round-trip instead of the sum.
+    Use iter_leads() to process leads as they arrive instead of waiting for the list.
+    """
+    mode = "concurrent" if concurrent else "sequential"
+    print(f"[SCRAPER] Starting FAST lead search for '{niche}' in '{location}' ({mode})...")
+    
+    all_leads = list(iter_leads(niche, location, max_leads=max_leads, concurrent=concurrent, max_workers=max_workers))
     
     print(f"[SCRAPER] Done! Found {len(all_leads)} leads")
     
-    return all_leads[:max_leads]
+    return all_leads
 
 
 # For testing
@@ -0,0 +1,112 @@
+"""
+Shared HTTP client - one pooled keep-alive session per process.
+Used by the scraper, SendGrid and Paystack calls so repeat requests to the
+same host reuse TCP/TLS connections instead of handshaking every time.
+The scraper gets its own session (get_scraper_session) whose adapter never retries on
+status codes: 429/503 go straight back to the per-host rate limiter, which owns the backoff.
+"""
+
+import os
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Number of distinct hosts to keep a connection pool for
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "20"))
+# Max open connections kept alive per host (should be >= scraper worker count)
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+# Default (connect, read) timeout applied when callers don't pass one
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+# Transport-level retries (connection errors and 502/503/504 on idempotent methods)
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.3"))
+
+
+class PooledSession(requests.Session):
+    """requests.Session that falls back to a default timeout instead of waiting forever."""
+
+    def __init__(self, timeout=None):
+        super().__init__()
+        self.default_timeout = timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.default_timeout
+        return super().request(method, url, **kwargs)
+
+
+def build_session(pool_connections: int = HTTP_POOL_CONNECTIONS,
+                  pool_maxsize: int = HTTP_POOL_MAXSIZE,
+                  max_retries: int = HTTP_MAX_RETRIES,
+                  retry_statuses: bool = True) -> PooledSession:
+    """
+    Create a session with per-host connection pools and a retry adapter.
+    retry_statuses=False keeps the connection/read retries but hands every status code
+    (and its Retry-After) back to the caller unretried.
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries if retry_statuses else 0,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=(502, 503, 504) if retry_statuses else (),
+        allowed_methods=frozenset(["GET", "HEAD", "OPTIONS"]),  # never replay POSTs (payments, email)
+        raise_on_status=False,
+        respect_retry_after_header=retry_statuses,  # otherwise urllib3 would sleep out a server's Retry-After uncapped
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+
+    session = PooledSession()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_sessions: Dict[str, PooledSession] = {}
+_session_pid: Optional[int] = None
+_session_lock = threading.Lock()
+
+
+def _shared_session(name: str, **options) -> PooledSession:
+    """
+    This process's session called `name`, created on first use.
+    Keyed on the PID so forked RQ/gunicorn workers never share sockets with the parent.
+    """
+    global _session_pid
+    pid = os.getpid()
+    session = _sessions.get(name) if _session_pid == pid else None
+    if session is None:
+        with _session_lock:
+            if _session_pid != pid:
+                _sessions.clear()
+                _session_pid = pid
+            session = _sessions.get(name)
+            if session is None:
+                session = _sessions[name] = build_session(**options)
+    return session
+
+
+def get_session() -> PooledSession:
+    """Shared session for API calls (SendGrid, Paystack, LemonSqueezy)."""
+    return _shared_session("default")
+
+
+def get_scraper_session() -> PooledSession:
+    """Shared session for tools.free_scraper.fetch: no status retries, the rate limiter handles 429/503."""
+    return _shared_session("scraper", retry_statuses=False)
+
+
+def reset_session() -> None:
+    """Drop the shared sessions (closes pooled connections)."""
+    global _session_pid
+    with _session_lock:
+        if _session_pid == os.getpid():
+            for session in _sessions.values():
+                session.close()
+        _sessions.clear()
+        _session_pid = None
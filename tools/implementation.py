@@ -1,12 +1,16 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 from models import ToolSpec
 from tools.base import ToolRegistry
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import os
-import requests
-from database import db, Lead
+from tools.http_client import get_session
+from tools.smtp_pool import get_smtp_pool, build_shared_message, address_message
+from tools.sendgrid_batch import send_batch, apply_substitutions
+from tools.outreach import send_outreach, OUTREACH_CONCURRENCY, OUTREACH_MAX_LEADS
+from tools.pitch_engine import get_pitch_engine
+from mail_queue import enqueue_mail
+from database import db, Lead, normalize_email
+from job_queue import get_queue
 from flask import current_app
 
 def read_file_function(arguments: Dict[str, Any]) -> Dict[str, Any]:
@@ -18,6 +22,40 @@ def read_file_function(arguments: Dict[str, Any]) -> Dict[str, Any]:
     except Exception as e:
         return {"output_text": f"Error reading file: {str(e)}", "error": str(e)}
 
+def _queue_for_run(arguments: Dict[str, Any], recipients: List[Dict[str, Any]], body: str, html_body: str):
+    """Queue the email when the call carries a mail run key and Redis is up; None means send inline."""
+    run_key = arguments.get("run_key")
+    if not run_key:
+        return None
+    message = {
+        "subject": arguments.get("subject", ""),
+        "body": body,
+        "html_body": html_body,
+        "sender_name": arguments.get("sender_name", "AI Sales Agent"),
+        "reply_to": arguments.get("reply_to"),
+    }
+    try:
+        queued = enqueue_mail(run_key, recipients, message, arguments.get("user_id"), arguments.get("automation_id"))
+    except Exception as e:
+        print(f"[EMAIL] Mail queue unavailable, sending inline: {str(e)}")
+        db.session.rollback()
+        return None
+    if queued is None:
+        return None
+    if "sent" in queued:  # the queue refused the job, so enqueue_mail delivered through the ledger itself
+        total = queued["sent"] + queued["failed"]
+        if queued["sent"] == total:
+            output_text, status = f"Email sent successfully to {total} recipient(s)", "sent"
+        else:
+            output_text, status = f"Sent {queued['sent']}/{total} emails", "partial" if queued["sent"] else "failed"
+        return {"output_text": output_text, "status": status, "results": queued["results"],
+                "sent_count": queued["sent"], "skipped": queued["skipped"]}
+    return {
+        "output_text": f"Email queued for delivery to {queued['queued']} recipient(s) ({queued['skipped']} already handled)",
+        "status": "queued",
+        **queued,
+    }
+
 def send_email_function(arguments: Dict[str,Any]) -> Dict[str,Any]:
     to_email = arguments.get("to")
     subject = arguments.get("subject")
@@ -47,87 +85,130 @@ def send_email_function(arguments: Dict[str,Any]) -> Dict[str,Any]:
     print(f"[EMAIL] Subject: {subject}")
     print(f"[EMAIL] From: {sender_email}")
 
-    # Prefer SendGrid for scale if configured
+    # Inside an automation run: hand off to the mail queue (ledger + retries) and let the run finish
+    queued = _queue_for_run(arguments, [{"email": e} for e in email_list], body, html_body)
+    if queued is not None:
+        return queued
+
+    # Prefer SendGrid for scale if configured (one personalization per recipient, so nobody sees the others)
+    sent_via_sendgrid = 0
     if sendgrid_api_key:
-        try:
-            content = [{"type": "text/plain", "value": body}]
-            if html_body:
-                content.append({"type": "text/html", "value": html_body})
-
-            payload = {
-                "personalizations": [
-                    {"to": [{"email": e} for e in email_list]}
-                ],
-                "from": {"email": sendgrid_from_email, "name": sender_display_name},
-                "subject": subject,
-                "content": content,
+        results = send_batch(
+            sendgrid_api_key, [{"email": e} for e in email_list], subject, body,
+            from_email=sendgrid_from_email, from_name=sender_display_name, html_body=html_body, reply_to=reply_to,
+        )
+        failed = [r for r in results if r["status"] != "sent"]
+        if not failed:
+            return {
+                "output_text": f"Email sent successfully to {len(email_list)} recipient(s) via SendGrid",
+                "status": "sent",
             }
-            if reply_to:
-                payload["reply_to"] = {"email": reply_to}
-            response = requests.post(
-                "https://api.sendgrid.com/v3/mail/send",
-                headers={
-                    "Authorization": f"Bearer {sendgrid_api_key}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-                timeout=10,
-            )
-            if response.status_code in (200, 202):
-                return {
-                    "output_text": f"Email sent successfully to {len(email_list)} recipient(s) via SendGrid",
-                    "status": "sent",
-                }
-            else:
-                print(f"[EMAIL] SendGrid error: {response.status_code} {response.text}")
-        except Exception as e:
-            print(f"[EMAIL] SendGrid exception: {str(e)}")
-    
-    smtp_server = "smtp.gmail.com"
-    smtp_port = 587
+        print(f"[EMAIL] SendGrid error: {failed[0]['error']} ({len(failed)}/{len(email_list)} failed), trying SMTP")
+        sent_via_sendgrid = len(results) - len(failed)
+        email_list = [r["email"] for r in failed]
     
     if not sender_password:
         print("[EMAIL] ERROR: No password configured!")
         return {"output_text": f"Email simulation: Would send to {to_email}", "status": "simulated"}
     
     try:
-        print("[EMAIL] Connecting to Gmail SMTP...")
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        print("[EMAIL] Logging in...")
-        server.login(sender_email, sender_password)
+        # Pooled, already logged-in connection; the message is built once and only the To header varies
+        pool = get_smtp_pool(sender_email, sender_password)
+        message = build_shared_message(f"{sender_display_name} <{sender_email}>", subject, body, html_body, reply_to)
         
-        sent_count = 0
+        sent_count = sent_via_sendgrid
         for recipient in email_list:
             try:
-                msg = MIMEMultipart()
-                msg["From"] = f"{sender_display_name} <{sender_email}>"
-                msg["To"] = recipient
-                msg["Subject"] = subject
-                msg.attach(MIMEText(body, "plain"))
-                if html_body:
-                    msg.attach(MIMEText(html_body, "html"))
-                if reply_to:
-                    msg["Reply-To"] = reply_to
-                
                 print(f"[EMAIL] Sending to {recipient}...")
-                server.sendmail(sender_email, recipient, msg.as_string())
+                pool.sendmail(sender_email, recipient, address_message(message, recipient))
                 sent_count += 1
                 print(f"[EMAIL] Sent to {recipient}")
-            except Exception as e:
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
                 print(f"[EMAIL] Failed to send to {recipient}: {str(e)}")
+            except Exception as e:
+                # Server unreachable even after a reconnect - stop here and report what went out
+                if not sent_count:
+                    raise
+                print(f"[EMAIL] Failed to send to {recipient}, stopping: {str(e)}")
+                break
         
-        server.quit()
-        
-        if sent_count == len(email_list):
+        total = sent_via_sendgrid + len(email_list)
+        if sent_count == total:
             print(f"[EMAIL] SUCCESS! All {sent_count} emails sent")
             return {"output_text": f"Email sent successfully to {sent_count} recipient(s): {', '.join(email_list)}", "status": "sent"}
         else:
-            return {"output_text": f"Sent {sent_count}/{len(email_list)} emails", "status": "partial"}
+            return {"output_text": f"Sent {sent_count}/{total} emails", "status": "partial"}
     except Exception as e:
         print(f"[EMAIL] ERROR: {str(e)}")
         return {"output_text": f"Error sending email: {str(e)}", "error": str(e)}
 
+def _send_batch_smtp(recipients: List[Dict[str, Any]], subject: str, body: str, html_body: str,
+                     sender_name: str, reply_to: str = None) -> List[Dict[str, Any]]:
+    """SMTP fallback for send_email_batch: substitutions applied locally, one pooled connection."""
+    sender_email = os.getenv("EMAIL_SENDER", "sandtonstreets@gmail.com")
+    sender_password = os.getenv("EMAIL_PASSWORD", "")
+    if not sender_password:
+        print("[EMAIL] ERROR: No password configured!")
+        return [{"email": r["email"], "status": "failed", "error": "SMTP not configured (set EMAIL_PASSWORD)"}
+                for r in recipients]
+    pool = get_smtp_pool(sender_email, sender_password)
+    sender = f"{sender_name} <{sender_email}>"
+    shared = build_shared_message(sender, subject, body, html_body, reply_to)
+    results = []
+    for recipient in recipients:
+        subs = recipient.get("substitutions")
+        message = shared if not subs else build_shared_message(
+            sender, apply_substitutions(subject, subs), apply_substitutions(body, subs),
+            apply_substitutions(html_body, subs), reply_to,
+        )
+        try:
+            pool.sendmail(sender_email, recipient["email"], address_message(message, recipient["email"]))
+            results.append({"email": recipient["email"], "status": "sent", "error": None})
+        except Exception as e:
+            results.append({"email": recipient["email"], "status": "failed", "error": str(e)})
+    return results
+
+def deliver_batch(recipients: List[Dict[str, Any]], subject: str, body: str, html_body: str = "",
+                  sender_name: str = "AI Sales Agent", reply_to: str = None) -> List[Dict[str, Any]]:
+    """Send now via SendGrid (batched) or pooled SMTP. Returns per-recipient {"email", "status", "error"}."""
+    sendgrid_api_key = os.getenv("SENDGRID_API_KEY", "")
+    print(f"[EMAIL] Batch send to {len(recipients)} recipient(s) via {'SendGrid' if sendgrid_api_key else 'SMTP'}")
+    if sendgrid_api_key:
+        from_email = os.getenv("SENDGRID_FROM_EMAIL", os.getenv("EMAIL_SENDER", "sandtonstreets@gmail.com"))
+        return send_batch(sendgrid_api_key, recipients, subject, body, from_email=from_email,
+                          from_name=sender_name, html_body=html_body, reply_to=reply_to)
+    return _send_batch_smtp(recipients, subject, body, html_body, sender_name, reply_to)
+
+def send_email_batch_function(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Send one email to many recipients in a single tool call. Each recipient is
+    {"email", "name"?, "substitutions"?}; substitution keys (e.g. "-name-") are replaced per
+    recipient in the subject and body. SendGrid gets up to 1000 recipients per request,
+    sent concurrently; without SendGrid they go out over the pooled SMTP connection.
+    """
+    recipients = [r if isinstance(r, dict) else {"email": r} for r in arguments.get("recipients") or []]
+    recipients = [r for r in recipients if r.get("email")]
+    subject = arguments.get("subject", "")
+    body = arguments.get("body", "")
+    html_body = arguments.get("html_body", "")
+    sender_name = arguments.get("sender_name", "AI Sales Agent")
+    reply_to = arguments.get("reply_to")
+    if not recipients:
+        return {"output_text": "No recipients to email", "status": "skipped", "results": [], "sent_count": 0}
+
+    queued = _queue_for_run(arguments, recipients, body, html_body)
+    if queued is not None:
+        return queued
+
+    results = deliver_batch(recipients, subject, body, html_body, sender_name, reply_to)
+    sent = sum(1 for r in results if r["status"] == "sent")
+    if sent == len(results):
+        output_text, status = f"Email sent successfully to {sent} recipient(s)", "sent"
+    else:
+        output_text, status = f"Sent {sent}/{len(results)} emails", "partial" if sent else "failed"
+    print(f"[EMAIL] {output_text}")
+    return {"output_text": output_text, "status": status, "results": results, "sent_count": sent}
+
 def search_leads_function(arguments: Dict[str, Any]) -> Dict[str, Any]:
     """
     FREE lead search using web scraping - NO API COSTS!
@@ -138,9 +219,14 @@ def search_leads_function(arguments: Dict[str, Any]) -> Dict[str, Any]:
     user_id = arguments.get("user_id")
     unlock = bool(arguments.get("unlock"))
     max_leads = arguments.get("max_leads", 15)
+    cancel_event = arguments.get("cancel_event")  # set by the tool runtime when the call passes its deadline
+    
+    def cancelled() -> bool:
+        return bool(cancel_event and cancel_event.is_set())
     
     # Import free scraper
-    from tools.free_scraper import scrape_leads_free
+    from tools.free_scraper import iter_leads
+    from lead_store import save_leads_stream
     
     # Multi-niche support
     niches = [niche]
@@ -151,53 +237,50 @@ def search_leads_function(arguments: Dict[str, Any]) -> Dict[str, Any]:
         ]
     
     all_leads = []
+    new_leads = []
     
-    for n in niches:
+    def collect(stream):
+        # Keep the plain dicts for the tool output while the stream is being saved
         try:
-            print(f"[LEADS] Searching for {n} in {location} (FREE scraping)...")
-            leads_per_niche = max_leads // len(niches)
-            scraped_leads = scrape_leads_free(n, location, max_leads=leads_per_niche)
-            
-            for lead in scraped_leads:
-                all_leads.append({
-                    "name": lead.get("name", ""),
-                    "email": lead.get("email", ""),
-                    "website": lead.get("website", ""),
-                    "phone": lead.get("phone", ""),
-                    "niche": n,
-                    "source": lead.get("source", "web_scrape")
-                })
-        except Exception as e:
-            print(f"[LEADS] Error scraping {n}: {str(e)}")
-            continue
-    
-    # Save leads to database
-    saved_count = 0
-    leads_with_email = 0
+            for lead in stream:
+                if cancelled():  # past the deadline: stop saving, the retry (if any) starts clean
+                    print(f"[LEADS] Search cancelled after {len(all_leads)} leads")
+                    return
+                all_leads.append(lead)
+                yield lead
+        finally:
+            stream.close()  # cancels searches that haven't started yet
     
+    # Stream leads straight into the database as they are discovered
     with current_app.app_context():
-        for lead in all_leads:
-            # Check for duplicates by website or email
-            existing = None
-            if lead.get("email"):
-                existing = Lead.query.filter_by(user_id=user_id, email=lead['email']).first()
-            if not existing and lead.get("website"):
-                existing = Lead.query.filter_by(user_id=user_id, website=lead['website']).first()
-            
-            if not existing:
-                new_lead = Lead(
-                    user_id=user_id,
-                    name=lead.get('name') or "Unknown Business",
-                    email=lead.get('email') or "",
-                    website=lead.get('website') or "",
-                    niche=lead.get('niche') or niche,
-                    is_unlocked=unlock
+        for n in niches:
+            if cancelled():
+                break
+            try:
+                print(f"[LEADS] Searching for {n} in {location} (FREE scraping)...")
+                leads_per_niche = max_leads // len(niches)
+                result = save_leads_stream(
+                    user_id,
+                    collect(iter_leads(n, location, max_leads=leads_per_niche)),
+                    unlock=unlock,
+                    default_niche=niche,
                 )
-                db.session.add(new_lead)
-                saved_count += 1
-                if lead.get('email'):
-                    leads_with_email += 1
-        db.session.commit()
+                new_leads.extend(result["new_leads"])
+            except Exception as e:
+                print(f"[LEADS] Error scraping {n}: {str(e)}")
+                continue
+        
+        saved_count = len(new_leads)
+        leads_with_email = sum(1 for l in new_leads if l.email)
+
+        # Fill in emails the fast search skipped (inline for small searches, queued otherwise)
+        enriched = enrich_lead_emails(new_leads) if not cancelled() else 0
+        if enriched:
+            leads_with_email += enriched
+            emails_by_website = {l.website: l.email for l in new_leads if l.email}
+            for lead in all_leads:
+                if not lead.get("email") and lead.get("website") in emails_by_website:
+                    lead["email"] = emails_by_website[lead["website"]]
     
     status_msg = f"SUCCESS: Found {len(all_leads)} leads in {location} using FREE web scraping. "
     status_msg += f"{saved_count} new leads added ({leads_with_email} with verified emails). "
@@ -211,40 +294,160 @@ def search_leads_function(arguments: Dict[str, Any]) -> Dict[str, Any]:
         "saved": saved_count
     }
 
-def personalize_pitch_function(arguments: Dict[str, Any]) -> Dict[str, Any]:
-    lead_name = arguments.get("lead_name", "Valued Partner")
-    niche = arguments.get("niche", "Security Services")
-    
-    niche_lower = (niche or "").lower()
-    if "solar" in niche_lower:
-        pitch = f"""Hi {lead_name},
+# Deadline for one search_leads call (per attempt); retried once if the timed-out attempt stopped when cancelled
+SEARCH_LEADS_TIMEOUT = int(os.getenv("SEARCH_LEADS_TIMEOUT", "180"))
 
-I work with solar installation companies across South Africa to consistently book qualified site‑assessment appointments.
+# Searches with more leads than this are enriched by a background job instead of inline
+ENRICH_INLINE_MAX = int(os.getenv("ENRICH_INLINE_MAX", "10"))
 
-Our system finds property owners and business managers who are actively exploring solar upgrades, then runs a short outreach sequence that turns interest into booked calls.
 
-If I could deliver 10–20 qualified solar leads per month, would you be open to a quick 5‑minute call this week?
+def update_lead_emails(leads: List[Lead], deadline: float = None) -> int:
+    """Scrape websites of saved leads that have no email and store what is found. Returns rows updated."""
+    from tools.free_scraper import enrich_leads_with_emails, ENRICH_DEADLINE
 
-Best regards,
-AI Sales Agent
-"""
-    else:
-        pitch = f"""Hi {lead_name},
+    pending = [lead for lead in leads if not lead.email and lead.website]
+    if not pending:
+        return 0
+    results = enrich_leads_with_emails(
+        [{"website": lead.website, "email": ""} for lead in pending],
+        deadline=deadline or ENRICH_DEADLINE,
+    )
+    found = [(lead, result["email"]) for lead, result in zip(pending, results) if result.get("email")]
+    if not found:
+        return 0
+
+    # An email already on another of the user's leads would violate the (user_id, email_key) index
+    taken = set(
+        db.session.query(Lead.user_id, Lead.email_key).filter(
+            Lead.user_id.in_({lead.user_id for lead, _ in found}),
+            Lead.email_key.in_({normalize_email(email) for _, email in found}),
+        ).all()
+    )
+    updated = 0
+    for lead, email in found:
+        key = (lead.user_id, normalize_email(email))
+        if key in taken:
+            continue
+        taken.add(key)
+        lead.email = email
+        updated += 1
+    db.session.commit()
+    return updated
 
-I help security companies in South Africa book more armed‑response and guarding contracts with qualified decision‑makers.
 
-Our system targets estates, businesses, and property managers, then runs a proven outreach sequence that converts interest into booked consultations.
+def enrich_lead_emails(leads: List[Lead]) -> int:
+    """
+    Enrich freshly saved leads with emails. Small batches run inline within the deadline;
+    larger ones are handed to the queue (tasks.enrich_leads_task) when Redis is available.
+    Returns the number of leads updated inline.
+    """
+    pending = [lead for lead in leads if not lead.email and lead.website]
+    if not pending:
+        return 0
+    if len(pending) > ENRICH_INLINE_MAX:
+        queue = get_queue()
+        if queue:
+            queue.enqueue("tasks.enrich_leads_task", [lead.id for lead in pending])
+            print(f"[ENRICH] Queued email enrichment for {len(pending)} leads")
+            return 0
+    return update_lead_emails(pending)
 
-If I could deliver 10–20 qualified security leads per month, would you be open to a quick 5‑minute call this week?
 
-Best regards,
-AI Sales Agent
-"""
+def personalize_pitch_function(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    One pitch for lead_name, or - when "leads" ({"name", "email", "website"?} dicts) is given -
+    one pitch per lead with an email (deduplicated, at most OUTREACH_MAX_LEADS) for send_outreach.
+    Pitches come from the per-niche templates in templates/pitches (tools/pitch_engine.py).
+    """
+    lead_name = arguments.get("lead_name", "Valued Partner")
+    niche = arguments.get("niche", "Security Services")
+    location = arguments.get("location")
+    leads = arguments.get("leads")
+    engine = get_pitch_engine()
+    if not leads:
+        lead = {"name": lead_name, "website": arguments.get("website")}
+        return {
+            "output_text": f"Personalized pitch generated for {lead_name}",
+            "personalized_pitch": engine.render(lead, niche, location)
+        }
+
+    targets = []
+    seen = set()
+    for lead in leads:
+        key = normalize_email(lead.get("email"))
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        targets.append(lead)
+        if len(targets) >= OUTREACH_MAX_LEADS:
+            break
+    rendered = engine.render_batch(targets, niche, location)
+    pitches = [
+        {"email": lead["email"].strip(), "name": lead.get("name") or "Business Owner", "pitch": pitch}
+        for lead, pitch in zip(targets, rendered)
+    ]
     return {
-        "output_text": f"Personalized pitch generated for {lead_name}",
-        "personalized_pitch": pitch
+        "output_text": f"Personalized pitches generated for {len(pitches)} lead(s)",
+        "personalized_pitch": pitches[0]["pitch"] if pitches else engine.render({"name": lead_name}, niche, location),
+        "pitches": pitches
     }
 
+def send_outreach_function(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Email every lead its own pitch ({"email", "name", "pitch"} from personalize_pitch).
+    Inside an automation run with Redis up each pitch is queued on the mail queue; otherwise
+    they are sent concurrently, capped by OUTREACH_CONCURRENCY and paced by OUTREACH_RATE_PER_SEC.
+    """
+    pitches = [p for p in arguments.get("pitches") or [] if p.get("email") and p.get("pitch")]
+    subject = arguments.get("subject", "")
+    sender_name = arguments.get("sender_name", "AI Sales Agent")
+    reply_to = arguments.get("reply_to")
+    if not pitches:
+        return {"output_text": "No leads with an email to contact", "status": "skipped",
+                "results": [], "sent_count": 0, "failed_count": 0}
+
+    if arguments.get("run_key"):
+        results = []
+        for pitch in pitches:
+            queued = _queue_for_run(arguments, [{"email": pitch["email"], "name": pitch.get("name")}], pitch["pitch"], "")
+            if queued is None:
+                break
+            if queued.get("results"):  # delivered inline through the ledger
+                result = queued["results"][0]
+                status, error = result["status"], result.get("error")
+            else:
+                status, error = ("queued" if queued.get("queued") else "skipped"), None
+            results.append({"email": pitch["email"], "name": pitch.get("name", ""), "status": status, "error": error})
+        else:
+            queued_count = sum(1 for r in results if r["status"] == "queued")
+            sent = sum(1 for r in results if r["status"] == "sent")
+            failed = sum(1 for r in results if r["status"] == "failed")
+            output_text = f"Outreach queued for delivery to {queued_count} lead(s) ({len(results) - queued_count - sent - failed} already handled)"
+            if sent or failed:
+                output_text += f", mail queue unavailable so {sent} sent inline and {failed} failed"
+            return {
+                "output_text": output_text,
+                "status": "queued", "results": results, "queued": queued_count, "sent_count": sent, "failed_count": failed,
+            }
+        pitches = pitches[len(results):]  # queue went away part-way: send the rest now
+
+    def send_one(pitch: Dict[str, Any]) -> Dict[str, Any]:
+        recipient = {"email": pitch["email"], "name": pitch.get("name")}
+        return deliver_batch([recipient], subject, pitch["pitch"], "", sender_name, reply_to)[0]
+
+    print(f"[OUTREACH] Sending {len(pitches)} pitch(es), {OUTREACH_CONCURRENCY} at a time")
+    outcome = send_outreach(pitches, send_one)
+    sent, total = outcome["sent_count"], len(outcome["results"])
+    if sent == total:
+        output_text, status = f"Outreach sent successfully to {sent} lead(s)", "sent"
+    elif sent:
+        output_text, status = f"Outreach sent to {sent}/{total} leads", "partial"
+    else:
+        first_error = outcome["results"][0]["error"]
+        output_text, status = f"Error sending outreach to {total} lead(s): {first_error}", "failed"
+    print(f"[OUTREACH] {output_text}")
+    return {"output_text": output_text, "status": status, **outcome}
+
 def register_tools(tool_registry: ToolRegistry) -> None:
     from tools.base import Tool
     
@@ -252,25 +455,48 @@ def register_tools(tool_registry: ToolRegistry) -> None:
         name="search_leads",
         description="Finds business leads in a specific niche and location",
         input_schema={"niche": "string", "location": "string", "unlock": "boolean"},
-        output_schema={"leads_list": "list"}
+        output_schema={"leads_list": "list"},
+        timeout_seconds=SEARCH_LEADS_TIMEOUT,  # scraping + inline enrichment legitimately takes minutes
+        max_retries=1  # only retried once a timed-out attempt has honoured its cancel_event (see Tool._call_with_deadline)
     )
     tool_registry.register(Tool(spec=search_leads_spec, execute_func=search_leads_function))
 
     personalize_pitch_spec = ToolSpec(
         name="personalize_pitch",
         description="Generates an AI personalized sales pitch for a specific lead",
-        input_schema={"lead_name": "string", "niche": "string"},
-        output_schema={"personalized_pitch": "string"}
+        input_schema={"lead_name": "string", "niche": "string", "location": "string", "website": "string", "leads": "list"},
+        output_schema={"personalized_pitch": "string", "pitches": "list"}
     )
     tool_registry.register(Tool(spec=personalize_pitch_spec, execute_func=personalize_pitch_function))
 
+    send_outreach_spec = ToolSpec(
+        name="send_outreach",
+        description="Emails each lead its personalized pitch, several at a time under a rate limit",
+        input_schema={"pitches": "list", "subject": "string", "sender_name": "string", "reply_to": "string"},
+        output_schema={"status": "string", "results": "list", "sent_count": "integer", "failed_count": "integer"},
+        timeout_seconds=300,  # OUTREACH_MAX_LEADS pitches at OUTREACH_RATE_PER_SEC
+        max_retries=0  # a timed-out send may still go out; retrying could email a lead twice
+    )
+    tool_registry.register(Tool(spec=send_outreach_spec, execute_func=send_outreach_function))
+
     send_email_spec = ToolSpec(
         name="send_email", 
         description="Sends an Email to a recipient", 
         input_schema={"to": "string", "subject": "string", "body": "string", "html_body": "string", "sender_name": "string", "reply_to": "string"}, 
-        output_schema={"status":"string"}
+        output_schema={"status":"string"},
+        max_retries=0  # never resend an email that may already have gone out
     )
     tool_registry.register(Tool(spec=send_email_spec, execute_func=send_email_function))
 
+    send_email_batch_spec = ToolSpec(
+        name="send_email_batch",
+        description="Sends one email to many recipients, each with its own substitutions",
+        input_schema={"recipients": "list", "subject": "string", "body": "string", "html_body": "string", "sender_name": "string", "reply_to": "string"},
+        output_schema={"status": "string", "results": "list", "sent_count": "integer"},
+        timeout_seconds=600,
+        max_retries=0
+    )
+    tool_registry.register(Tool(spec=send_email_batch_spec, execute_func=send_email_batch_function))
+
     read_file_spec = ToolSpec(name="read_file", description="Reads a file from the filesystem", input_schema={"file_path": "string"}, output_schema={"content": "string"})
     tool_registry.register(Tool(spec=read_file_spec, execute_func=read_file_function))
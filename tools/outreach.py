@@ -0,0 +1,71 @@
+"""
+Concurrent lead outreach.
+send_outreach sends every lead its own pitch on a small thread pool instead of one lead per
+automation run. OUTREACH_CONCURRENCY caps the sends in flight and a token bucket paces how fast
+new ones start (OUTREACH_RATE_PER_SEC), so a big search doesn't trip the mail account's limits.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+OUTREACH_CONCURRENCY = int(os.getenv("OUTREACH_CONCURRENCY", "4"))
+OUTREACH_RATE_PER_SEC = float(os.getenv("OUTREACH_RATE_PER_SEC", "2"))  # 0 = unpaced
+OUTREACH_RATE_BURST = float(os.getenv("OUTREACH_RATE_BURST", "2"))
+# Most leads a single run will pitch; the rest wait for the next run
+OUTREACH_MAX_LEADS = int(os.getenv("OUTREACH_MAX_LEADS", "50"))
+
+
+class SendPacer:
+    """Token bucket shared by the outreach threads of one call."""
+
+    def __init__(self, rate: float = OUTREACH_RATE_PER_SEC, burst: float = OUTREACH_RATE_BURST):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until the next send may start. Returns seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            self._tokens -= 1  # may go negative: the slot is reserved, later callers queue behind it
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+def send_outreach(pitches: List[Dict[str, Any]], send_one: Callable[[Dict[str, Any]], Dict[str, Any]],
+                  concurrency: int = OUTREACH_CONCURRENCY, rate: float = OUTREACH_RATE_PER_SEC) -> Dict[str, Any]:
+    """
+    Call send_one(pitch) for every pitch ({"email", "name", "pitch"}), at most `concurrency` at a
+    time and no faster than `rate` per second. send_one returns {"status", "error"}; an exception
+    counts as a failure for that lead only.
+    Returns {"results": [{"email", "name", "status", "error"}] in input order, "sent_count", "failed_count"}.
+    """
+    pacer = SendPacer(rate)
+
+    def run(pitch: Dict[str, Any]) -> Dict[str, Any]:
+        pacer.acquire()
+        try:
+            result = send_one(pitch)
+        except Exception as e:
+            result = {"status": "failed", "error": str(e) or type(e).__name__}
+        return {"email": pitch["email"], "name": pitch.get("name", ""),
+                "status": result.get("status", "failed"), "error": result.get("error")}
+
+    if len(pitches) <= 1 or concurrency <= 1:
+        results = [run(pitch) for pitch in pitches]
+    else:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(pitches)), thread_name_prefix="outreach") as executor:
+            results = list(executor.map(run, pitches))
+    sent = sum(1 for r in results if r["status"] == "sent")
+    return {"results": results, "sent_count": sent, "failed_count": len(results) - sent}
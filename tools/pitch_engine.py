@@ -0,0 +1,117 @@
+"""
+Batch pitch engine.
+Pitches are Jinja templates in templates/pitches/, one per niche (default.txt for the rest).
+Each template is compiled once per process and cached, so pitching a list of leads costs one
+render per lead - no parsing and no filesystem checks after the first lead of a niche.
+Templates get company_name, website, location and niche.
+"""
+
+import os
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from jinja2 import Environment, FileSystemLoader, Template
+
+PITCH_TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates", "pitches")
+DEFAULT_LOCATION = "South Africa"
+DEFAULT_COMPANY_NAME = "Business Owner"
+
+# (niche keywords, template) checked in order - first match wins, default.txt otherwise
+NICHE_TEMPLATES = [
+    (("security", "guard", "armed response"), "security.txt"),
+    (("solar", "energy", "renewable"), "solar.txt"),
+    (("logistics", "transport", "truck", "freight", "courier"), "logistics.txt"),
+    (("cleaning",), "cleaning.txt"),
+    (("tech", "software", "saas", "b2b"), "technology.txt"),
+    (("financ", "accounting", "insurance"), "finance.txt"),
+    (("restaurant", "hospitality", "food", "catering"), "hospitality.txt"),
+    (("property", "real estate"), "real_estate.txt"),
+]
+DEFAULT_TEMPLATE = "default.txt"
+GENERIC_NICHES = {"", "general business", "multi-niche", "all", "all niches", "all high-ticket"}
+
+
+def _domain(website: str) -> str:
+    """acme.co.za from https://www.acme.co.za/contact"""
+    netloc = urlparse(website if "//" in website else f"//{website}").netloc
+    return (netloc[4:] if netloc.startswith("www.") else netloc) or website
+
+
+@lru_cache(maxsize=512)  # niche strings repeat; bounded because [niche: ...] is user input
+def template_name_for(niche: str) -> str:
+    niche_lower = (niche or "").strip().lower()
+    for keywords, name in NICHE_TEMPLATES:
+        if any(keyword in niche_lower for keyword in keywords):
+            return name
+    return DEFAULT_TEMPLATE
+
+
+class PitchEngine:
+    def __init__(self, templates_dir: str = PITCH_TEMPLATES_DIR):
+        self.env = Environment(
+            loader=FileSystemLoader(templates_dir),
+            autoescape=False,  # plain-text email bodies
+            auto_reload=False,  # compiled once per process; restart to pick up template edits
+            keep_trailing_newline=True,
+            trim_blocks=True,
+        )
+        self.env.filters["domain"] = _domain
+        self._templates: Dict[str, Template] = {}
+        self._lock = threading.Lock()
+
+    def template_for(self, niche: str) -> Template:
+        name = template_name_for(niche or "")
+        template = self._templates.get(name)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(name)
+                if template is None:
+                    template = self._templates[name] = self.env.get_template(name)
+        return template
+
+    def precompile(self) -> None:
+        """Load every niche template up front (worker start-up), instead of on its first lead."""
+        for name in [DEFAULT_TEMPLATE] + [name for _, name in NICHE_TEMPLATES]:
+            if name not in self._templates:
+                with self._lock:
+                    self._templates.setdefault(name, self.env.get_template(name))
+
+    def render(self, lead: Dict[str, Any], niche: str = "", location: Optional[str] = None) -> str:
+        return self.render_batch([lead], niche, location)[0]
+
+    def render_batch(self, leads: List[Dict[str, Any]], niche: str = "", location: Optional[str] = None) -> List[str]:
+        """
+        One pitch per lead ({"name", "website"?, "niche"?, "location"?}), in order. A lead's own
+        niche (multi-niche searches) wins over the batch niche.
+        """
+        location = location or DEFAULT_LOCATION
+        templates: Dict[str, Template] = {}
+        pitches = []
+        for lead in leads:
+            lead_niche = lead.get("niche") or niche or ""
+            template = templates.get(lead_niche)
+            if template is None:
+                template = templates[lead_niche] = self.template_for(lead_niche)
+            pitches.append(template.render(
+                company_name=lead.get("name") or DEFAULT_COMPANY_NAME,
+                website=lead.get("website") or "",
+                location=lead.get("location") or location,
+                niche="" if lead_niche.strip().lower() in GENERIC_NICHES else lead_niche,
+            ))
+        return pitches
+
+
+_engine: Optional[PitchEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_pitch_engine() -> PitchEngine:
+    """Process-wide engine, so templates are compiled once per worker."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = PitchEngine()
+    return _engine
@@ -0,0 +1,222 @@
+"""
+Per-host politeness limiter for outbound scraping.
+Token bucket per host (shared across threads, and across processes via Redis when
+REDIS_URL is set) plus exponential backoff after 429/503 responses, honoring Retry-After.
+"""
+
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+# Default pacing for hosts without an explicit entry below
+SCRAPER_RATE_PER_HOST = float(os.getenv("SCRAPER_RATE_PER_HOST", "2"))  # requests/second
+SCRAPER_RATE_BURST = float(os.getenv("SCRAPER_RATE_BURST", "4"))
+# Longest a caller will wait for a slot before giving up on the request
+SCRAPER_MAX_WAIT = float(os.getenv("SCRAPER_MAX_WAIT", "30"))
+# Backoff after 429/503: base * 2^(strikes-1), capped
+SCRAPER_BACKOFF_BASE = float(os.getenv("SCRAPER_BACKOFF_BASE", "2"))
+SCRAPER_BACKOFF_MAX = float(os.getenv("SCRAPER_BACKOFF_MAX", "120"))
+SCRAPER_RATE_LIMIT_ENABLED = os.getenv("SCRAPER_RATE_LIMIT_ENABLED", "true").lower() == "true"
+
+# (rate per second, burst) for the hosts we hit hardest
+HOST_LIMITS: Dict[str, Tuple[float, float]] = {
+    "www.bing.com": (1.0, 3),
+    "html.duckduckgo.com": (0.5, 2),
+    "www.yellowpages.co.za": (0.5, 2),
+}
+
+BACKOFF_STATUSES = (429, 503)
+
+
+class RateLimitedError(Exception):
+    """Raised when a host is throttled for longer than the caller is willing to wait."""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def limits_for(host: str) -> Tuple[float, float]:
+    return HOST_LIMITS.get(host, (SCRAPER_RATE_PER_HOST, SCRAPER_RATE_BURST))
+
+
+def backoff_delay(strikes: int, retry_after: Optional[float]) -> float:
+    """Exponential backoff with jitter; a server-supplied Retry-After wins if it's longer."""
+    delay = min(SCRAPER_BACKOFF_MAX, SCRAPER_BACKOFF_BASE * (2 ** max(0, strikes - 1)))
+    delay = delay * random.uniform(0.8, 1.2)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, SCRAPER_BACKOFF_MAX))
+    return delay
+
+
+class LocalRateLimiter:
+    """In-process token buckets, one per host."""
+
+    name = "local"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # host -> (tokens, updated_at)
+        self._penalties: Dict[str, Tuple[float, int]] = {}  # host -> (blocked_until, strikes)
+
+    def reserve(self, host: str, max_wait: float = SCRAPER_MAX_WAIT) -> float:
+        """
+        Return how long the caller must sleep before hitting host. A token is taken only when
+        that is within max_wait, so rejected callers don't push the bucket further into debt.
+        """
+        rate, burst = limits_for(host)
+        now = time.time()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(host, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            blocked_until, _ = self._penalties.get(host, (0.0, 0))
+            wait = max(0.0 if tokens >= 1 else (1 - tokens) / rate, blocked_until - now)
+            self._buckets[host] = (tokens - 1 if wait <= max_wait else tokens, now)
+        return wait
+
+    def penalize(self, host: str, retry_after: Optional[float]) -> float:
+        with self._lock:
+            _, strikes = self._penalties.get(host, (0.0, 0))
+            strikes += 1
+            delay = backoff_delay(strikes, retry_after)
+            self._penalties[host] = (time.time() + delay, strikes)
+        return delay
+
+    def clear_penalty(self, host: str) -> None:
+        # Reset the strike count but let any active block run out on its own
+        with self._lock:
+            if host in self._penalties:
+                self._penalties[host] = (self._penalties[host][0], 0)
+
+
+# Atomic token bucket: refill, take one token (possibly going negative = reservation) unless
+# the wait is over max_wait, and return the seconds the caller has to wait for its slot.
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local wait = 0
+if tokens < 1 then
+  wait = (1 - tokens) / rate
+end
+local blocked = tonumber(redis.call('GET', KEYS[2]) or '0')
+wait = math.max(wait, blocked - now)
+if wait <= max_wait then
+  tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return tostring(wait)
+"""
+
+
+class RedisRateLimiter:
+    """Token buckets and backoff state kept in Redis so every worker process shares them."""
+
+    name = "redis"
+
+    def __init__(self, redis_conn, prefix: str = "ratelimit:"):
+        self.redis = redis_conn
+        self.prefix = prefix
+        self._script = redis_conn.register_script(_TOKEN_BUCKET_LUA)
+
+    def reserve(self, host: str, max_wait: float = SCRAPER_MAX_WAIT) -> float:
+        rate, burst = limits_for(host)
+        keys = [f"{self.prefix}{host}", f"{self.prefix}{host}:blocked_until"]
+        wait = self._script(keys=keys, args=[rate, burst, max_wait])
+        return float(wait.decode("utf-8") if isinstance(wait, bytes) else wait)
+
+    def penalize(self, host: str, retry_after: Optional[float]) -> float:
+        strikes_key = f"{self.prefix}{host}:strikes"
+        strikes = self.redis.incr(strikes_key)
+        self.redis.expire(strikes_key, int(SCRAPER_BACKOFF_MAX * 4))
+        delay = backoff_delay(strikes, retry_after)
+        # Same clock as the Lua script so blocked_until compares correctly
+        seconds, micros = self.redis.time()
+        self.redis.set(f"{self.prefix}{host}:blocked_until", seconds + micros / 1_000_000 + delay,
+                       ex=int(delay) + 1)
+        return delay
+
+    def clear_penalty(self, host: str) -> None:
+        self.redis.delete(f"{self.prefix}{host}:strikes")
+
+
+class HostThrottle:
+    """Front-end used by the scraper's fetch(); falls back to local buckets if Redis errors."""
+
+    def __init__(self, backend, enabled: bool = SCRAPER_RATE_LIMIT_ENABLED):
+        self.backend = backend
+        self.enabled = enabled
+        self._fallback = backend if isinstance(backend, LocalRateLimiter) else LocalRateLimiter()
+
+    def _call(self, method: str, *args):
+        try:
+            return getattr(self.backend, method)(*args)
+        except Exception as e:
+            if self.backend is self._fallback:
+                raise
+            print(f"[RATE LIMIT] {self.backend.name} backend error, using local buckets: {str(e)}")
+            return getattr(self._fallback, method)(*args)
+
+    def acquire(self, host: str, max_wait: float = SCRAPER_MAX_WAIT) -> float:
+        """Block until host may be hit again. Returns seconds waited."""
+        if not self.enabled or not host:
+            return 0.0
+        wait = self._call("reserve", host, max_wait)  # no token is taken when it is over max_wait
+        if wait > max_wait:
+            raise RateLimitedError(f"{host} throttled for {wait:.0f}s (max wait {max_wait:.0f}s)")
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record_response(self, host: str, status_code: int, retry_after: Optional[str] = None) -> Optional[float]:
+        """Feed a response back in: 429/503 start (or extend) a backoff, anything else clears it."""
+        if not self.enabled or not host:
+            return None
+        if status_code in BACKOFF_STATUSES:
+            delay = self._call("penalize", host, parse_retry_after(retry_after))
+            print(f"[RATE LIMIT] {host} returned {status_code}, backing off {delay:.1f}s")
+            return delay
+        self._call("clear_penalty", host)
+        return None
+
+
+_throttle: Optional[HostThrottle] = None
+_throttle_lock = threading.Lock()
+
+
+def get_throttle() -> HostThrottle:
+    """Process-wide throttle; Redis-backed when REDIS_URL is set."""
+    global _throttle
+    if _throttle is None:
+        with _throttle_lock:
+            if _throttle is None:
+                backend = None
+                if os.getenv("REDIS_URL"):
+                    try:
+                        from job_queue import get_redis
+                        backend = RedisRateLimiter(get_redis())
+                    except Exception as e:
+                        print(f"[RATE LIMIT] Redis unavailable, using local buckets: {str(e)}")
+                _throttle = HostThrottle(backend or LocalRateLimiter())
+    return _throttle
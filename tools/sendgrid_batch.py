@@ -0,0 +1,125 @@
+"""
+Batched SendGrid delivery.
+One /v3/mail/send request carries up to SENDGRID_MAX_PERSONALIZATIONS personalizations, one per
+recipient with its own substitutions, so a campaign of N leads is ceil(N / 1000) requests sent
+concurrently instead of N tool calls. Results come back per recipient, in input order.
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from tools.http_client import get_session
+
+SENDGRID_MAIL_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
+SENDGRID_MAX_PERSONALIZATIONS = int(os.getenv("SENDGRID_MAX_PERSONALIZATIONS", "1000"))  # provider limit per request
+SENDGRID_BATCH_WORKERS = int(os.getenv("SENDGRID_BATCH_WORKERS", "4"))
+SENDGRID_TIMEOUT = float(os.getenv("SENDGRID_TIMEOUT", "30"))
+
+# 400 responses name the offending personalization, e.g. "personalizations.12.to.0.email"
+_PERSONALIZATION_FIELD = re.compile(r"^personalizations\.(\d+)\b")
+
+
+def apply_substitutions(text: str, substitutions: Optional[Dict[str, Any]]) -> str:
+    """Local equivalent of SendGrid substitutions, for the SMTP fallback."""
+    for key, value in (substitutions or {}).items():
+        text = text.replace(key, str(value))
+    return text
+
+
+def build_personalization(recipient: Dict[str, Any]) -> Dict[str, Any]:
+    to = {"email": recipient["email"]}
+    if recipient.get("name"):
+        to["name"] = recipient["name"]
+    personalization: Dict[str, Any] = {"to": [to]}
+    substitutions = recipient.get("substitutions")
+    if substitutions:
+        personalization["substitutions"] = {key: str(value) for key, value in substitutions.items()}
+    return personalization
+
+
+def _post(api_key: str, payload: Dict[str, Any]):
+    return get_session().post(
+        SENDGRID_MAIL_SEND_URL,
+        headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+        json=payload,
+        timeout=SENDGRID_TIMEOUT,
+    )
+
+
+def _invalid_personalizations(response) -> Dict[int, str]:
+    """Index -> message for personalizations a 400 response blames (empty if it blames the request)."""
+    try:
+        errors = response.json().get("errors") or []
+    except ValueError:
+        return {}
+    invalid = {}
+    for error in errors:
+        match = _PERSONALIZATION_FIELD.match(error.get("field") or "")
+        if match:
+            invalid[int(match.group(1))] = error.get("message") or "rejected by SendGrid"
+    return invalid if len(invalid) == len(errors) else {}
+
+
+def _send_chunk(api_key: str, base_payload: Dict[str, Any], chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    results: List[Optional[Dict[str, Any]]] = [None] * len(chunk)
+    pending = list(range(len(chunk)))
+    # A 400 rejects the whole request; if it only blames some recipients, drop them and send the rest once more
+    for attempt in (1, 2):
+        payload = dict(base_payload, personalizations=[build_personalization(chunk[i]) for i in pending])
+        try:
+            response = _post(api_key, payload)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            break
+        if response.status_code in (200, 202):
+            error = None
+            break
+        error = f"SendGrid {response.status_code}: {response.text[:300]}"
+        invalid = _invalid_personalizations(response) if response.status_code == 400 and attempt == 1 else {}
+        if not invalid:
+            break
+        for position, message in invalid.items():
+            if position < len(pending):
+                results[pending[position]] = {"email": chunk[pending[position]]["email"], "status": "failed", "error": message}
+        pending = [i for i in pending if results[i] is None]
+        if not pending:
+            break
+
+    for i in pending:
+        if error:
+            results[i] = {"email": chunk[i]["email"], "status": "failed", "error": error}
+        else:
+            results[i] = {"email": chunk[i]["email"], "status": "sent", "error": None}
+    return results
+
+
+def send_batch(api_key: str, recipients: List[Dict[str, Any]], subject: str, body: str, from_email: str,
+               from_name: str = "", html_body: str = "", reply_to: Optional[str] = None,
+               max_per_request: int = SENDGRID_MAX_PERSONALIZATIONS,
+               workers: int = SENDGRID_BATCH_WORKERS) -> List[Dict[str, Any]]:
+    """
+    Send one message to many recipients ({"email", "name"?, "substitutions"?} dicts).
+    Substitution keys are replaced in the subject and body by SendGrid, per recipient.
+    Returns [{"email", "status": "sent"|"failed", "error"}] in the same order as recipients.
+    """
+    if not recipients:
+        return []
+    content = [{"type": "text/plain", "value": body}]
+    if html_body:
+        content.append({"type": "text/html", "value": html_body})
+    base_payload: Dict[str, Any] = {
+        "from": {"email": from_email, "name": from_name} if from_name else {"email": from_email},
+        "subject": subject,
+        "content": content,
+    }
+    if reply_to:
+        base_payload["reply_to"] = {"email": reply_to}
+
+    chunks = [recipients[i:i + max_per_request] for i in range(0, len(recipients), max_per_request)]
+    if len(chunks) == 1:
+        return _send_chunk(api_key, base_payload, chunks[0])
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as executor:
+        chunk_results = executor.map(lambda chunk: _send_chunk(api_key, base_payload, chunk), chunks)
+        return [result for results in chunk_results for result in results]
@@ -0,0 +1,233 @@
+"""
+Search result (SERP) cache for the free scraper.
+Keyed by (engine, normalized query, num_results) with a TTL and size-bounded LRU eviction.
+Backed by Redis when REDIS_URL is set, otherwise by an on-disk SQLite file.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+SERP_CACHE_ENABLED = os.getenv("SERP_CACHE_ENABLED", "true").lower() == "true"
+SERP_CACHE_TTL = int(os.getenv("SERP_CACHE_TTL", str(24 * 60 * 60)))  # seconds
+SERP_CACHE_MAX_ENTRIES = int(os.getenv("SERP_CACHE_MAX_ENTRIES", "5000"))
+SERP_CACHE_PATH = os.getenv("SERP_CACHE_PATH", "serp_cache.db")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries share an entry."""
+    return " ".join((query or "").lower().split())
+
+
+def make_cache_key(engine: str, query: str, num_results: int) -> str:
+    raw = f"{engine}|{normalize_query(query)}|{num_results}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class SQLiteSerpBackend:
+    """Single-node backend: one row per entry, LRU by last access time."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = SERP_CACHE_PATH, max_entries: int = SERP_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS serp_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_serp_cache_last_access ON serp_cache (last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS serp_cache_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, expires_at FROM serp_cache WHERE key = ?", (key,)).fetchone()
+            if not row:
+                return None
+            if row[1] <= now:
+                conn.execute("DELETE FROM serp_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE serp_cache SET last_access = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO serp_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now),
+            )
+            conn.execute("DELETE FROM serp_cache WHERE expires_at <= ?", (now,))
+            count = conn.execute("SELECT COUNT(*) FROM serp_cache").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM serp_cache WHERE key IN "
+                    "(SELECT key FROM serp_cache ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def incr(self, name: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO serp_cache_stats (name, value) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+                (name,),
+            )
+
+    def counters(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            return {name: value for name, value in conn.execute("SELECT name, value FROM serp_cache_stats")}
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM serp_cache")
+
+
+class RedisSerpBackend:
+    """Shared backend: values live in plain keys with EX, a sorted set tracks LRU order."""
+
+    name = "redis"
+
+    def __init__(self, redis_conn, max_entries: int = SERP_CACHE_MAX_ENTRIES, prefix: str = "serp:"):
+        self.redis = redis_conn
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self.lru_key = f"{prefix}lru"
+        self.stats_key = f"{prefix}stats"
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.redis.get(self.prefix + key)
+        if value is None:
+            self.redis.zrem(self.lru_key, key)
+            return None
+        self.redis.zadd(self.lru_key, {key: time.time()})
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        pipe = self.redis.pipeline()
+        pipe.set(self.prefix + key, value, ex=ttl)
+        pipe.zadd(self.lru_key, {key: time.time()})
+        pipe.zcard(self.lru_key)
+        count = pipe.execute()[-1]
+        if count > self.max_entries:
+            evicted = self.redis.zpopmin(self.lru_key, count - self.max_entries)
+            if evicted:
+                self.redis.delete(*[self.prefix + (k.decode("utf-8") if isinstance(k, bytes) else k) for k, _ in evicted])
+
+    def incr(self, name: str) -> None:
+        self.redis.hincrby(self.stats_key, name, 1)
+
+    def counters(self) -> Dict[str, int]:
+        raw = self.redis.hgetall(self.stats_key) or {}
+        return {
+            (k.decode("utf-8") if isinstance(k, bytes) else k): int(v)
+            for k, v in raw.items()
+        }
+
+    def clear(self) -> None:
+        keys = self.redis.zrange(self.lru_key, 0, -1)
+        if keys:
+            self.redis.delete(*[self.prefix + (k.decode("utf-8") if isinstance(k, bytes) else k) for k in keys])
+        self.redis.delete(self.lru_key)
+
+
+class SerpCache:
+    """Front-end used by the scraper. Backend errors are logged and treated as misses."""
+
+    def __init__(self, backend, ttl: int = SERP_CACHE_TTL, enabled: bool = SERP_CACHE_ENABLED):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            if name == "hits":
+                self.hits += 1
+            else:
+                self.misses += 1
+        try:
+            self.backend.incr(name)
+        except Exception as e:
+            print(f"[SERP CACHE] Counter update failed: {str(e)}")
+
+    def get(self, engine: str, query: str, num_results: int) -> Optional[List[Dict[str, Any]]]:
+        if not self.enabled:
+            return None
+        try:
+            raw = self.backend.get(make_cache_key(engine, query, num_results))
+        except Exception as e:
+            print(f"[SERP CACHE] Read failed ({self.backend.name}): {str(e)}")
+            raw = None
+        if raw is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return json.loads(raw)
+
+    def set(self, engine: str, query: str, num_results: int, results: List[Dict[str, Any]]) -> None:
+        # Empty result sets are usually blocks/captchas - never cache those
+        if not self.enabled or not results:
+            return
+        try:
+            self.backend.set(make_cache_key(engine, query, num_results), json.dumps(results), self.ttl)
+        except Exception as e:
+            print(f"[SERP CACHE] Write failed ({self.backend.name}): {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus the totals stored in the backend."""
+        try:
+            shared = self.backend.counters()
+        except Exception:
+            shared = {}
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "total_hits": shared.get("hits", 0),
+            "total_misses": shared.get("misses", 0),
+        }
+
+
+_cache: Optional[SerpCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_serp_cache() -> SerpCache:
+    """Process-wide cache; picks Redis when REDIS_URL is set, SQLite otherwise."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                backend = None
+                if os.getenv("REDIS_URL"):
+                    try:
+                        from job_queue import get_redis
+                        backend = RedisSerpBackend(get_redis())
+                    except Exception as e:
+                        print(f"[SERP CACHE] Redis unavailable, falling back to SQLite: {str(e)}")
+                if backend is None:
+                    backend = SQLiteSerpBackend()
+                _cache = SerpCache(backend)
+    return _cache
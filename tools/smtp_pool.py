@@ -0,0 +1,197 @@
+"""
+Shared SMTP connection pool - persistent, authenticated connections per process.
+send_email_function checks a connection out instead of connecting, running STARTTLS and
+logging in on every call. Connections idle past SMTP_IDLE_TIMEOUT are closed, ones idle for
+a few seconds get a NOOP health check before reuse, and a send that finds its connection
+dropped reconnects once.
+"""
+
+import os
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.policy import SMTP as SMTP_POLICY
+from typing import Dict, List, Optional, Tuple
+
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+# Idle authenticated connections kept per process (extra ones are closed on check-in)
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+# Servers drop idle sessions (Gmail after a few minutes) - close ours before they do
+SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", "60"))
+# A connection idle longer than this is NOOP-checked before it is handed out
+SMTP_HEALTH_CHECK_AFTER = float(os.getenv("SMTP_HEALTH_CHECK_AFTER", "5"))
+
+# Errors after which the connection can't be trusted any more
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+def _connection_lost(error: Exception) -> bool:
+    # 421 = "service not available, closing transmission channel"
+    return isinstance(error, CONNECTION_ERRORS) or getattr(error, "smtp_code", None) == 421
+
+
+class SMTPPool:
+    """A LIFO stack of idle logged-in connections to one server/account."""
+
+    def __init__(self, host: str = SMTP_SERVER, port: int = SMTP_PORT, username: str = "", password: str = "",
+                 use_tls: bool = SMTP_USE_TLS, size: int = SMTP_POOL_SIZE, idle_timeout: float = SMTP_IDLE_TIMEOUT,
+                 health_check_after: float = SMTP_HEALTH_CHECK_AFTER, timeout: float = SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.timeout = timeout
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+        self._lock = threading.Lock()
+        self.stats = {"connects": 0, "reuses": 0, "reconnects": 0, "discarded": 0}
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            self._close(server)
+            raise
+        self.stats["connects"] += 1
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _healthy(server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                server, last_used = self._idle.pop()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.idle_timeout or (idle_for > self.health_check_after and not self._healthy(server)):
+                self.stats["discarded"] += 1
+                self._close(server)
+                continue
+            self.stats["reuses"] += 1
+            return server
+        return self._connect()
+
+    def _checkin(self, server: smtplib.SMTP) -> None:
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((server, time.monotonic()))
+                return
+        self._close(server)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a logged-in connection; it goes back to the pool unless it broke while borrowed."""
+        server = self._checkout()
+        try:
+            yield server
+        except Exception as e:
+            if _connection_lost(e):
+                self.stats["discarded"] += 1
+                self._close(server)
+            else:
+                self._checkin(server)  # recipient/data errors leave the session usable (smtplib already sent RSET)
+            raise
+        self._checkin(server)
+
+    def sendmail(self, from_addr: str, to_addrs, msg: bytes) -> Dict[str, Tuple[int, bytes]]:
+        """Send on a pooled connection; a connection found dead mid-send is replaced once."""
+        for attempt in (1, 2):
+            try:
+                with self.connection() as server:
+                    return server.sendmail(from_addr, to_addrs, msg)
+            except Exception as e:
+                if attempt == 2 or not _connection_lost(e):
+                    raise
+                self.stats["reconnects"] += 1
+                print(f"[SMTP] Connection to {self.host} dropped ({str(e)}), reconnecting")
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self._close(server)
+
+
+def build_shared_message(sender: str, subject: str, body: str, html_body: str = "",
+                         reply_to: Optional[str] = None) -> bytes:
+    """
+    Serialize a message once for every recipient: everything except the To header,
+    which address_message() puts in front per recipient.
+    """
+    msg = MIMEMultipart()
+    msg["From"] = sender
+    msg["Subject"] = subject
+    if reply_to:
+        msg["Reply-To"] = reply_to
+    msg.attach(MIMEText(body, "plain"))
+    if html_body:
+        msg.attach(MIMEText(html_body, "html"))
+    return msg.as_bytes(policy=SMTP_POLICY)
+
+
+def address_message(shared: bytes, recipient: str) -> bytes:
+    header = SMTP_POLICY.header_factory("To", recipient)  # RFC 2047-encodes display names like MIMEMultipart did
+    return SMTP_POLICY.fold("To", header).encode("ascii") + shared
+
+
+_pools: Dict[Tuple[str, int, str], SMTPPool] = {}
+_pools_pid: Optional[int] = None
+_pools_lock = threading.Lock()
+
+
+def get_smtp_pool(username: str, password: str, host: str = SMTP_SERVER, port: int = SMTP_PORT) -> SMTPPool:
+    """
+    This process's pool for an account, created on first use.
+    Keyed on the PID so forked RQ/gunicorn workers never share sockets with the parent.
+    """
+    global _pools_pid
+    pid = os.getpid()
+    with _pools_lock:
+        if _pools_pid != pid:
+            _pools.clear()
+            _pools_pid = pid
+        key = (host, port, username)
+        pool = _pools.get(key)
+        if pool is None or pool.password != password:
+            pool = _pools[key] = SMTPPool(host, port, username, password)
+        return pool
+
+
+def reset_smtp_pools() -> None:
+    """Close every pooled connection (tests, credential changes)."""
+    global _pools_pid
+    with _pools_lock:
+        if _pools_pid == os.getpid():
+            for pool in _pools.values():
+                pool.close()
+        _pools.clear()
+        _pools_pid = None